@@ -0,0 +1,56 @@
+"""编码基准：各编码对控制和舵机命令的编码/解码耗时和消息大小
+
+用法: python benchmarks/bench_codec.py [--number 20000]
+
+只测试已安装的编码（msgpack、cbor2 为可选依赖）；消息与客户端实际发送的相同，
+包括增量编码后的完整状态、增量和心跳。大小为请求体字节数，不含 HTTP 头。
+"""
+import argparse
+import sys
+import time
+import timeit
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from codec import CODECS, INSTALL_HINTS  # noqa: E402
+
+NOW = time.time()
+MESSAGES = [
+    ("control 完整状态", "control", {"translate": {"x": 0.75, "y": -0.312}, "rotate": {"z": 0.25},
+                                 "seq": 1, "robot_id": "r1", "t_input": NOW, "t_send": NOW}),
+    ("control 增量", "control", {"delta": {"translate": {"x": 0.8}}, "seq": 2, "robot_id": "r1",
+                               "t_input": NOW, "t_send": NOW}),
+    ("control 心跳", "control", {"hb": 1, "seq": 3, "robot_id": "r1", "t_send": NOW}),
+    ("servo", "servo", {"robot_id": "r1", "servo_id": 3, "angle": 135}),
+    ("servo_batch", "servo_batch", {"robot_id": "r1", "angles": [135, 135, 90, 45, 135, 180, 90]}),
+    ("servo_trajectory", "servo_trajectory", {"robot_id": "r1", "angles": [90, 90, 90, 90, 90, 90, 90],
+                                              "max_velocity": 60.0}),
+]
+
+
+def measure(codec, kind, message, number):
+    body = codec.encode(message, kind)
+    encode = timeit.timeit(lambda: codec.encode(message, kind), number=number) / number
+    decode = timeit.timeit(lambda: codec.decode(body, kind), number=number) / number
+    return len(body), encode, decode
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--number", type=int, default=20000, help="每项的重复次数")
+    args = parser.parse_args()
+
+    missing = [f"{name}（{hint}）" for name, hint in INSTALL_HINTS.items() if name not in CODECS]
+    if missing:
+        print("未安装，跳过: " + "、".join(missing))
+    print(f"{'消息':<18}{'编码':<9}{'字节':>6}{'编码 µs':>10}{'解码 µs':>10}")
+    for label, kind, message in MESSAGES:
+        for name, codec in CODECS.items():
+            size, encode, decode = measure(codec, kind, message, args.number)
+            print(f"{label:<18}{name:<9}{size:>6}{encode * 1e6:>10.2f}{decode * 1e6:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
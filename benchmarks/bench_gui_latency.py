@@ -0,0 +1,107 @@
+"""GUI事件循环延迟基准：慢服务器下，同步发送 vs 后台发送
+
+用法: python benchmarks/bench_gui_latency.py [--delay 0.3] [--seconds 5]
+
+在本机启动一个每次响应都延迟 delay 秒的 HTTP 服务器，然后以 10Hz 向其发送
+控制命令，同时用 5ms 的 QTimer 测量事件循环的延迟（实际间隔 - 期望间隔）。
+"""
+import argparse
+import statistics
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import requests
+from PySide6.QtCore import QCoreApplication, QTimer
+
+from sender import CommandSender
+from transport import HttpTransport
+
+PROBE_INTERVAL_MS = 5
+CONTROL_DATA = {"translate": {"x": 0.5, "y": 0.0}, "rotate": {"z": 0.1}}
+
+
+def start_slow_server(delay):
+    """启动一个延迟响应的本地服务器，返回 (server, api_base_url)"""
+    class SlowHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_POST(self):
+            self.rfile.read(int(self.headers.get("Content-Length", 0)))
+            time.sleep(delay)
+            body = b'{"status": "success"}'
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), SlowHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}/api"
+
+
+def measure(app, seconds, send):
+    """运行事件循环 seconds 秒，每100ms调用一次 send，返回事件循环延迟样本(ms)"""
+    lags = []
+    last = [time.perf_counter()]
+
+    def probe():
+        now = time.perf_counter()
+        lags.append(max(0.0, (now - last[0]) * 1000 - PROBE_INTERVAL_MS))
+        last[0] = now
+
+    probe_timer = QTimer()
+    probe_timer.timeout.connect(probe)
+    probe_timer.start(PROBE_INTERVAL_MS)
+    send_timer = QTimer()
+    send_timer.timeout.connect(send)
+    send_timer.start(100)
+    QTimer.singleShot(int(seconds * 1000), app.quit)
+    app.exec()
+    probe_timer.stop()
+    send_timer.stop()
+    return lags
+
+
+def report(name, lags):
+    lags = sorted(lags)
+    p50 = lags[len(lags) // 2]
+    p99 = lags[min(len(lags) - 1, int(len(lags) * 0.99))]
+    print(f"{name:<10} 样本={len(lags):5d}  平均={statistics.mean(lags):7.2f}ms  "
+          f"p50={p50:7.2f}ms  p99={p99:7.2f}ms  最大={lags[-1]:7.2f}ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--delay", type=float, default=0.3, help="服务器响应延迟(秒)")
+    parser.add_argument("--seconds", type=float, default=5.0, help="每种模式的运行时间(秒)")
+    args = parser.parse_args()
+
+    server, api_base_url = start_slow_server(args.delay)
+    app = QCoreApplication(sys.argv)
+
+    def send_blocking():
+        try:
+            requests.post(f"{api_base_url}/control", json=CONTROL_DATA, timeout=0.5)
+        except Exception:
+            pass
+
+    report("同步发送", measure(app, args.seconds, send_blocking))
+
+    command_sender = CommandSender(HttpTransport(api_base_url))
+    report("后台发送", measure(app, args.seconds,
+                           lambda: command_sender.submit("control", CONTROL_DATA)))
+    command_sender.stop()
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
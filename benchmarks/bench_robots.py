@@ -0,0 +1,93 @@
+"""多机器人基准：状态表的并发更新吞吐量，以及每个机器人一条长连接的端到端测试
+
+用法: python benchmarks/bench_robots.py [--robots 200] [--threads 8] [--seconds 3]
+"""
+import argparse
+import sys
+import threading
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import commands
+import stream_server
+from latency import percentile
+from robot_table import RobotStateTable
+from transport import StreamTransport
+
+
+def bench_table(robots, threads, seconds):
+    """每个线程负责一部分机器人，循环更新速度和舵机"""
+    table = RobotStateTable(capacity=robots)
+    robot_ids = [f"r{i}" for i in range(robots)]
+    counts = [0] * threads
+    deadline = time.perf_counter() + seconds
+
+    def worker(index):
+        mine = robot_ids[index::threads]
+        n = 0
+        while time.perf_counter() < deadline:
+            for robot_id in mine:
+                table.set_velocity(robot_id, 0.1, 0.2, 0.3)
+                table.set_servo(robot_id, n % 7, 90.0)
+                n += 2
+        counts[index] = n
+
+    workers = [threading.Thread(target=worker, args=(i,)) for i in range(threads)]
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    print(f"状态表: {robots} 个机器人 {threads} 个线程  {sum(counts) / seconds:,.0f} 次更新/秒")
+
+
+def bench_streams(robots, seconds, port):
+    """每个机器人一条长连接，以 20Hz 发送控制命令，结束后检查每个机器人的最终状态"""
+    commands.journal.configure(verbosity=0)
+    stream_server.start_in_thread("127.0.0.1", port)
+    time.sleep(0.3)
+    rtts, last_sent = [], {}
+    deadline = time.perf_counter() + seconds
+
+    def operator(robot_id):
+        transport = StreamTransport("127.0.0.1", port)
+        transport.on_message = lambda m: rtts.append(m["rtt"]) if "rtt" in m else None
+        i = 0
+        while time.perf_counter() < deadline:
+            i += 1
+            x = round(i * 0.001, 3)
+            transport.send("control", {"robot_id": robot_id, "translate": {"x": x, "y": 0},
+                                       "rotate": {"z": 0}})
+            last_sent[robot_id] = x
+            time.sleep(0.05)
+        time.sleep(0.3)
+        transport.close()
+
+    operators = [threading.Thread(target=operator, args=(f"r{i}",)) for i in range(robots)]
+    for thread in operators:
+        thread.start()
+    for thread in operators:
+        thread.join()
+
+    mismatched = [robot_id for robot_id, x in last_sent.items()
+                  if commands.robots.get(robot_id)["translate"]["x"] != x]
+    rtts.sort()
+    print(f"长连接: {robots} 个机器人  应答={len(rtts)}  最终状态不一致={len(mismatched)}  "
+          f"往返 p50={percentile(rtts, 50) * 1000:.2f}ms  p99={percentile(rtts, 99) * 1000:.2f}ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--robots", type=int, default=200)
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--seconds", type=float, default=3.0)
+    parser.add_argument("--port", type=int, default=15101)
+    args = parser.parse_args()
+
+    bench_table(args.robots, args.threads, args.seconds)
+    bench_streams(args.robots, args.seconds, args.port)
+
+
+if __name__ == "__main__":
+    main()
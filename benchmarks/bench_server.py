@@ -0,0 +1,108 @@
+"""服务器负载基准：比较 debug 与 prod 模式的吞吐量和尾延迟
+
+用法: python benchmarks/bench_server.py [--modes debug prod] [--clients 16] [--seconds 5]
+
+每种模式启动一个 server.py 子进程，N 个并发客户端（各自使用 keep-alive
+会话）持续向 /api/control 和 /api/servo 发送请求，统计每秒请求数和延迟百分位数。
+"""
+import argparse
+import os
+import signal
+import subprocess
+import sys
+import threading
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+import requests
+
+from latency import percentile
+
+CONTROL_DATA = {"translate": {"x": 0.5, "y": -0.2}, "rotate": {"z": 0.1}}
+SERVO_DATA = {"servo_id": 3, "angle": 120}
+
+
+def start_server(mode, port):
+    """启动服务器子进程并等待其就绪"""
+    process = subprocess.Popen(
+        [sys.executable, str(ROOT / "server.py"), "--mode", mode, "--host", "127.0.0.1",
+         "--port", str(port)],
+        cwd=ROOT, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+        start_new_session=True,  # 调试模式的重载器会再启动一个子进程，一起结束
+    )
+    url = f"http://127.0.0.1:{port}/api"
+    deadline = time.time() + 15
+    while time.time() < deadline:
+        try:
+            requests.post(f"{url}/control", json=CONTROL_DATA, timeout=0.5)
+            return process, url
+        except requests.RequestException:
+            time.sleep(0.2)
+    stop_server(process)
+    raise RuntimeError(f"{mode} 模式服务器启动失败")
+
+
+def stop_server(process):
+    os.killpg(process.pid, signal.SIGTERM)
+    process.wait(5)
+
+
+def run_client(url, deadline, latencies, errors):
+    session = requests.Session()
+    i = 0
+    while time.perf_counter() < deadline:
+        i += 1
+        # 每10个请求中有1个舵机请求
+        path, data = ("/servo", SERVO_DATA) if i % 10 == 0 else ("/control", CONTROL_DATA)
+        start = time.perf_counter()
+        try:
+            ok = session.post(url + path, json=data, timeout=2).status_code == 200
+        except requests.RequestException:
+            ok = False
+        if ok:
+            latencies.append(time.perf_counter() - start)
+        else:
+            errors.append(1)
+    session.close()
+
+
+def bench(mode, port, clients, seconds):
+    process, url = start_server(mode, port)
+    try:
+        latencies, errors = [], []
+        deadline = time.perf_counter() + seconds
+        threads = [threading.Thread(target=run_client, args=(url, deadline, latencies, errors))
+                   for _ in range(clients)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    finally:
+        stop_server(process)
+    latencies.sort()
+    return {
+        "rps": len(latencies) / seconds,
+        "errors": len(errors),
+        **{f"p{q}_ms": percentile(latencies, q) * 1000 for q in (50, 95, 99)},
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--modes", nargs="+", default=["debug", "prod"])
+    parser.add_argument("--clients", type=int, default=16)
+    parser.add_argument("--seconds", type=float, default=5.0)
+    parser.add_argument("--port", type=int, default=15000)
+    args = parser.parse_args()
+
+    for mode in args.modes:
+        r = bench(mode, args.port, args.clients, args.seconds)
+        print(f"{mode:<6} {r['rps']:8.0f} 请求/秒  错误={r['errors']:<5d} "
+              f"p50={r['p50_ms']:.2f}ms  p95={r['p95_ms']:.2f}ms  p99={r['p99_ms']:.2f}ms")
+
+
+if __name__ == "__main__":
+    main()
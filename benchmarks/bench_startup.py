@@ -0,0 +1,99 @@
+"""冷启动基准：从启动进程到遥控窗口第一次绘制完成的时间
+
+用法: python benchmarks/bench_startup.py [--runs 5] [--max-ms 1500]
+
+每次运行启动一个新的 Python 进程（避免模块缓存影响），子进程记录各阶段的时间:
+    导入     import main 完成
+    窗口     RemoteControlWindow() 构造完成
+    首帧     两个摇杆控件都完成第一次 paintEvent
+默认使用 offscreen 平台，无需显示器即可在CI中运行；--max-ms 设置总时间（中位数）的上限，
+超过时以非零状态退出，用于发现启动性能退化。
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+CHILD = r"""
+import json, sys, time
+t_start = time.time()
+import main
+from PySide6.QtCore import QEvent, QObject, QTimer
+from PySide6.QtWidgets import QApplication
+t_import = time.time()
+app = QApplication(sys.argv)
+window = main.RemoteControlWindow()
+t_window = time.time()
+painted = set()
+
+class FirstPaint(QObject):
+    def eventFilter(self, obj, event):
+        if event.type() == QEvent.Paint and obj not in painted:
+            painted.add(obj)
+            if len(painted) == 2:
+                # 本轮绘制完成后再记录时间
+                QTimer.singleShot(0, done)
+        return False
+
+def done():
+    print(json.dumps({"start": t_start, "import": t_import, "window": t_window, "paint": time.time()}))
+    window.close()
+    app.quit()
+
+first_paint = FirstPaint()
+window.translate_joystick.installEventFilter(first_paint)
+window.rotate_joystick.installEventFilter(first_paint)
+window.show()
+sys.exit(app.exec())
+"""
+
+
+def run_once(platform):
+    # 保留调用者的 PYTHONPATH（如依赖安装在其他目录），只把仓库目录放在最前面
+    python_path = os.pathsep.join(filter(None, [str(ROOT), os.environ.get("PYTHONPATH")]))
+    env = dict(os.environ, PYTHONPATH=python_path)
+    if platform:
+        env["QT_QPA_PLATFORM"] = platform
+    # 在其他目录中启动，确认图片不依赖当前工作目录
+    with tempfile.TemporaryDirectory() as cwd:
+        launched = time.time()
+        output = subprocess.run([sys.executable, "-c", CHILD], cwd=cwd, env=env,
+                                capture_output=True, text=True, timeout=60)
+    if output.returncode != 0:
+        raise RuntimeError(output.stderr.strip() or f"子进程退出码 {output.returncode}")
+    marks = json.loads(output.stdout.strip().splitlines()[-1])
+    return {
+        "解释器": marks["start"] - launched,
+        "导入": marks["import"] - marks["start"],
+        "窗口": marks["window"] - marks["import"],
+        "首帧绘制": marks["paint"] - marks["window"],
+        "总计": marks["paint"] - launched,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--platform", default="offscreen", help="QT_QPA_PLATFORM，空字符串表示使用默认平台")
+    parser.add_argument("--max-ms", type=float, help="总时间中位数的上限（毫秒），超过时返回非零状态")
+    args = parser.parse_args()
+
+    runs = [run_once(args.platform) for _ in range(args.runs)]
+    for phase in runs[0]:
+        values = [run[phase] * 1000 for run in runs]
+        print(f"{phase:<6} 中位数 {statistics.median(values):8.1f}ms  最小 {min(values):8.1f}ms")
+    total = statistics.median(run["总计"] for run in runs) * 1000
+    if args.max_ms is not None and total > args.max_ms:
+        print(f"启动时间 {total:.1f}ms 超过上限 {args.max_ms:.0f}ms")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+"""长连接通道本机测试：N 个操作端以固定频率推送控制命令，统计应答往返时间
+
+用法: python benchmarks/bench_stream.py [--clients 200] [--rate 20] [--seconds 5]
+"""
+import argparse
+import sys
+import threading
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import stream_server
+from commands import journal
+from transport import StreamTransport
+
+
+def run_client(port, rate, deadline, rtts, errors):
+    transport = StreamTransport("127.0.0.1", port)
+    transport.on_message = lambda message: rtts.append(message["rtt"]) if "rtt" in message else None
+    interval = 1.0 / rate
+    next_send = time.perf_counter()
+    i = 0
+    while time.perf_counter() < deadline:
+        i += 1
+        data = {"translate": {"x": 0.01 * (i % 100), "y": 0.0}, "rotate": {"z": 0.1}}
+        try:
+            transport.send("control", data)
+        except OSError:
+            errors.append(1)
+        next_send += interval
+        time.sleep(max(0.0, next_send - time.perf_counter()))
+    time.sleep(0.2)
+    transport.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--clients", type=int, default=200)
+    parser.add_argument("--rate", type=float, default=20.0, help="每个操作端的发送频率(Hz)")
+    parser.add_argument("--seconds", type=float, default=5.0)
+    parser.add_argument("--port", type=int, default=15100)
+    args = parser.parse_args()
+
+    journal.configure(verbosity=0)
+    stream_server.start_in_thread("127.0.0.1", args.port)
+    time.sleep(0.3)
+
+    rtts, errors = [], []
+    deadline = time.perf_counter() + args.seconds
+    threads = [
+        threading.Thread(target=run_client, args=(args.port, args.rate, deadline, rtts, errors))
+        for _ in range(args.clients)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    rtts = sorted(rtts)
+    if not rtts:
+        print("没有收到任何应答")
+        return
+    pick = lambda q: rtts[min(len(rtts) - 1, int(len(rtts) * q))] * 1000
+    print(f"连接数={args.clients}  应答={len(rtts)}  错误={len(errors)}  "
+          f"吞吐={len(rtts) / args.seconds:.0f} 条/秒")
+    print(f"往返时间 p50={pick(0.5):.2f}ms  p95={pick(0.95):.2f}ms  p99={pick(0.99):.2f}ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,207 @@
+"""控制 API 负载生成器：模拟 N 个操作端，统计吞吐量、错误率和延迟百分位数
+
+用法:
+    python benchmarks/loadgen.py --operators 50 --rate 20 --seconds 30 --output before.json
+    python benchmarks/loadgen.py --compare before.json after.json
+
+每个虚拟操作端使用自己的 keep-alive 会话和机器人编号，以 --rate 的频率发送
+/api/control；每隔 --drag-interval 秒模拟一次滑块拖动：以 60Hz 向 /api/servo
+逐步发送角度（--servo-mode batch 时改为 /api/servo/batch）。控制命令和拖动步骤
+在同一个循环中各按自己的节奏发送，拖动期间控制命令不会停；来不及发送的控制周期
+直接跳过（计入 skipped），不会事后补发成突发请求。
+结果以 JSON 保存，便于比较不同版本。
+"""
+import argparse
+import json
+import math
+import random
+import sys
+import threading
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import requests
+
+from latency import percentile
+from protocol import SERVO_COUNT
+
+DRAG_STEP_INTERVAL = 1 / 60  # 拖动滑块时的事件间隔（秒）
+COMPARE_KEYS = ("rps", "error_rate", "p50_ms", "p95_ms", "p99_ms")
+
+
+class Operator(threading.Thread):
+    """一个虚拟操作端"""
+
+    def __init__(self, index, args, deadline):
+        super().__init__(name=f"Operator{index}", daemon=True)
+        self.args = args
+        self.deadline = deadline
+        self.robot_id = f"op{index}"
+        self.random = random.Random(index)
+        self.results = {"control": [], "servo": []}  # 成功请求的延迟
+        self.errors = {"control": 0, "servo": 0}
+        self.skipped = 0  # 因请求太慢而跳过的控制周期
+        self.angles = [135.0] * SERVO_COUNT
+        # 当前拖动: 舵机编号、方向和剩余步数
+        self.drag_servo = 0
+        self.drag_direction = 1
+        self.drag_steps = 0
+
+    def post(self, session, endpoint, path, data):
+        start = time.perf_counter()
+        try:
+            ok = session.post(self.args.url + path, json=data, timeout=self.args.timeout).status_code == 200
+        except requests.RequestException:
+            ok = False
+        if ok:
+            self.results[endpoint].append(time.perf_counter() - start)
+        else:
+            self.errors[endpoint] += 1
+
+    def start_drag(self):
+        """开始一次滑块拖动：某个舵机连续变化若干度"""
+        self.drag_servo = self.random.randrange(SERVO_COUNT)
+        self.drag_steps = self.random.randint(20, 90)
+        self.drag_direction = self.random.choice((-1, 1))
+
+    def drag_step(self, session):
+        """拖动的一步"""
+        servo_id = self.drag_servo
+        self.angles[servo_id] = min(270.0, max(0.0, self.angles[servo_id] + self.drag_direction))
+        if self.args.servo_mode == "batch":
+            self.post(session, "servo", "/servo/batch",
+                      {"robot_id": self.robot_id, "angles": self.angles})
+        else:
+            self.post(session, "servo", "/servo",
+                      {"robot_id": self.robot_id, "servo_id": servo_id,
+                       "angle": self.angles[servo_id]})
+        self.drag_steps -= 1
+
+    def send_control(self, session, now, phase):
+        t = now + phase
+        self.post(session, "control", "/control", {
+            "robot_id": self.robot_id,
+            "translate": {"x": round(math.sin(t) * 0.5, 3), "y": round(math.cos(t) * 0.3, 3)},
+            "rotate": {"z": round(math.sin(t / 3) * 0.2, 3)},
+        })
+
+    def run(self):
+        session = requests.Session()
+        interval = 1.0 / self.args.rate
+        # 错开各操作端的起始时间，避免同步发送
+        next_control = time.perf_counter() + self.random.random() * interval
+        next_drag = time.perf_counter() + self.random.random() * self.args.drag_interval
+        next_step = math.inf  # 拖动中下一步的时间
+        phase = self.random.random() * math.tau
+        while time.perf_counter() < self.deadline:
+            now = time.perf_counter()
+            if now >= next_control:
+                self.send_control(session, now, phase)
+                next_control += interval
+                # 错过的周期直接跳过，保持原来的节奏而不补发
+                now = time.perf_counter()
+                if next_control <= now:
+                    missed = int((now - next_control) / interval) + 1
+                    self.skipped += missed
+                    next_control += missed * interval
+            elif now >= next_step:
+                self.drag_step(session)
+                if self.drag_steps > 0:
+                    next_step += DRAG_STEP_INTERVAL
+                    if next_step <= time.perf_counter():
+                        next_step = time.perf_counter() + DRAG_STEP_INTERVAL
+                else:
+                    next_step = math.inf
+                    next_drag = time.perf_counter() + self.args.drag_interval
+            elif now >= next_drag:
+                self.start_drag()
+                next_step = now
+                next_drag = math.inf
+            else:
+                time.sleep(min(next_control, next_step, next_drag) - now)
+        session.close()
+
+
+def summarize(latencies, errors, seconds):
+    latencies = sorted(latencies)
+    total = len(latencies) + errors
+    return {
+        "requests": total,
+        "rps": len(latencies) / seconds,
+        "error_rate": errors / total if total else 0.0,
+        **{f"p{q}_ms": percentile(latencies, q) * 1000 for q in (50, 95, 99)},
+    }
+
+
+def run(args):
+    deadline = time.perf_counter() + args.seconds
+    operators = [Operator(i, args, deadline) for i in range(args.operators)]
+    for operator in operators:
+        operator.start()
+    for operator in operators:
+        operator.join()
+    results = {}
+    for endpoint in ("control", "servo"):
+        latencies = [v for op in operators for v in op.results[endpoint]]
+        errors = sum(op.errors[endpoint] for op in operators)
+        results[endpoint] = summarize(latencies, errors, args.seconds)
+    results["control"]["skipped"] = sum(op.skipped for op in operators)
+    all_latencies = [v for op in operators for r in op.results.values() for v in r]
+    all_errors = sum(sum(op.errors.values()) for op in operators)
+    results["total"] = summarize(all_latencies, all_errors, args.seconds)
+    return {
+        "time": time.strftime("%Y-%m-%d %H:%M:%S"),
+        "config": {key: getattr(args, key) for key in
+                   ("url", "operators", "rate", "seconds", "drag_interval", "servo_mode")},
+        "results": results,
+    }
+
+
+def print_results(report):
+    for endpoint, r in report["results"].items():
+        print(f"{endpoint:<8} 请求={r['requests']:<7d} {r['rps']:8.1f} 请求/秒  错误率={r['error_rate']:6.2%}  "
+              f"p50={r['p50_ms']:.2f}ms  p95={r['p95_ms']:.2f}ms  p99={r['p99_ms']:.2f}ms"
+              + (f"  跳过周期={r['skipped']}" if "skipped" in r else ""))
+
+
+def compare(before_path, after_path):
+    """比较两次结果，打印各指标的变化"""
+    before = json.loads(Path(before_path).read_text())
+    after = json.loads(Path(after_path).read_text())
+    print(f"{'':<8} {'指标':<12}{'之前':>12}{'之后':>12}{'变化':>10}")
+    for endpoint, r in after["results"].items():
+        old = before["results"].get(endpoint)
+        if old is None:
+            continue
+        for key in COMPARE_KEYS:
+            change = (r[key] - old[key]) / old[key] if old[key] else 0.0
+            print(f"{endpoint:<8} {key:<12}{old[key]:>12.3f}{r[key]:>12.3f}{change:>+10.1%}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--url", default="http://127.0.0.1:5000/api")
+    parser.add_argument("--operators", type=int, default=20, help="虚拟操作端数量")
+    parser.add_argument("--rate", type=float, default=10.0, help="每个操作端的控制频率(Hz)")
+    parser.add_argument("--seconds", type=float, default=10.0)
+    parser.add_argument("--drag-interval", type=float, default=5.0, help="两次滑块拖动之间的间隔(秒)")
+    parser.add_argument("--servo-mode", choices=["single", "batch"], default="single")
+    parser.add_argument("--timeout", type=float, default=2.0)
+    parser.add_argument("--output", help="保存结果的 JSON 文件")
+    parser.add_argument("--compare", nargs=2, metavar=("BEFORE", "AFTER"), help="比较两个结果文件")
+    args = parser.parse_args()
+
+    if args.compare:
+        compare(*args.compare)
+        return
+    report = run(args)
+    print_results(report)
+    if args.output:
+        Path(args.output).write_text(json.dumps(report, indent=2, ensure_ascii=False))
+        print(f"结果已保存到 {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,269 @@
+"""HTTP API 的消息编码，客户端和服务器共用
+
+    json     application/json           兼容旧客户端，没有 Content-Type 时的默认值
+    msgpack  application/msgpack        需要 pip install msgpack
+    cbor     application/cbor           需要 pip install cbor2
+    struct   application/x-rc-struct    定长二进制，只用于请求（每种命令一个布局）
+
+请求的 Content-Type 声明请求体的编码，Accept 指定应答的编码（缺省时与请求相同；
+struct 不能编码任意应答，此时退回 JSON）。服务器不认识的 Content-Type 返回 415。
+
+struct 布局（小端）中 robot_id 为 UTF-8 编码、以 0 填充的 8 字节，数值为 float32，
+时间戳为 float64，NaN 表示该字段不存在（舵机角度为 NaN 表示保持不变）:
+    control           flags(B) seq(I) robot_id t_send(d) t_input(d) x y z(3f)
+                      flags 低两位: 0 完整状态 / 1 增量 / 2 心跳，位 2~4: 增量中包含 x/y/z
+    servo             robot_id servo_id(B) angle(f)
+    servo_batch       robot_id 角度(7f)
+    servo_trajectory  robot_id 角度(7f) duration(f) max_velocity(f)
+"""
+import importlib.util
+import json
+import math
+import struct
+from functools import cached_property
+
+from protocol import SERVO_COUNT
+from robot_table import DEFAULT_ROBOT_ID, MAX_ROBOT_ID_LEN
+
+DEFAULT_CODEC = "json"
+
+
+class CodecError(ValueError):
+    """请求体无法按声明的编码解码"""
+
+
+class UnsupportedCodec(Exception):
+    """不支持（或未安装）的编码"""
+
+
+class Codec:
+    """一种编码：name、content_type，以及 encode/decode（kind 为命令类型，只有 struct 使用）
+
+    generic 为 False 的编码只能编码请求，应答需要另选编码。
+    """
+    name = None
+    content_type = None
+    generic = True
+
+    def encode(self, message, kind=None):
+        raise NotImplementedError
+
+    def decode(self, body, kind=None):
+        raise NotImplementedError
+
+
+class JsonCodec(Codec):
+    name = "json"
+    content_type = "application/json"
+
+    def encode(self, message, kind=None):
+        return json.dumps(message, separators=(",", ":"), ensure_ascii=False).encode()
+
+    def decode(self, body, kind=None):
+        try:
+            return json.loads(body) if body else {}
+        except ValueError as e:
+            raise CodecError(f"无效的JSON: {e}") from None
+
+
+def installed(module):
+    """可选依赖是否已安装（只查找，不导入，启动时不增加导入开销）"""
+    return importlib.util.find_spec(module) is not None
+
+
+class MsgpackCodec(Codec):
+    name = "msgpack"
+    content_type = "application/msgpack"
+
+    @cached_property
+    def msgpack(self):
+        # 第一次使用时才导入
+        import msgpack
+        return msgpack
+
+    def encode(self, message, kind=None):
+        return self.msgpack.packb(message, use_bin_type=True)
+
+    def decode(self, body, kind=None):
+        try:
+            return self.msgpack.unpackb(body, raw=False)
+        except Exception as e:
+            raise CodecError(f"无效的msgpack: {e}") from None
+
+
+class CborCodec(Codec):
+    name = "cbor"
+    content_type = "application/cbor"
+
+    @cached_property
+    def cbor2(self):
+        # 第一次使用时才导入
+        import cbor2
+        return cbor2
+
+    def encode(self, message, kind=None):
+        return self.cbor2.dumps(message)
+
+    def decode(self, body, kind=None):
+        try:
+            return self.cbor2.loads(body)
+        except Exception as e:
+            raise CodecError(f"无效的CBOR: {e}") from None
+
+
+CONTROL = struct.Struct("<BI8sdd3f")
+SERVO = struct.Struct("<8sBf")
+SERVO_BATCH = struct.Struct(f"<8s{SERVO_COUNT}f")
+SERVO_TRAJECTORY = struct.Struct(f"<8s{SERVO_COUNT}f2f")
+
+MODE_FULL, MODE_DELTA, MODE_HEARTBEAT = 0, 1, 2
+AXES = (("translate", "x"), ("translate", "y"), ("rotate", "z"))
+
+
+def _optional(value):
+    return math.nan if value is None else value
+
+
+def _present(value):
+    return None if math.isnan(value) else value
+
+
+def _robot_id(message):
+    raw = message.get("robot_id", DEFAULT_ROBOT_ID).encode()
+    if len(raw) > MAX_ROBOT_ID_LEN:
+        # struct 的 8s 会静默截断
+        raise CodecError(f"机器人编号超过 {MAX_ROBOT_ID_LEN} 字节: {raw!r}")
+    return raw
+
+
+def _decode_robot_id(raw):
+    try:
+        return raw.rstrip(b"\0").decode()
+    except UnicodeDecodeError:
+        raise CodecError(f"无效的机器人编号: {raw!r}") from None
+
+
+class StructCodec(Codec):
+    """每种命令一个定长布局，比 JSON 小且编解码更快，只能编码已知的命令"""
+    name = "struct"
+    content_type = "application/x-rc-struct"
+    generic = False
+
+    def encode(self, message, kind=None):
+        try:
+            if kind == "control":
+                return self._encode_control(message)
+            if kind == "servo":
+                return SERVO.pack(_robot_id(message), message["servo_id"], message["angle"])
+            if kind == "servo_batch":
+                return SERVO_BATCH.pack(_robot_id(message), *map(_optional, message["angles"]))
+            if kind == "servo_trajectory":
+                return SERVO_TRAJECTORY.pack(_robot_id(message), *map(_optional, message["angles"]),
+                                             _optional(message.get("duration")),
+                                             _optional(message.get("max_velocity")))
+        except (KeyError, TypeError, AttributeError, struct.error) as e:
+            raise CodecError(f"无法用 struct 编码 {kind}: {e}") from None
+        raise CodecError(f"struct 编码不支持 {kind}")
+
+    def _encode_control(self, message):
+        if "hb" in message:
+            flags, values = MODE_HEARTBEAT, (0.0, 0.0, 0.0)
+        elif "delta" in message:
+            flags, values = MODE_DELTA, []
+            for bit, (group, axis) in enumerate(AXES):
+                value = message["delta"].get(group, {}).get(axis)
+                if value is not None:
+                    flags |= 4 << bit
+                values.append(value or 0.0)
+        else:
+            flags = MODE_FULL
+            values = [message[group][axis] for group, axis in AXES]
+        return CONTROL.pack(flags, message.get("seq", 0), _robot_id(message),
+                            _optional(message.get("t_send")), _optional(message.get("t_input")), *values)
+
+    def decode(self, body, kind=None):
+        try:
+            if kind == "control":
+                return self._decode_control(body)
+            if kind == "servo":
+                robot_id, servo_id, angle = SERVO.unpack(body)
+                return {"robot_id": _decode_robot_id(robot_id), "servo_id": servo_id, "angle": angle}
+            if kind == "servo_batch":
+                robot_id, *angles = SERVO_BATCH.unpack(body)
+                return {"robot_id": _decode_robot_id(robot_id), "angles": angles}
+            if kind == "servo_trajectory":
+                robot_id, *angles, duration, max_velocity = SERVO_TRAJECTORY.unpack(body)
+                return {"robot_id": _decode_robot_id(robot_id), "angles": angles,
+                        "duration": _present(duration), "max_velocity": _present(max_velocity)}
+        except struct.error as e:
+            raise CodecError(f"无效的 struct {kind}: {e}") from None
+        raise CodecError(f"struct 编码不支持 {kind}")
+
+    def _decode_control(self, body):
+        flags, seq, robot_id, t_send, t_input, *values = CONTROL.unpack(body)
+        mode = flags & 3
+        message = {"robot_id": _decode_robot_id(robot_id)}
+        if seq:
+            message["seq"] = seq
+        if mode == MODE_HEARTBEAT:
+            message["hb"] = 1
+        elif mode == MODE_DELTA:
+            delta = {}
+            for bit, ((group, axis), value) in enumerate(zip(AXES, values)):
+                if flags & (4 << bit):
+                    delta.setdefault(group, {})[axis] = value
+            message["delta"] = delta
+        else:
+            message["translate"] = {"x": values[0], "y": values[1]}
+            message["rotate"] = {"z": values[2]}
+        for name, value in (("t_send", t_send), ("t_input", t_input)):
+            if not math.isnan(value):
+                message[name] = value
+        return message
+
+
+CODECS = {codec.name: codec for codec in (JsonCodec(), StructCodec())}
+if installed("msgpack"):
+    CODECS["msgpack"] = MsgpackCodec()
+if installed("cbor2"):
+    CODECS["cbor"] = CborCodec()
+BY_CONTENT_TYPE = {codec.content_type: codec for codec in CODECS.values()}
+
+INSTALL_HINTS = {"msgpack": "pip install msgpack", "cbor": "pip install cbor2"}
+
+
+def get_codec(name):
+    """按名称返回编码，不支持或未安装时抛出 UnsupportedCodec"""
+    codec = CODECS.get(name)
+    if codec is None:
+        hint = INSTALL_HINTS.get(name)
+        raise UnsupportedCodec(f"未安装 {name} 编码（{hint}）" if hint else f"未知的编码: {name}")
+    return codec
+
+
+def codec_for(content_type):
+    """按 Content-Type 返回编码，没有 Content-Type 时为 JSON，不支持时抛出 UnsupportedCodec"""
+    if not content_type:
+        return CODECS[DEFAULT_CODEC]
+    codec = BY_CONTENT_TYPE.get(content_type.split(";", 1)[0].strip().lower())
+    if codec is None:
+        raise UnsupportedCodec(f"不支持的 Content-Type: {content_type}")
+    return codec
+
+
+def response_codec(accept, request_codec):
+    """按 Accept 选择应答的编码：第一个支持的通用编码，否则与请求相同（struct 时为 JSON）"""
+    for item in (accept or "").split(","):
+        codec = BY_CONTENT_TYPE.get(item.split(";", 1)[0].strip().lower())
+        if codec is not None and codec.generic:
+            return codec
+    return request_codec if request_codec.generic else CODECS[DEFAULT_CODEC]
+
+
+def accept_header(codec):
+    """客户端请求使用 codec 时的 Accept 头"""
+    if codec.generic:
+        return codec.content_type
+    # struct 请求的应答优先使用已安装的二进制编码
+    preferred = CODECS.get("msgpack") or CODECS.get("cbor") or CODECS[DEFAULT_CODEC]
+    return f"{preferred.content_type}, application/json;q=0.5"
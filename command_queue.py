@@ -0,0 +1,59 @@
+"""发送队列：同类命令只保留最新值，过期的命令直接丢弃"""
+import threading
+import time
+from collections import OrderedDict
+
+
+class LatestValueQueue:
+    """按命令类型合并的发送队列
+
+    每种命令类型最多排队一条，新命令替换尚未发送的旧命令。
+    允许丢弃的命令在队列中等待超过 max_age 秒后不再发送（例如速度命令），
+    不允许丢弃的命令（零速停止、舵机位置）总会被发送。
+    """
+
+    def __init__(self, max_age=0.3):
+        self.max_age = max_age
+        self._pending = OrderedDict()  # kind -> (data, tag, 入队时间, 是否可丢弃)
+        self._cond = threading.Condition()
+        self._closed = False
+        self.enqueued = 0
+        self.replaced = 0
+        self.expired = 0
+
+    def put(self, kind, data, tag="", droppable=True):
+        """放入一条命令，替换同类型的未发送命令"""
+        with self._cond:
+            if self._pending.pop(kind, None) is not None:
+                self.replaced += 1
+            self._pending[kind] = (data, tag, time.monotonic(), droppable)
+            self.enqueued += 1
+            self._cond.notify()
+
+    def get(self):
+        """取出最早的一条有效命令，队列为空时阻塞；关闭后只取出剩余的不可丢弃命令，取完后返回 None
+
+        返回 (kind, data, tag, 排队时间)
+        """
+        with self._cond:
+            while True:
+                while not self._pending and not self._closed:
+                    self._cond.wait()
+                if not self._pending:
+                    return None
+                kind, (data, tag, enqueued_at, droppable) = self._pending.popitem(last=False)
+                age = time.monotonic() - enqueued_at
+                # 关闭时丢弃速度等可丢弃命令，但零速停止和舵机位置仍要送达
+                if droppable and (self._closed or age > self.max_age):
+                    self.expired += 1
+                    continue
+                return kind, data, tag, age
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+    def depth(self):
+        with self._cond:
+            return len(self._pending)
@@ -0,0 +1,108 @@
+"""服务器端命令处理（与传输方式无关，HTTP/UDP/长连接共用）
+
+命令按 robot_id 路由到各自机器人的状态；没有 robot_id 的命令属于默认机器人。
+"""
+import time
+
+from delta import ControlState
+from journal import KIND_CONTROL, KIND_SERVO, KIND_SERVO_BATCH, KIND_SERVO_TRAJECTORY, CommandJournal
+from robot_table import (DEFAULT_ROBOT_ID, RobotStateTable, RobotTableFull, check_angle, check_angles, check_robot_id,
+                         check_servo_id, check_velocity)
+from state_feed import StateFeed
+from trajectory import TrajectoryEngine
+
+# 所有收到的命令都记入日志；控制台输出和写盘由日志的后台线程完成
+journal = CommandJournal()
+# 每个机器人最近一次下发的指令状态
+robots = RobotStateTable()
+# 指令状态的快照和订阅（观察者共用一份编码结果）
+state_feed = StateFeed(robots)
+
+
+def apply_setpoint(robot_id, angles):
+    """写入轨迹插值生成的舵机设定值"""
+    robots.set_servos(robot_id, angles)
+    state_feed.notify()
+
+
+# 舵机轨迹插值，设定值写入状态表
+trajectories = TrajectoryEngine(robots, apply_setpoint)
+# 每个机器人的增量编码状态（HTTP 通道）
+control_states = {}
+
+
+def robot_id_of(data):
+    """取出命令中的 robot_id 并检查，不合法时抛出 ValueError"""
+    return check_robot_id(data.get('robot_id', DEFAULT_ROBOT_ID))
+
+
+def apply_control(states, robot_id, data):
+    """把控制消息（完整状态、增量或心跳）应用到 states[robot_id]，状态变化时写入状态表，返回是否变化
+
+    只有通过检查并写入状态表之后才保存新机器人的状态（并占用状态表的槽位），不合法的命令
+    不改变已有的状态。抛出 DeltaOutOfSync、ValueError 或 RobotTableFull。
+    """
+    state = states.get(robot_id)
+    if state is None:
+        state = ControlState()
+    saved = (dict(state.translate), dict(state.rotate), state.seq)
+    try:
+        changed = state.apply(data)
+        if changed:
+            process_control(robot_id, state.translate, state.rotate)
+    except (ValueError, RobotTableFull):
+        # 速度超出范围等：恢复原来的状态，之后的增量仍然基于最后一次有效的状态
+        state.translate, state.rotate, state.seq = saved
+        raise
+    states.setdefault(robot_id, state)
+    return changed
+
+
+def process_control(robot_id, translate, rotate):
+    """处理控制数据，数值不合法时抛出 ValueError（不写入状态和日志）"""
+    x, y, z = check_velocity(translate.get('x', 0), translate.get('y', 0), rotate.get('z', 0))
+    robots.set_velocity(robot_id, x, y, z)
+    state_feed.notify()
+    journal.record(robot_id, KIND_CONTROL, (x, y, z))
+
+    # 可以在这里将控制数据转发给机器人或其他人
+
+
+def process_servo(robot_id, servo_id, angle):
+    """处理舵机数据，直接命令会取消正在进行的轨迹（命令不合法时不取消）"""
+    servo_id = check_servo_id(servo_id)
+    angle = check_angle(angle)
+    trajectories.cancel(robot_id)
+    robots.set_servo(robot_id, servo_id, angle)
+    state_feed.notify()
+    journal.record(robot_id, KIND_SERVO, (angle,), servo_id)
+
+
+def process_servo_batch(robot_id, angles):
+    """处理全部舵机的角度快照，None/NaN 表示保持不变"""
+    angles = check_angles(angles)
+    trajectories.cancel(robot_id)
+    robots.set_servos(robot_id, angles)
+    state_feed.notify()
+    journal.record(robot_id, KIND_SERVO_BATCH, angles)
+
+
+def process_servo_trajectory(robot_id, angles, duration=None, max_velocity=None):
+    """开始一次舵机动作（目标角度 + 时长或速度上限），返回动作时长（秒）"""
+    angles = check_angles(angles)
+    duration = trajectories.start_motion(robot_id, angles, duration, max_velocity)
+    journal.record(robot_id, KIND_SERVO_TRAJECTORY, angles)
+    return duration
+
+
+def echo_timing(data, t_recv):
+    """回显客户端的时间戳，并附加服务器收到(t_recv)和处理完成(t_handled)的时间
+
+    命令中没有 t_send 时返回 None。
+    """
+    if "t_send" not in data:
+        return None
+    timing = {"t_send": data["t_send"], "t_recv": t_recv, "t_handled": time.time()}
+    if "t_input" in data:
+        timing["t_input"] = data["t_input"]
+    return timing
@@ -0,0 +1,387 @@
+"""无界面的控制核心：控制状态、摇杆响应曲线、发送队列、增量编码、频率调节、录制和遥测
+
+不依赖Qt，脚本、自动测试台和CI可以直接使用；main.py 的窗口只是它上面的一层视图。
+
+命令行用法:
+    python control_core.py --translate 0.5 0 --seconds 3            # 以 0.5m/s 前进3秒后停止
+    python control_core.py --rotate 0.3 --transport stream --rate 50
+    python control_core.py --script keyframes.json --seconds 10      # 按关键帧生成摇杆输入
+    python control_core.py --servos 135 135 135 135 135 135 90 --seconds 0.5
+    python control_core.py --servos 90 90 90 90 90 90 90 --max-velocity 60   # 服务器插值
+"""
+import argparse
+import queue
+import time
+
+from codec import CODECS, DEFAULT_CODEC, INSTALL_HINTS
+from delta import DeltaEncoder
+from latency import LatencyTracker
+from protocol import SERVO_COUNT
+from rate_control import AdaptiveRateController
+from recorder import FRAME_CONTROL, FRAME_SERVO_BATCH, FRAME_SERVO_TRAJECTORY, ControlRecorder
+from response_curve import CLAMP_CIRCLE, ResponseCurve
+from robot_table import DEFAULT_ROBOT_ID
+from telemetry import SimulatedRobot, TelemetryHistory
+from transport import UNCHANGED, SendWorker, create_transport
+
+DEFAULT_API_BASE_URL = "http://127.0.0.1:5000/api"
+MAX_TRANSLATE_SPEED = 1.5  # 平移速度上限 (m/s)
+MAX_ROTATE_SPEED = 0.769  # 旋转速度上限 (rad/s)
+
+
+class QueuedSender:
+    """无Qt时使用的发送器：后台线程发送，结果排队，由 ControlCore.poll() 在调用线程中处理"""
+
+    def __init__(self, transport, max_age=0.3):
+        self.events = queue.SimpleQueue()
+        if hasattr(transport, "on_message"):
+            transport.on_message = lambda message: self.events.put(("message", message))
+        self.worker = SendWorker(transport, lambda *result: self.events.put(("result", result)), max_age)
+        self.worker.start()
+
+    def submit(self, kind, data, tag="", droppable=True):
+        self.worker.submit(kind, data, tag, droppable)
+
+    def stats(self):
+        return self.worker.stats()
+
+    def stop(self):
+        self.worker.stop()
+
+    def drain(self):
+        """取出所有已到达的 (类型, 内容)"""
+        while True:
+            try:
+                yield self.events.get_nowait()
+            except queue.Empty:
+                return
+
+
+class ControlCore:
+    """机器人控制的状态与发送逻辑
+
+    sender_factory(transport, max_age) 返回带 submit/stats/stop 的发送器，默认为 QueuedSender。
+    发送结果和服务器消息需要交给 handle_result / handle_message：使用 QueuedSender 时由
+    poll() 完成，GUI 中由 Qt 信号在GUI线程中调用。
+    """
+
+    def __init__(self, api_base_url=DEFAULT_API_BASE_URL, transport="http", robot_id=DEFAULT_ROBOT_ID,
+                 udp_port=5005, stream_port=5100, dead_band=0.01, heartbeat_interval=1.0,
+                 rate_hz=10, adaptive_rate=False, max_age=0.3, record_path=None,
+                 max_translate_speed=MAX_TRANSLATE_SPEED, max_rotate_speed=MAX_ROTATE_SPEED,
+                 dead_zone=0.05, expo=0.3, clamp=CLAMP_CIRCLE, send_enabled=True, sender_factory=None,
+                 telemetry_capacity=2048, codec=DEFAULT_CODEC):
+        self.robot_id = robot_id
+        self.transport_kind = transport
+        self.send_enabled = send_enabled
+
+        # 控制状态
+        self.translate_x = 0
+        self.translate_y = 0
+        self.rotate_x = 0
+        self.rotate_z = 0
+        # 舵机角度快照，None 表示操作者还没有设置过（不会发送给机器人）
+        self.servo_angles = [None] * SERVO_COUNT
+        # 尚未随命令发出的最近一次输入时间，只附加在输入之后的第一条控制命令上用于延迟统计；
+        # 摇杆保持不动时重复发送的命令不带 t_input，否则“输入→发送”测到的是保持的时长
+        self.pending_input_time = None
+        self.robot_speed_changed = False
+
+        # 摇杆坐标 -> 速度的响应曲线查找表，最大速度变化时重建
+        self.translate_curve = ResponseCurve(max_translate_speed, dead_zone, expo, clamp)
+        self.rotate_curve = ResponseCurve(max_rotate_speed, dead_zone, expo, clamp)
+
+        # 命令录制（内存映射文件，开销很小）
+        self.recorder = ControlRecorder(record_path) if record_path else None
+        # 实际的录制文件（record_path 已存在时带有时间后缀，不覆盖之前的录制）
+        self.recorder_path = self.recorder.path if self.recorder else None
+        self.rate_controller = AdaptiveRateController(rate_hz, adaptive_rate)
+        self.latency_tracker = LatencyTracker()
+        # 机器人遥测（服务器推送或本地替身生成），每个序列一个定长环形缓冲区
+        self.telemetry = TelemetryHistory(telemetry_capacity)
+        self.simulator = None
+
+        # 后台发送器：网络请求不在调用线程中执行
+        delta_encoder = None
+        if dead_band is not None:
+            delta_encoder = DeltaEncoder(dead_band, heartbeat_interval)
+        link = create_transport(transport, api_base_url, udp_port, stream_port, delta_encoder, codec)
+        self.sender = (sender_factory or QueuedSender)(link, max_age)
+
+    @property
+    def max_translate_speed(self):
+        return self.translate_curve.max_value
+
+    @property
+    def max_rotate_speed(self):
+        return self.rotate_curve.max_value
+
+    def set_max_translate_speed(self, value):
+        self.translate_curve.set_max(value)
+
+    def set_max_rotate_speed(self, value):
+        self.rotate_curve.set_max(value)
+
+    def set_translate_input(self, x, y):
+        """平移摇杆输入（-90~90 的右手坐标），返回映射后的 (x, y) 速度"""
+        self.pending_input_time = time.time()
+        self.translate_x, self.translate_y = self.translate_curve.lookup(x, y)
+        return self.translate_x, self.translate_y
+
+    def set_rotate_input(self, x, y):
+        """旋转摇杆输入，返回映射后的 (x, z) 角速度"""
+        self.pending_input_time = time.time()
+        self.rotate_x, self.rotate_z = self.rotate_curve.lookup(x, y)
+        return self.rotate_x, self.rotate_z
+
+    def set_velocity(self, x=0.0, y=0.0, z=0.0):
+        """直接设置速度（不经过响应曲线），超出上限时截断"""
+        self.pending_input_time = time.time()
+        limit, rotate_limit = self.max_translate_speed, self.max_rotate_speed
+        self.translate_x = round(max(-limit, min(limit, x)), 3)
+        self.translate_y = round(max(-limit, min(limit, y)), 3)
+        self.rotate_z = round(max(-rotate_limit, min(rotate_limit, z)), 3)
+
+    def set_servo(self, servo_id, angle):
+        """记录舵机角度快照，由 send_servo_batch() 合并发送"""
+        self.servo_angles[servo_id] = angle
+
+    def tick(self):
+        """控制周期：有速度时发送控制命令，速度回零后发送一次零速命令
+
+        UDP 没有应答，丢失的零速帧无法被发现，因此静止时也每个周期发送完整状态（零速），
+        服务器在收不到帧时自动停车（见 server.UDP_COMMAND_TIMEOUT）。
+        """
+        if not self.send_enabled:
+            return
+        if self.translate_x != 0 or self.translate_y != 0 or self.rotate_x != 0 or self.rotate_z != 0:
+            self.robot_speed_changed = True
+            self._submit_control(self.translate_x, self.translate_y, self.rotate_z)
+        elif self.transport_kind == "udp":
+            self._submit_control(0, 0, 0, "zero" if self.robot_speed_changed else "")
+            self.robot_speed_changed = False
+        elif self.robot_speed_changed:
+            # 停止命令不能因过期被丢弃
+            self._submit_control(0, 0, 0, "zero", droppable=False)
+            self.robot_speed_changed = False
+
+    def _submit_control(self, x, y, z, tag="", droppable=True):
+        data = {
+            "translate": {"x": x, "y": y},
+            # 旋转只管z轴，正为左转，负为右转
+            "rotate": {"z": z},
+            "robot_id": self.robot_id,
+        }
+        if self.pending_input_time is not None:
+            data["t_input"] = self.pending_input_time
+            self.pending_input_time = None
+        self.record_command(FRAME_CONTROL, x, y, z)
+        self.sender.submit("control", data, tag, droppable)
+
+    def send_servo_batch(self):
+        """把全部舵机的最新角度合并为一次批量更新发送"""
+        if not self.send_enabled:
+            return
+        if all(a is None for a in self.servo_angles):
+            return
+        data = {"robot_id": self.robot_id, "angles": list(self.servo_angles)}
+        self.record_command(FRAME_SERVO_BATCH, angles=data["angles"])
+        # 舵机角度是位置命令，晚到也必须送达
+        self.sender.submit("servo_batch", data, droppable=False)
+
+    def send_servo_trajectory(self, duration=None, max_velocity=None):
+        """让服务器在 duration 秒内（或按速度上限，度/秒）平滑移动到当前的舵机角度快照"""
+        if not self.send_enabled:
+            return
+        if all(a is None for a in self.servo_angles):
+            return
+        data = {"robot_id": self.robot_id, "angles": list(self.servo_angles)}
+        if duration is not None:
+            data["duration"] = duration
+        if max_velocity is not None:
+            data["max_velocity"] = max_velocity
+        self.record_command(FRAME_SERVO_TRAJECTORY, angles=data["angles"], duration=duration,
+                            max_velocity=max_velocity)
+        self.sender.submit("servo_trajectory", data, droppable=False)
+
+    def subscribe_telemetry(self):
+        """请求服务器推送该机器人的遥测（只有长连接支持），返回是否已请求"""
+        if not self.send_enabled or self.transport_kind != "stream":
+            return False
+        self.sender.submit("subscribe_telemetry", {"robot_id": self.robot_id}, droppable=False)
+        return True
+
+    def simulate_telemetry(self, dt):
+        """本地替身机器人（TELEMETRY_SOURCE = "local"）按当前指令运动 dt 秒并记录遥测"""
+        if self.simulator is None:
+            self.simulator = SimulatedRobot(self.robot_id, self.max_translate_speed)
+        message = self.simulator.step(dt, self.translate_x, self.translate_y, self.rotate_z,
+                                      self.servo_angles)
+        self.telemetry.add(message)
+        return message
+
+    def record_command(self, kind, *args, **kwargs):
+        """把发出的命令按类型写入录制文件（参数见 ControlRecorder.record）"""
+        if self.recorder is not None:
+            self.recorder.record(time.time(), kind, *args, **kwargs)
+
+    def handle_result(self, kind, tag, ok, detail, elapsed, timing):
+        """处理一次发送结果：延迟统计和频率调节的样本
+
+        所有传输方式的发送失败都计入错误率。成功时 HTTP 以请求耗时作为往返时间；长连接的
+        往返时间来自服务器应答（见 handle_message）；UDP 没有应答，以本地发送耗时代替，
+        因此 UDP 只按错误率和本地发送拥塞调节。
+        """
+        if timing is not None:
+            self.latency_tracker.record(timing)
+        if kind != "control" or detail == UNCHANGED:
+            return
+        if not ok or self.transport_kind != "stream":
+            self.rate_controller.record(elapsed, ok)
+
+    def handle_message(self, message):
+        """处理长连接上服务器发回的消息"""
+        if message.get("type") == "ack":
+            if "rtt" in message:
+                self.rate_controller.record(message["rtt"], True)
+            if "timing" in message:
+                self.latency_tracker.record(message["timing"])
+        elif message.get("type") in ("error", "resync"):
+            # 服务器拒绝的命令计入错误率
+            self.rate_controller.record(message.get("rtt", 0.0), False)
+        elif message.get("type") == "telemetry" and message.get("robot_id") == self.robot_id:
+            self.telemetry.add(message)
+
+    def poll(self):
+        """处理 QueuedSender 排队的结果和消息，返回处理的数量"""
+        count = 0
+        for event, payload in self.sender.drain():
+            if event == "result":
+                self.handle_result(*payload)
+            else:
+                self.handle_message(payload)
+            count += 1
+        return count
+
+    def update_rate(self):
+        """结束一个频率评估周期，返回频率是否变化"""
+        rate_hz = self.rate_controller.rate_hz
+        self.rate_controller.update()
+        return self.rate_controller.rate_hz != rate_hz
+
+    def stats(self):
+        """发送队列计数器"""
+        return self.sender.stats()
+
+    def flush(self, timeout=1.0):
+        """等待已提交的命令全部发送完成（或超时），返回是否完成"""
+        deadline = time.perf_counter() + timeout
+        while time.perf_counter() < deadline:
+            s = self.sender.stats()
+            if s["sent"] + s["failed"] + s["skipped"] >= s["enqueued"] - s["replaced"] - s["expired"]:
+                return True
+            time.sleep(0.005)
+        return False
+
+    def close(self):
+        """停止发送线程并关闭录制文件"""
+        self.sender.stop()
+        if self.recorder is not None:
+            self.recorder.close()
+            self.recorder = None
+
+    def run(self, seconds, samples=None):
+        """以当前控制频率运行 seconds 秒，结束时发送零速命令
+
+        samples 为可选的 queue.SimpleQueue，元素为 (目标, x, y) 摇杆输入（如来自输入后端的线程）。
+        """
+        start = next_tick = next_update = time.perf_counter()
+        while True:
+            now = time.perf_counter()
+            if now - start >= seconds:
+                break
+            while samples is not None and not samples.empty():
+                target, x, y = samples.get_nowait()
+                if target == "translate":
+                    self.set_translate_input(x, y)
+                else:
+                    self.set_rotate_input(x, y)
+            self.poll()
+            self.tick()
+            if now >= next_update:
+                self.update_rate()
+                next_update = now + 1.0
+            next_tick += 1.0 / self.rate_controller.rate_hz
+            time.sleep(max(0.0, next_tick - time.perf_counter()))
+        self.stop_robot()
+
+    def stop_robot(self):
+        """所有轴置零，发送不可丢弃的零速命令并等待发送完成"""
+        self.set_velocity(0, 0, 0)
+        self.rotate_x = 0
+        if self.send_enabled:
+            self._submit_control(0, 0, 0, "zero", droppable=False)
+            self.robot_speed_changed = False
+        self.flush()
+        self.poll()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="无界面的机器人控制")
+    parser.add_argument("--url", default=DEFAULT_API_BASE_URL, help="服务器 API 地址")
+    parser.add_argument("--transport", choices=["http", "udp", "stream"], default="http")
+    parser.add_argument("--udp-port", type=int, default=5005)
+    parser.add_argument("--stream-port", type=int, default=5100)
+    parser.add_argument("--codec", choices=sorted(set(CODECS) | set(INSTALL_HINTS)), default=DEFAULT_CODEC,
+                        help="HTTP 请求体的编码（见 codec.py）")
+    parser.add_argument("--robot-id", default=DEFAULT_ROBOT_ID)
+    parser.add_argument("--rate", type=int, default=10, help="控制频率(Hz)")
+    parser.add_argument("--adaptive", action="store_true", help="根据往返时间自动调整控制频率")
+    parser.add_argument("--translate", type=float, nargs=2, metavar=("X", "Y"), default=(0.0, 0.0),
+                        help="平移速度 (m/s)")
+    parser.add_argument("--rotate", type=float, default=0.0, help="绕Z轴角速度 (rad/s)")
+    parser.add_argument("--servos", type=float, nargs=SERVO_COUNT, metavar="ANGLE", help="舵机角度")
+    parser.add_argument("--duration", type=float, help="舵机动作时长（秒），由服务器插值")
+    parser.add_argument("--max-velocity", type=float, help="舵机速度上限（度/秒），由服务器插值")
+    parser.add_argument("--script", help="输入关键帧 JSON 文件（见 input_backends.ScriptedBackend）")
+    parser.add_argument("--seconds", type=float, default=3.0, help="运行时间，结束时发送零速命令")
+    parser.add_argument("--record", help="录制发出的命令到文件")
+    args = parser.parse_args()
+
+    core = ControlCore(args.url, args.transport, args.robot_id, args.udp_port, args.stream_port,
+                       rate_hz=args.rate, adaptive_rate=args.adaptive, record_path=args.record,
+                       codec=args.codec)
+    backend = samples = None
+    if args.script:
+        from input_backends import ScriptedBackend, load_script
+        samples = queue.SimpleQueue()
+        backend = ScriptedBackend(load_script(args.script))
+        backend.start(lambda target, x, y: samples.put((target, x, y)))
+    try:
+        if args.servos:
+            for i, angle in enumerate(args.servos):
+                core.set_servo(i, angle)
+            if args.duration is not None or args.max_velocity is not None:
+                core.send_servo_trajectory(args.duration, args.max_velocity)
+            else:
+                core.send_servo_batch()
+        core.set_velocity(*args.translate, args.rotate)
+        core.run(args.seconds, samples)
+    except KeyboardInterrupt:
+        core.stop_robot()
+    finally:
+        if backend is not None:
+            backend.stop()
+        core.close()
+
+    if args.record:
+        print(f"命令已录制到 {core.recorder_path}")
+    stats = core.stats()
+    print(f"发送 {stats['sent']} 条，失败 {stats['failed']} 条，过期 {stats['expired']} 条，"
+          f"未变化跳过 {stats['skipped']} 条，"
+          f"平均发送耗时 {stats['avg_send_ms']:.1f}ms，最终频率 {core.rate_controller.rate_hz}Hz")
+    print(core.latency_tracker.format_summary())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+"""控制命令的死区/增量编码（客户端编码，服务器端重建完整状态）
+
+消息格式（均带递增的 seq）:
+    完整状态: {"seq": n, "translate": {"x", "y"}, "rotate": {"z"}}
+    增量:     {"seq": n, "delta": {"translate": {"x": ...}, "rotate": {"z": ...}}}
+    心跳:     {"seq": n, "hb": 1}   表示“无变化”
+不带 seq 的完整状态消息（旧客户端）同样可以被接受。
+"""
+import math
+import time
+
+# (分组, 轴) 列表，对应 {"translate": {"x", "y"}, "rotate": {"z"}}
+AXES = (("translate", "x"), ("translate", "y"), ("rotate", "z"))
+
+
+class DeltaOutOfSync(Exception):
+    """服务器无法应用增量（缺少基准状态或序号不连续），需要完整状态"""
+
+
+class DeltaEncoder:
+    """客户端编码器：只发送超过死区的变化，无变化时按较低频率发送心跳"""
+
+    def __init__(self, dead_band=0.01, heartbeat_interval=1.0):
+        self.dead_band = dead_band
+        self.heartbeat_interval = heartbeat_interval
+        self.seq = 0
+        self.reset()
+
+    def reset(self):
+        """丢弃已发送状态，下一条消息发送完整状态（发送失败后调用）"""
+        self.sent = None
+        self.last_send = 0.0
+
+    def encode(self, data, now=None):
+        """编码一条控制命令，无需发送时返回 None"""
+        now = time.monotonic() if now is None else now
+        values = {(group, axis): data[group][axis] for group, axis in AXES}
+        if self.sent is None or not any(values.values()):
+            # 首条消息和停止命令总是发送完整状态
+            message = {group: dict(data[group]) for group in ("translate", "rotate")}
+            self.sent = values
+        else:
+            delta = {}
+            for key, value in values.items():
+                last = self.sent[key]
+                if abs(value - last) > self.dead_band or (value == 0) != (last == 0):
+                    delta.setdefault(key[0], {})[key[1]] = value
+                    self.sent[key] = value
+            if delta:
+                message = {"delta": delta}
+            elif now - self.last_send >= self.heartbeat_interval:
+                message = {"hb": 1}
+            else:
+                return None
+        self.seq += 1
+        message["seq"] = self.seq
+        self.last_send = now
+        return message
+
+
+def _group(message, name):
+    """取出消息中的分组（translate/rotate/delta），不是对象时抛出 ValueError"""
+    group = message.get(name, {})
+    if not isinstance(group, dict):
+        raise ValueError(f"{name} 必须是对象: {group!r}")
+    return group
+
+
+def axis_value(value):
+    """速度分量转换为有限的 float，不合法时抛出 ValueError"""
+    try:
+        value = float(value)
+    except (TypeError, ValueError):
+        raise ValueError(f"无效的速度: {value!r}") from None
+    if not math.isfinite(value):
+        raise ValueError(f"无效的速度: {value!r}")
+    return value
+
+
+class ControlState:
+    """服务器端由完整状态/增量/心跳重建的控制状态"""
+
+    def __init__(self):
+        self.translate = {"x": 0, "y": 0}
+        self.rotate = {"z": 0}
+        self.seq = None
+        self.updated = time.monotonic()
+
+    def apply(self, message):
+        """应用一条消息，返回状态是否发生变化
+
+        增量或心跳无法应用时抛出 DeltaOutOfSync，格式或数值不合法时抛出 ValueError（状态不变）。
+        """
+        seq = message.get("seq")
+        if "delta" in message or "hb" in message:
+            delta = _group(message, "delta")
+            updates = []
+            for group, axis in AXES:
+                values = _group(delta, group)
+                if axis in values:
+                    updates.append((group, axis, axis_value(values[axis])))
+            if self.seq is None or seq != self.seq + 1:
+                raise DeltaOutOfSync(f"期望序号 {None if self.seq is None else self.seq + 1}，收到 {seq}")
+            self.seq = seq
+            self.updated = time.monotonic()
+            for group, axis, value in updates:
+                getattr(self, group)[axis] = value
+            return "delta" in message
+        translate = _group(message, "translate")
+        rotate = _group(message, "rotate")
+        self.translate = {"x": axis_value(translate.get("x", 0)), "y": axis_value(translate.get("y", 0))}
+        self.rotate = {"z": axis_value(rotate.get("z", 0))}
+        self.seq = seq
+        self.updated = time.monotonic()
+        return True
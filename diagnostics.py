@@ -0,0 +1,145 @@
+"""GUI 热点路径的性能诊断：事件循环延迟、绘制和处理函数耗时
+
+Profiler 收集各项耗时样本（滚动窗口），可以同时写入 CSV 文件离线分析；
+DiagnosticsOverlay 是叠加在窗口左上角的面板，定时刷新各项的 p50/p95/最大值。
+未启用时被包装的函数只多一次属性判断。
+"""
+import csv
+import time
+from collections import deque
+
+from PySide6.QtCore import Qt, QTimer
+from PySide6.QtWidgets import QLabel
+
+from latency import percentile
+
+LAG_INTERVAL_MS = 10  # 测量事件循环延迟的定时器间隔
+
+
+class Profiler:
+    """按名称保存最近 window 个耗时样本（秒）"""
+
+    def __init__(self, window=600):
+        self.enabled = False
+        self.window = window
+        self.samples = {}  # 名称 -> deque
+        self.stream_file = None
+        self.stream_writer = None
+
+    def record(self, name, seconds):
+        samples = self.samples.get(name)
+        if samples is None:
+            samples = self.samples[name] = deque(maxlen=self.window)
+        samples.append(seconds)
+        if self.stream_writer is not None:
+            self.stream_writer.writerow((f"{time.time():.6f}", name, f"{seconds * 1000:.3f}"))
+
+    def timed(self, name, func):
+        """返回包装后的函数，启用时记录每次调用的耗时"""
+        def wrapper(*args):
+            if not self.enabled:
+                return func(*args)
+            start = time.perf_counter()
+            try:
+                return func(*args)
+            finally:
+                self.record(name, time.perf_counter() - start)
+        return wrapper
+
+    def summary(self):
+        """返回 {名称: (次数, p50, p95, 最大值)}，单位秒"""
+        result = {}
+        for name, samples in self.samples.items():
+            values = sorted(samples)
+            if values:
+                result[name] = (len(values), percentile(values, 50), percentile(values, 95), values[-1])
+        return result
+
+    def start_stream(self, path):
+        """把之后的所有样本写入 CSV 文件（时间, 名称, 毫秒）"""
+        self.stop_stream()
+        self.stream_file = open(path, "w", newline="")
+        self.stream_writer = csv.writer(self.stream_file)
+        self.stream_writer.writerow(("time", "name", "ms"))
+
+    def stop_stream(self):
+        if self.stream_file is not None:
+            self.stream_file.close()
+        self.stream_file = self.stream_writer = None
+
+    @property
+    def streaming(self):
+        return self.stream_file is not None
+
+
+class DiagnosticsOverlay(QLabel):
+    """叠加显示诊断数据的面板，显示时才测量事件循环延迟"""
+
+    def __init__(self, profiler, parent, extra_lines=None):
+        super().__init__(parent)
+        self.profiler = profiler
+        # 返回附加显示行（如网络发送耗时）的函数
+        self.extra_lines = extra_lines
+        self.setAttribute(Qt.WA_TransparentForMouseEvents)
+        self.setStyleSheet("background: rgba(0, 0, 0, 170); color: #7CFC00;"
+                           " font-family: monospace; padding: 4px;")
+        self.move(4, 4)
+
+        # 事件循环延迟：定时器实际触发间隔与设定间隔之差
+        self.lag_timer = QTimer(self)
+        self.lag_timer.setTimerType(Qt.PreciseTimer)
+        self.lag_timer.timeout.connect(self._measure_lag)
+        self._last_tick = None
+        self.refresh_timer = QTimer(self)
+        self.refresh_timer.timeout.connect(self.refresh)
+        self.hide()
+
+    def set_active(self, active):
+        """显示/隐藏面板，同时启用/停止采样"""
+        self.profiler.enabled = active or self.profiler.streaming
+        if active:
+            self._last_tick = None
+            self.lag_timer.start(LAG_INTERVAL_MS)
+            self.refresh_timer.start(250)
+            self.refresh()
+            self.show()
+            self.raise_()
+        else:
+            self.refresh_timer.stop()
+            if not self.profiler.streaming:
+                self.lag_timer.stop()
+            self.hide()
+
+    def toggle(self):
+        self.set_active(not self.isVisible())
+
+    def toggle_stream(self):
+        """开始/停止把样本写入文件，返回文件路径（停止时为 None）"""
+        if self.profiler.streaming:
+            self.profiler.stop_stream()
+            self.set_active(self.isVisible())
+            return None
+        path = time.strftime("diagnostics_%Y%m%d_%H%M%S.csv")
+        self.profiler.start_stream(path)
+        self.profiler.enabled = True
+        if not self.lag_timer.isActive():
+            self._last_tick = None
+            self.lag_timer.start(LAG_INTERVAL_MS)
+        return path
+
+    def _measure_lag(self):
+        now = time.perf_counter()
+        if self._last_tick is not None:
+            self.profiler.record("event_loop_lag", max(0.0, now - self._last_tick - LAG_INTERVAL_MS / 1000))
+        self._last_tick = now
+
+    def refresh(self):
+        lines = ["诊断           次数    p50    p95    最大 (ms)"]
+        for name, (count, p50, p95, peak) in sorted(self.profiler.summary().items()):
+            lines.append(f"{name:<14}{count:>5}{p50 * 1000:>7.2f}{p95 * 1000:>7.2f}{peak * 1000:>8.2f}")
+        if self.extra_lines is not None:
+            lines.extend(self.extra_lines())
+        if self.profiler.streaming:
+            lines.append(f"记录到 {self.profiler.stream_file.name}")
+        self.setText("\n".join(lines))
+        self.adjustSize()
@@ -0,0 +1,200 @@
+"""可插拔的输入后端：在后台线程中读取输入设备，把摇杆坐标交给平移/旋转处理函数
+
+每个后端在自己的线程中轮询设备，通过 on_sample(target, x, y) 回调推送采样:
+    target  "translate" 或 "rotate"
+    x, y    与 JoystickWidget.positionChanged 相同的右手坐标（-AXIS_RANGE~AXIS_RANGE 的整数）
+回调在后台线程中执行，GUI 中由 input_source.InputSource 转成Qt信号。
+
+    EvdevGamepadBackend  Linux evdev 手柄（需要 pip install evdev）
+    ScriptedBackend      按关键帧生成的合成输入，用于测试和演示
+"""
+import json
+import select
+import threading
+import time
+
+try:
+    import evdev
+    from evdev import ecodes
+except ImportError:
+    evdev = None
+
+AXIS_RANGE = 90  # 与摇杆控件的坐标范围（大圆半径）一致
+TARGETS = ("translate", "rotate")
+
+
+class InputBackend:
+    """输入后端基类，子类实现 run()，在 self.stopped 为真之前循环读取设备"""
+    name = "input"
+
+    def __init__(self):
+        self.on_sample = None
+        self.samples = 0
+        self._last = {}
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    @property
+    def stopped(self):
+        return self._stop_event.is_set()
+
+    def start(self, on_sample):
+        """启动后台线程，采样通过 on_sample(target, x, y) 推送"""
+        self.on_sample = on_sample
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name=f"Input-{self.name}", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=1.0):
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def _run(self):
+        try:
+            self.run()
+        except Exception as e:
+            print(f"输入后端 {self.name} 已停止: {e}")
+
+    def run(self):
+        raise NotImplementedError
+
+    def emit(self, target, x, y):
+        """推送一个采样，坐标截断到有效范围，与上次相同的采样不重复推送"""
+        x = max(-AXIS_RANGE, min(AXIS_RANGE, int(round(x))))
+        y = max(-AXIS_RANGE, min(AXIS_RANGE, int(round(y))))
+        if self._last.get(target) == (x, y):
+            return
+        self._last[target] = (x, y)
+        self.samples += 1
+        if self.on_sample is not None:
+            self.on_sample(target, x, y)
+
+
+# 手柄轴 -> (目标, 坐标分量, 符号)。手柄向上/向左为负，右手坐标系中前/左为正
+DEFAULT_GAMEPAD_MAPPING = {
+    "ABS_Y": ("translate", 0, -1),   # 左摇杆上下 -> 前后
+    "ABS_X": ("translate", 1, -1),   # 左摇杆左右 -> 左右
+    "ABS_RX": ("rotate", 1, -1),     # 右摇杆左右 -> 绕Z轴旋转
+}
+
+
+class EvdevGamepadBackend(InputBackend):
+    """读取 Linux evdev 手柄的模拟轴，每个同步报告推送一次"""
+    name = "evdev"
+
+    def __init__(self, device_path=None, mapping=None, poll_timeout=0.1):
+        super().__init__()
+        if evdev is None:
+            raise RuntimeError("未安装 evdev，无法使用手柄输入（pip install evdev）")
+        self.device = evdev.InputDevice(device_path) if device_path else find_gamepad()
+        if self.device is None:
+            raise RuntimeError("未找到带模拟摇杆的输入设备")
+        self.poll_timeout = poll_timeout
+        # 轴代码 -> (目标, 分量, 符号, 中心值, 半幅)
+        self.axes = {}
+        for axis_name, (target, index, sign) in (mapping or DEFAULT_GAMEPAD_MAPPING).items():
+            code = ecodes.ecodes[axis_name]
+            info = self.device.absinfo(code)
+            self.axes[code] = (target, index, sign,
+                               (info.max + info.min) / 2, max((info.max - info.min) / 2, 1))
+        self.state = {target: [0.0, 0.0] for target in TARGETS}
+
+    def run(self):
+        changed = set()
+        try:
+            while not self.stopped:
+                # 带超时等待，stop() 后能及时退出
+                if not select.select([self.device.fd], [], [], self.poll_timeout)[0]:
+                    continue
+                for event in self.device.read():
+                    if event.type == ecodes.EV_ABS and event.code in self.axes:
+                        target, index, sign, center, half = self.axes[event.code]
+                        self.state[target][index] = sign * (event.value - center) / half * AXIS_RANGE
+                        changed.add(target)
+                    elif event.type == ecodes.EV_SYN and event.code == ecodes.SYN_REPORT:
+                        for target in changed:
+                            self.emit(target, *self.state[target])
+                        changed.clear()
+        finally:
+            self.device.close()
+
+
+def find_gamepad():
+    """返回第一个同时具有 ABS_X 和 ABS_Y 轴的输入设备"""
+    for path in evdev.list_devices():
+        device = evdev.InputDevice(path)
+        axes = [code for code, _ in device.capabilities().get(ecodes.EV_ABS, [])]
+        if ecodes.ABS_X in axes and ecodes.ABS_Y in axes:
+            return device
+        device.close()
+    return None
+
+
+class ScriptedBackend(InputBackend):
+    """按关键帧 (时间秒, 目标, x, y) 以固定频率生成线性插值的输入"""
+    name = "script"
+
+    def __init__(self, keyframes, rate_hz=100, loop=False):
+        super().__init__()
+        self.rate_hz = rate_hz
+        self.loop = loop
+        self.tracks = {}
+        for t, target, x, y in sorted(keyframes, key=lambda k: k[0]):
+            if target not in TARGETS:
+                raise ValueError(f"未知的输入目标: {target}")
+            self.tracks.setdefault(target, []).append((t, x, y))
+        self.duration = max((track[-1][0] for track in self.tracks.values()), default=0.0)
+
+    def sample(self, t):
+        """返回时刻 t 各目标的 (x, y)"""
+        result = {}
+        for target, track in self.tracks.items():
+            if t <= track[0][0]:
+                result[target] = track[0][1:]
+                continue
+            result[target] = track[-1][1:]
+            for (t0, x0, y0), (t1, x1, y1) in zip(track, track[1:]):
+                if t0 <= t < t1:
+                    k = (t - t0) / (t1 - t0)
+                    result[target] = (x0 + (x1 - x0) * k, y0 + (y1 - y0) * k)
+                    break
+        return result
+
+    def run(self):
+        interval = 1.0 / self.rate_hz
+        start = time.perf_counter()
+        next_tick = start
+        while not self.stopped:
+            t = time.perf_counter() - start
+            if t > self.duration:
+                if not self.loop or self.duration <= 0:
+                    break
+                start += self.duration
+                t -= self.duration
+            for target, (x, y) in self.sample(t).items():
+                self.emit(target, x, y)
+            next_tick += interval
+            self._stop_event.wait(max(0.0, next_tick - time.perf_counter()))
+        # 脚本结束时回到零位
+        for target in self.tracks:
+            self.emit(target, 0, 0)
+
+
+def load_script(path):
+    """从 JSON 文件读取关键帧列表 [[时间, 目标, x, y], ...]"""
+    with open(path, encoding="utf-8") as f:
+        return [tuple(keyframe) for keyframe in json.load(f)]
+
+
+def create_backend(spec):
+    """按配置创建输入后端: None、"evdev"、"evdev:/dev/input/eventN" 或 "script:关键帧.json" """
+    if not spec:
+        return None
+    kind, _, arg = spec.partition(":")
+    if kind == "evdev":
+        return EvdevGamepadBackend(arg or None)
+    if kind == "script":
+        return ScriptedBackend(load_script(arg), loop=True)
+    raise ValueError(f"未知的输入后端: {spec}")
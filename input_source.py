@@ -0,0 +1,17 @@
+from PySide6.QtCore import QObject, Signal
+
+
+class InputSource(QObject):
+    """把输入后端线程中的采样通过Qt信号投递到GUI线程"""
+    # 目标("translate"/"rotate"), x, y（与摇杆控件 positionChanged 的坐标相同）
+    sampleReceived = Signal(str, int, int)
+
+    def __init__(self, backend, parent=None):
+        super().__init__(parent)
+        self.backend = backend
+        # 在后台线程中调用，跨线程信号会以排队方式投递到GUI线程
+        backend.start(self.sampleReceived.emit)
+
+    def stop(self):
+        """停止输入后端的线程"""
+        self.backend.stop()
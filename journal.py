@@ -0,0 +1,175 @@
+"""服务器端命令日志：请求线程只写内存环形缓冲，后台线程批量写盘和输出
+
+日志文件由定长记录组成（小端）:
+    timestamp(d) robot_id(8s) kind(B) servo_id(b) values(7f)
+robot_id 为 UTF-8 编码、以 0 填充的机器人编号。控制命令的 values 前三项为
+x, y, z；单个舵机命令只用 values[0]；舵机批量命令和舵机轨迹命令为 7 个（目标）角度。
+未使用的位置填 NaN。
+
+用法: python journal.py commands.journal   # 以文本形式打印日志文件
+"""
+import math
+import struct
+import sys
+import threading
+import time
+
+KIND_CONTROL = 0
+KIND_SERVO = 1
+KIND_SERVO_BATCH = 2
+KIND_SERVO_TRAJECTORY = 3
+
+VALUE_COUNT = 7
+RECORD = struct.Struct("<d8sBb7f")
+
+# 输出级别: 0 不输出；1 每批输出一行汇总；2 逐条输出（在后台线程中）
+VERBOSITY_SILENT = 0
+VERBOSITY_SUMMARY = 1
+VERBOSITY_ALL = 2
+
+
+def format_record(timestamp, robot_id, kind, servo_id, values):
+    if kind == KIND_CONTROL:
+        text = f"平移控制: X={values[0]:.3f}, Y={values[1]:.3f}  旋转控制: Z={values[2]:.3f}"
+    elif kind == KIND_SERVO:
+        text = f"舵机 {servo_id} 角度更新: {values[0]:g}°"
+    elif kind == KIND_SERVO_TRAJECTORY:
+        text = f"舵机轨迹目标: {[round(v, 1) for v in values]}"
+    else:
+        text = f"舵机批量更新: {[round(v, 1) for v in values]}"
+    return f"[{robot_id}] {text}"
+
+
+def _float32_or_nan(value):
+    try:
+        struct.pack("<f", value)
+    except (struct.error, OverflowError, TypeError):
+        return math.nan
+    return value
+
+
+def _format_safe(entry):
+    try:
+        return format_record(*entry)
+    except (TypeError, ValueError):
+        return f"[{entry[1]}] 无法显示的命令: {entry}"
+
+
+class CommandJournal:
+    """内存环形缓冲 + 后台批量写盘
+
+    record() 只在锁内写入预分配的缓冲区；后台线程每 flush_interval 秒
+    （或缓冲区过半时）把新记录打包写入日志文件。写盘跟不上时最旧的未写记录
+    会被覆盖，并计入 overruns。无法打包的数值写为 NaN，整条记录无法打包时计入 dropped；
+    后台线程不会因为某条记录或一次写盘失败而退出。
+    """
+
+    def __init__(self, path=None, verbosity=VERBOSITY_SUMMARY, capacity=65536, flush_interval=0.5):
+        self.path = path
+        self.verbosity = verbosity
+        self.capacity = capacity
+        self.flush_interval = flush_interval
+        self.buffer = [None] * capacity
+        self.head = 0  # 已写入缓冲区的记录总数
+        self.tail = 0  # 已交给后台线程处理的记录总数
+        self.overruns = 0
+        self.dropped = 0
+        self.lock = threading.Lock()
+        self.wakeup = threading.Event()
+        self.writer = None
+        self.file = None
+
+    def configure(self, path=None, verbosity=VERBOSITY_SUMMARY):
+        """设置日志文件和输出级别（在开始记录前调用）"""
+        self.path = path
+        self.verbosity = verbosity
+
+    def record(self, robot_id, kind, values, servo_id=-1):
+        """记录一条命令（请求线程中调用，不做任何I/O）"""
+        entry = (time.time(), robot_id, kind, servo_id, values)
+        with self.lock:
+            if self.head - self.tail >= self.capacity:
+                self.tail += 1
+                self.overruns += 1
+            self.buffer[self.head % self.capacity] = entry
+            self.head += 1
+            pending = self.head - self.tail
+            if self.writer is None:
+                self.writer = threading.Thread(target=self._run, name="CommandJournal", daemon=True)
+                self.writer.start()
+        if pending >= self.capacity // 2:
+            self.wakeup.set()
+
+    def _take(self):
+        """取出所有未处理的记录"""
+        with self.lock:
+            entries = [self.buffer[i % self.capacity] for i in range(self.tail, self.head)]
+            self.tail = self.head
+        return entries
+
+    def _run(self):
+        while True:
+            self.wakeup.wait(self.flush_interval)
+            self.wakeup.clear()
+            try:
+                self.flush()
+            except Exception as e:
+                # 写盘失败（磁盘满等）只影响这一批记录
+                print(f"命令日志写入失败: {e}", file=sys.stderr)
+
+    def _pack(self, timestamp, robot_id, kind, servo_id, values):
+        """打包一条记录，无法表示为 float32 的数值写为 NaN，整条无法打包时返回 None"""
+        padded = list(values) + [math.nan] * (VALUE_COUNT - len(values))
+        try:
+            return RECORD.pack(timestamp, robot_id.encode(), kind, servo_id, *padded)
+        except (struct.error, OverflowError, TypeError, ValueError):
+            pass
+        try:
+            return RECORD.pack(timestamp, robot_id.encode(), kind, servo_id,
+                               *(_float32_or_nan(v) for v in padded))
+        except (struct.error, OverflowError, TypeError, ValueError, AttributeError):
+            self.dropped += 1
+            return None
+
+    def flush(self):
+        """把未处理的记录写盘并按输出级别打印"""
+        entries = self._take()
+        if not entries:
+            return
+        if self.path is not None:
+            if self.file is None:
+                self.file = open(self.path, "ab")
+            chunk = bytearray()
+            for entry in entries:
+                packed = self._pack(*entry)
+                if packed is not None:
+                    chunk += packed
+            self.file.write(chunk)
+            self.file.flush()
+        if self.verbosity >= VERBOSITY_ALL:
+            print("\n".join(_format_safe(entry) for entry in entries))
+        elif self.verbosity == VERBOSITY_SUMMARY:
+            counts = [0, 0, 0, 0]
+            for entry in entries:
+                if 0 <= entry[2] < len(counts):
+                    counts[entry[2]] += 1
+            print(f"命令 {len(entries)} 条（控制 {counts[KIND_CONTROL]}，舵机 {counts[KIND_SERVO]}，"
+                  f"舵机批量 {counts[KIND_SERVO_BATCH]}，舵机轨迹 {counts[KIND_SERVO_TRAJECTORY]}）" +
+                  (f"，覆盖 {self.overruns} 条" if self.overruns else "") +
+                  (f"，无法写入 {self.dropped} 条" if self.dropped else ""))
+
+
+def read_journal(path):
+    """逐条读取日志文件，生成 (timestamp, robot_id, kind, servo_id, values)"""
+    with open(path, "rb") as f:
+        data = f.read()
+    for offset in range(0, len(data) - RECORD.size + 1, RECORD.size):
+        timestamp, robot_id, kind, servo_id, *values = RECORD.unpack_from(data, offset)
+        yield timestamp, robot_id.rstrip(b"\0").decode(errors="replace"), kind, servo_id, values
+
+
+if __name__ == "__main__":
+    for entry in read_journal(sys.argv[1]):
+        timestamp = entry[0]
+        stamp = time.strftime("%H:%M:%S", time.localtime(timestamp)) + f".{int(timestamp % 1 * 1000):03d}"
+        print(stamp, format_record(*entry))
@@ -1,12 +1,16 @@
 import sys
 import math
+import time
 from PySide6.QtWidgets import QApplication, QWidget
-from PySide6.QtCore import Qt, QPoint, Signal
-from PySide6.QtGui import QPainter, QPixmap, QMouseEvent, QPaintEvent, QKeyEvent
+from PySide6.QtCore import Qt, QPoint, QRect, QTimer, Signal
+from PySide6.QtGui import QPainter, QMouseEvent, QPaintEvent, QKeyEvent
+from pixmaps import load_pixmap, scaled_pixmap
 
 # 常量定义
 SMALL_CIRCLE_RADIUS = 30  # 小圆半径
 BIG_CIRCLE_RADIUS = 90    # 大圆半径
+BIG_CIRCLE_IMAGE = "image/max.png"
+SMALL_CIRCLE_IMAGE = "image/min.png"
 KEY_CONTROL_RADIUS = 60    #键盘控制大小
 class JoystickWidget(QWidget):
     positionChanged = Signal(int, int)  # 位置变化信号
@@ -37,16 +41,128 @@ class JoystickWidget(QWidget):
             Qt.Key_L: False   # 右
         }
         
-        # 加载图片资源
-        self.big_circle_pixmap = QPixmap("./image/max.png")
-        self.small_circle_pixmap = QPixmap("./image/min.png")
-        
-        # 检查图片是否加载成功
-        if self.big_circle_pixmap.isNull():
-            print("警告: 大圆图片加载失败")
-        if self.small_circle_pixmap.isNull():
-            print("警告: 小圆图片加载失败")
+        # 加载图片资源（进程内共享，只读取一次）
+        self.big_circle_pixmap = load_pixmap(BIG_CIRCLE_IMAGE)
+        self.small_circle_pixmap = load_pixmap(SMALL_CIRCLE_IMAGE)
+
+        # 按设备像素比预缩放的图片，绘制时不再缩放
+        self._scaled_dpr = None
+        self._scaled_big = None
+        self._scaled_small = None
+
+        # 性能诊断（见 set_profiler）
+        self.profiler = None
+        self.profile_name = "paint"
+
+        # 鼠标事件合并：间隔内只保留最新位置，每个间隔最多发出一次信号
+        self.coalesce_interval_ms = 0
+        self._pending_position = None
+        self._emit_timer = QTimer(self)
+        self._emit_timer.setSingleShot(True)
+        self._emit_timer.setTimerType(Qt.PreciseTimer)
+        self._emit_timer.timeout.connect(self._flush_position)
+        # 输入统计
+        self.input_events = 0
+        self.emitted_events = 0
+        self.coalesced_events = 0
+        self.peak_input_rate = 0.0
+        self._rate_window_start = time.perf_counter()
+        self._rate_window_events = 0
+
+    def set_coalesce_interval(self, interval_ms):
+        """设置鼠标事件的合并间隔（毫秒），0 表示每个事件都立即发出信号"""
+        self.coalesce_interval_ms = max(0, int(interval_ms))
+        if not self.coalesce_interval_ms:
+            self._flush_position()
+
+    def input_stats(self):
+        """返回输入事件统计: 事件数、发出信号数、被合并数、峰值输入频率（次/秒）"""
+        return {
+            "events": self.input_events,
+            "emitted": self.emitted_events,
+            "coalesced": self.coalesced_events,
+            "peak_rate": self.peak_input_rate,
+        }
+
+    def _count_input(self):
+        """统计输入事件，按1秒窗口计算峰值频率"""
+        self.input_events += 1
+        self._rate_window_events += 1
+        now = time.perf_counter()
+        elapsed = now - self._rate_window_start
+        if elapsed >= 1.0:
+            self.peak_input_rate = max(self.peak_input_rate, self._rate_window_events / elapsed)
+            self._rate_window_start = now
+            self._rate_window_events = 0
+
+    def _emit_position(self, x, y, immediate=False):
+        """发出位置信号；启用合并时，间隔内的后续位置只保留最新一个，间隔结束时发出"""
+        self._count_input()
+        if immediate or not self.coalesce_interval_ms:
+            if self._pending_position is not None:
+                # 待发出的位置已被新位置取代
+                self.coalesced_events += 1
+                self._pending_position = None
+            self._emit_timer.stop()
+            self._emit_now(x, y)
+        elif self._emit_timer.isActive():
+            if self._pending_position is not None:
+                self.coalesced_events += 1
+            self._pending_position = (x, y)
+        else:
+            # 间隔开始时的第一个事件立即发出，不增加延迟
+            self._emit_now(x, y)
+            self._emit_timer.start(self.coalesce_interval_ms)
+
+    def _flush_position(self):
+        """合并间隔结束：发出最新的待发位置，并开始下一个间隔"""
+        if self._pending_position is None:
+            return
+        x, y = self._pending_position
+        self._pending_position = None
+        self._emit_now(x, y)
+        if self.coalesce_interval_ms:
+            self._emit_timer.start(self.coalesce_interval_ms)
+
+    def _emit_now(self, x, y):
+        self.emitted_events += 1
+        self.positionChanged.emit(x, y)
+
+    def _scaled_pixmaps(self):
+        """返回按当前设备像素比预缩放的 (大圆, 小圆) 图片，比例变化时重新生成"""
+        dpr = self.devicePixelRatioF()
+        if dpr != self._scaled_dpr:
+            self._scaled_dpr = dpr
+            self._scaled_big = scaled_pixmap(BIG_CIRCLE_IMAGE, BIG_CIRCLE_RADIUS * 2, dpr)
+            self._scaled_small = scaled_pixmap(SMALL_CIRCLE_IMAGE, SMALL_CIRCLE_RADIUS * 2, dpr)
+        return self._scaled_big, self._scaled_small
+
+    @staticmethod
+    def _circle_rect(center, radius):
+        """圆所占的矩形（外扩1像素，覆盖抗锯齿边缘）"""
+        return QRect(center.x() - radius - 1, center.y() - radius - 1,
+                     radius * 2 + 2, radius * 2 + 2)
+
+    def _move_knob(self, position):
+        """移动小圆，只重绘其旧位置和新位置"""
+        old_xy = self.big_circle_xy
+        self.big_circle_xy = QPoint(position)
+        self._update_knob(old_xy)
+
+    def _update_knob(self, old_xy):
+        """请求重绘小圆的旧位置和当前位置，两块区域由 Qt 合并为一次绘制"""
+        self.update(self._circle_rect(old_xy, SMALL_CIRCLE_RADIUS))
+        self.update(self._circle_rect(self.big_circle_xy, SMALL_CIRCLE_RADIUS))
     
+    def show_position(self, joy_x, joy_y):
+        """按外部输入（如手柄）的右手坐标移动小圆，不发出信号"""
+        dx, dy = -joy_y, -joy_x
+        distance = math.hypot(dx, dy)
+        if distance > BIG_CIRCLE_RADIUS:
+            dx = int(dx * BIG_CIRCLE_RADIUS / distance)
+            dy = int(dy * BIG_CIRCLE_RADIUS / distance)
+        self._move_knob(QPoint(self.small_circle_xy.x() + dx, self.small_circle_xy.y() + dy))
+
     def set_keyboard_control_enabled(self, enabled: bool):
         """设置键盘控制是否启用"""
         self.keyboard_control_enabled = enabled
@@ -62,31 +178,44 @@ class JoystickWidget(QWidget):
         self.big_circle_xy = QPoint(self.small_circle_xy.x(), self.small_circle_xy.y())
         self.update()
         
+    def set_profiler(self, profiler, name):
+        """启用诊断时把每次 paintEvent 的耗时记录到 profiler 的 name 项"""
+        self.profiler = profiler
+        self.profile_name = name
+
     def paintEvent(self, event: QPaintEvent):
+        profiler = self.profiler
+        if profiler is None or not profiler.enabled:
+            self._paint(event)
+            return
+        start = time.perf_counter()
+        self._paint(event)
+        profiler.record(self.profile_name, time.perf_counter() - start)
+
+    def _paint(self, event):
+        # 图片已按设备像素比预缩放，直接按原尺寸绘制，无需平滑缩放
+        big_pixmap, small_pixmap = self._scaled_pixmaps()
+        dirty = event.rect()
         painter = QPainter(self)
-        # 开启抗锯齿
-        painter.setRenderHint(QPainter.Antialiasing, True)
-        painter.setRenderHint(QPainter.SmoothPixmapTransform, True)
         
-        # 绘制摇杆中的大圆
-        if not self.big_circle_pixmap.isNull():
+        # 绘制摇杆中的大圆（只在脏区域与其相交时）
+        if not big_pixmap.isNull() and dirty.intersects(
+                self._circle_rect(self.small_circle_xy, BIG_CIRCLE_RADIUS)):
             painter.drawPixmap(
                 self.small_circle_xy.x() - BIG_CIRCLE_RADIUS,
                 self.small_circle_xy.y() - BIG_CIRCLE_RADIUS,
-                BIG_CIRCLE_RADIUS * 2,
-                BIG_CIRCLE_RADIUS * 2,
-                self.big_circle_pixmap
+                big_pixmap
             )
         
         # 绘制摇杆中的小圆
-        if not self.small_circle_pixmap.isNull():
+        if not small_pixmap.isNull() and dirty.intersects(
+                self._circle_rect(self.big_circle_xy, SMALL_CIRCLE_RADIUS)):
             painter.drawPixmap(
                 self.big_circle_xy.x() - SMALL_CIRCLE_RADIUS,
                 self.big_circle_xy.y() - SMALL_CIRCLE_RADIUS,
-                SMALL_CIRCLE_RADIUS * 2,
-                SMALL_CIRCLE_RADIUS * 2,
-                self.small_circle_pixmap
+                small_pixmap
             )
+        painter.end()
     
     def mouseMoveEvent(self, event: QMouseEvent):
         rocker_xy = event.position().toPoint()
@@ -99,52 +228,22 @@ class JoystickWidget(QWidget):
             
             max_radius = BIG_CIRCLE_RADIUS
             if distance_squared > max_radius * max_radius:
-                # 计算角度
-                angle = math.atan2(abs(dy), abs(dx))
-                
-                # 计算边界点坐标
-                x = int(max_radius * math.cos(angle))
-                y = int(max_radius * math.sin(angle))
-                
-                # 根据象限调整坐标
-                if dx >= 0 and dy >= 0:  # 第一象限 (右下)
-                    self.big_circle_xy.setX(x + self.small_circle_xy.x())
-                    self.big_circle_xy.setY(y + self.small_circle_xy.y())
-                    # 转换为右手坐标系: 向后(X负), 向右(Y负)
-                    joy_x = -y
-                    joy_y = -x
-                elif dx < 0 and dy >= 0:  # 第二象限 (左下)
-                    self.big_circle_xy.setX(-x + self.small_circle_xy.x())
-                    self.big_circle_xy.setY(y + self.small_circle_xy.y())
-                    # 转换为右手坐标系: 向后(X负), 向左(Y正)
-                    joy_x = -y
-                    joy_y = x
-                elif dx < 0 and dy < 0:  # 第三象限 (左上)
-                    self.big_circle_xy.setX(-x + self.small_circle_xy.x())
-                    self.big_circle_xy.setY(-y + self.small_circle_xy.y())
-                    # 转换为右手坐标系: 向前(X正), 向左(Y正)
-                    joy_x = y
-                    joy_y = x
-                elif dx >= 0 and dy < 0:  # 第四象限 (右上)
-                    self.big_circle_xy.setX(x + self.small_circle_xy.x())
-                    self.big_circle_xy.setY(-y + self.small_circle_xy.y())
-                    # 转换为右手坐标系: 向前(X正), 向右(Y负)
-                    joy_x = y
-                    joy_y = -x
-            else:
-                # 鼠标在大圆内部，直接跟随鼠标
-                self.big_circle_xy = rocker_xy
-                # 转换为右手坐标系: 
-                # 前-后: 向上为X正 (dy为负时X正), 向下为X负 (dy为正时X负)
-                # 左-右: 向左为Y正 (dx为负时Y正), 向右为Y负 (dx为正时Y负)
-                joy_x = -dy
-                joy_y = -dx
+                # 鼠标在大圆外部，沿同一方向限制到大圆边界
+                scale = max_radius / math.sqrt(distance_squared)
+                dx = int(dx * scale)
+                dy = int(dy * scale)
+            knob_xy = QPoint(self.small_circle_xy.x() + dx, self.small_circle_xy.y() + dy)
+            # 转换为右手坐标系: 
+            # 前-后: 向上为X正 (dy为负时X正), 向下为X负 (dy为正时X负)
+            # 左-右: 向左为Y正 (dx为负时Y正), 向右为Y负 (dx为正时Y负)
+            joy_x = -dy
+            joy_y = -dx
             
-            # 发出位置变化信号 (右手坐标系)
-            self.positionChanged.emit(joy_x, joy_y)
+            # 发出位置变化信号 (右手坐标系)，高频鼠标事件按间隔合并
+            self._emit_position(joy_x, joy_y)
             
-            # 请求重绘
-            self.update()
+            # 只重绘小圆经过的区域
+            self._move_knob(knob_xy)
             
             # 保存当前鼠标位置
             self.map_remov_old = rocker_xy
@@ -172,14 +271,11 @@ class JoystickWidget(QWidget):
             # 重置状态
             self.mouse_press_flag = False
             
-            # 小圆回归中心位置
-            self.big_circle_xy = QPoint(self.small_circle_xy.x(), self.small_circle_xy.y())
-            
-            # 发出归零信号 (右手坐标系)
-            self.positionChanged.emit(0, 0)
+            # 发出归零信号 (右手坐标系)，立即发出并丢弃待发的位置
+            self._emit_position(0, 0, immediate=True)
             
-            # 请求重绘
-            self.update()
+            # 小圆回归中心位置
+            self._move_knob(self.small_circle_xy)
             
     def keyPressEvent(self, event: QKeyEvent):
         """键盘按下事件处理"""
@@ -206,6 +302,7 @@ class JoystickWidget(QWidget):
         # 计算X和Y方向的分量
         x = 0
         y = 0
+        old_xy = self.big_circle_xy
         
         # 上/下方向 (X轴)
         if self.key_pressed[Qt.Key_I]:  # I键 - 上
@@ -235,21 +332,21 @@ class JoystickWidget(QWidget):
                     self.small_circle_xy.y() - vec
                 )
                 # 发射信号: 前(X正), 左(Y正)
-                self.positionChanged.emit(vec, vec)
+                self._emit_position(vec, vec, immediate=True)
             elif y < 0:  # 右上
                 self.big_circle_xy = QPoint(
                     self.small_circle_xy.x() + vec,
                     self.small_circle_xy.y() - vec
                 )
                 # 发射信号: 前(X正), 右(Y负)
-                self.positionChanged.emit(vec, -vec)
+                self._emit_position(vec, -vec, immediate=True)
             else:  # 纯上
                 self.big_circle_xy = QPoint(
                     self.small_circle_xy.x(),
                     self.small_circle_xy.y() - KEY_CONTROL_RADIUS
                 )
                 # 发射信号: 前(X正), 无左右
-                self.positionChanged.emit(KEY_CONTROL_RADIUS, 0)
+                self._emit_position(KEY_CONTROL_RADIUS, 0, immediate=True)
                 
         elif x < 0:  # 向下
             if y > 0:  # 左下
@@ -258,21 +355,21 @@ class JoystickWidget(QWidget):
                     self.small_circle_xy.y() + vec
                 )
                 # 发射信号: 后(X负), 左(Y正)
-                self.positionChanged.emit(-vec, vec)
+                self._emit_position(-vec, vec, immediate=True)
             elif y < 0:  # 右下
                 self.big_circle_xy = QPoint(
                     self.small_circle_xy.x() + vec,
                     self.small_circle_xy.y() + vec
                 )
                 # 发射信号: 后(X负), 右(Y负)
-                self.positionChanged.emit(-vec, -vec)
+                self._emit_position(-vec, -vec, immediate=True)
             else:  # 纯下
                 self.big_circle_xy = QPoint(
                     self.small_circle_xy.x(),
                     self.small_circle_xy.y() + KEY_CONTROL_RADIUS
                 )
                 # 发射信号: 后(X负), 无左右
-                self.positionChanged.emit(-KEY_CONTROL_RADIUS, 0)
+                self._emit_position(-KEY_CONTROL_RADIUS, 0, immediate=True)
                 
         else:  # 无上下，只有左右
             if y > 0:  # 纯左
@@ -281,20 +378,19 @@ class JoystickWidget(QWidget):
                     self.small_circle_xy.y()
                 )
                 # 发射信号: 无前后, 左(Y正)
-                self.positionChanged.emit(0, KEY_CONTROL_RADIUS)
+                self._emit_position(0, KEY_CONTROL_RADIUS, immediate=True)
             elif y < 0:  # 纯右
                 self.big_circle_xy = QPoint(
                     self.small_circle_xy.x() + KEY_CONTROL_RADIUS,
                     self.small_circle_xy.y()
                 )
                 # 发射信号: 无前后, 右(Y负)
-                self.positionChanged.emit(0, -KEY_CONTROL_RADIUS)
+                self._emit_position(0, -KEY_CONTROL_RADIUS, immediate=True)
             
-        # 请求重绘
-        self.update()
+        # 只重绘小圆的旧位置和新位置
+        self._update_knob(old_xy)
         
     def _reset_joystick_position(self):
         """重置摇杆位置到中心"""
-        self.big_circle_xy = QPoint(self.small_circle_xy.x(), self.small_circle_xy.y())
-        self.positionChanged.emit(0, 0)
-        self.update()
\ No newline at end of file
+        self._emit_position(0, 0, immediate=True)
+        self._move_knob(self.small_circle_xy)
\ No newline at end of file
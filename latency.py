@@ -0,0 +1,73 @@
+"""端到端命令延迟统计（滚动窗口 + 百分位数）
+
+每条控制命令带有输入事件时间 t_input 和发送时间 t_send，服务器回显并附加
+收到时间 t_recv、处理完成时间 t_handled，客户端收到应答时记录 t_reply。
+所有时间均为 time.time()；“发送→服务器”跨越两台机器的时钟，只有在两端
+时钟同步（或在同一台机器上）时才有意义。
+"""
+import csv
+import time
+from collections import deque
+
+# (名称, 显示名, 起始字段, 结束字段)
+METRICS = (
+    ("input_send", "输入→发送", "t_input", "t_send"),
+    ("send_server", "发送→服务器", "t_send", "t_recv"),
+    ("server", "服务器处理", "t_recv", "t_handled"),
+    ("round_trip", "往返", "t_send", "t_reply"),
+)
+
+
+def percentile(sorted_values, q):
+    """已排序序列的百分位数（最近秩法），q 取 0~100"""
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, round(q / 100 * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+class LatencyTracker:
+    """保存最近 window 条命令的各段延迟，计算 p50/p95/p99 并可导出"""
+
+    def __init__(self, window=2000):
+        self.samples = deque(maxlen=window)  # (t_reply, {名称: 秒})
+
+    def record(self, timing):
+        """记录一条应答中的 timing 字典"""
+        values = {}
+        for name, _, start, end in METRICS:
+            if start in timing and end in timing:
+                values[name] = timing[end] - timing[start]
+        if values:
+            self.samples.append((timing.get("t_reply", time.time()), values))
+
+    def summary(self, quantiles=(50, 95, 99)):
+        """返回 {名称: [各百分位数(秒)]}，没有样本的指标不出现"""
+        result = {}
+        for name, *_ in METRICS:
+            values = sorted(v[name] for _, v in self.samples if name in v)
+            if values:
+                result[name] = [percentile(values, q) for q in quantiles]
+        return result
+
+    def format_summary(self, names=("input_send", "round_trip")):
+        """状态栏显示用的简短文字"""
+        labels = {name: label for name, label, *_ in METRICS}
+        summary = self.summary()
+        parts = [
+            f"{labels[name]} {'/'.join(f'{v * 1000:.1f}' for v in summary[name])}ms"
+            for name in names if name in summary
+        ]
+        return "p50/95/99 " + "  ".join(parts) if parts else "暂无延迟数据"
+
+    def export(self, path):
+        """把窗口内的样本写入 CSV 文件（毫秒），返回写入的行数"""
+        names = [name for name, *_ in METRICS]
+        with open(path, "w", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(["t_reply"] + [f"{name}_ms" for name in names])
+            for t_reply, values in self.samples:
+                writer.writerow([f"{t_reply:.6f}"] + [
+                    f"{values[name] * 1000:.3f}" if name in values else "" for name in names
+                ])
+        return len(self.samples)
@@ -1,11 +1,39 @@
 import sys
-import requests  # 添加 HTTP 请求库
-from PySide6.QtWidgets import QApplication, QMainWindow
-from PySide6.QtCore import QPoint, QTimer,QFile,QTextStream
+import time
+from PySide6.QtWidgets import QApplication, QMainWindow, QLabel
+from PySide6.QtCore import Qt, QPoint, QTimer,QFile,QTextStream
+from PySide6.QtGui import QKeySequence, QShortcut
 from remote_control import Ui_Form
 from joystick import JoystickWidget
+from sender import CommandSender
+from control_core import ControlCore
+from diagnostics import DiagnosticsOverlay, Profiler
 
 SEND_TO_SERVER = False
+ROBOT_ID = "default"  # 控制的机器人编号（1~8字节），服务器按编号区分机器人
+TRANSPORT = "http"  # 传输方式: "http"、"udp"（二进制帧）或 "stream"（长连接），HTTP 可作为备用
+HTTP_CODEC = "json"  # HTTP 请求体的编码: "json"、"msgpack"、"cbor" 或 "struct"（见 codec.py）
+UDP_PORT = 5005
+STREAM_PORT = 5100
+SERVO_BATCH_INTERVAL_MS = 100  # 舵机批量更新的最小发送间隔（毫秒）
+SERVO_MAX_VELOCITY = None  # 设置后（度/秒）舵机以轨迹命令发送，由服务器按此速度上限平滑插值
+COMMAND_MAX_AGE = 0.3  # 速度命令排队超过该时间（秒）后丢弃，不再发送
+CONTROL_DEAD_BAND = 0.01  # 控制量变化超过该值才发送（None 表示每次发送完整状态）
+HEARTBEAT_INTERVAL = 1.0  # 控制量不变时发送心跳的间隔（秒）
+CONTROL_RATE_HZ = 10  # 控制频率（10~200Hz）
+ADAPTIVE_RATE = False  # 根据往返时间和错误率自动调整控制频率
+RECORD_PATH = None  # 录制所有控制命令的文件（如 "session.rclog"），可用 replay.py 回放
+JOYSTICK_DEAD_ZONE = 0.05  # 摇杆死区（占半径的比例），死区内输出为0
+JOYSTICK_EXPO = 0.3  # 指数曲线系数（0 为线性），越大低速段越精细
+JOYSTICK_CLAMP = "circle"  # 限幅方式: "circle"（按向量长度）或 "square"（每个轴单独）
+INPUT_COALESCE_MS = 16  # 摇杆鼠标事件合并间隔（毫秒，约一帧），0 表示每个事件都处理
+FRAME_INTERVAL_MS = 16  # 界面文字的刷新间隔（约一帧），间隔内的多次更新只显示最后一次
+SHOW_DIAGNOSTICS = False  # 启动时显示诊断面板（F12 切换显示，Ctrl+F12 开始/停止记录到文件）
+INPUT_BACKEND = None  # 额外的输入后端: None、"evdev"（手柄）或 "script:关键帧.json"
+TELEMETRY_SOURCE = "server"  # 遥测来源: "server"（长连接推送，其他传输方式不显示）、"local"（本地替身机器人，离线调试用）或 None（不显示）
+TELEMETRY_HISTORY = 2048  # 每个遥测序列保留的样本数
+TELEMETRY_WINDOW_S = 10.0  # 遥测曲线显示的时间范围（秒）
+TELEMETRY_PLOT_HEIGHT = 180  # 遥测曲线的高度（像素），显示在原有控件下方
 class RemoteControlWindow(QMainWindow):
     def __init__(self):
         super().__init__()
@@ -13,10 +41,17 @@ class RemoteControlWindow(QMainWindow):
         # 设置UI
         self.ui = Ui_Form()
         self.ui.setupUi(self)
-        self.MAX_TRANSLATE_SPEED = 1.5
-        self.MAX_ROTATE_SPEED = 0.769
         # 设置窗口标题
         self.setWindowTitle("XXX机器人遥控系统")
+
+        # 界面文字的脏标记模型：更新先记录下来，每帧最多刷新一次控件
+        self.view_labels = {"translate": self.ui.tranlate_c_lb, "rotate": self.ui.rotate_c_lb}
+        self.view_pending = {}  # 键 -> 待显示的文字，"status" 为状态栏消息
+        self.view_shown = {}
+        self.view_timer = QTimer(self)
+        self.view_timer.setSingleShot(True)
+        self.view_timer.setInterval(FRAME_INTERVAL_MS)
+        self.view_timer.timeout.connect(self.refresh_view)
         
         # 滑块列表
         self.sliders = [
@@ -32,27 +67,93 @@ class RemoteControlWindow(QMainWindow):
         
         # HTTP 服务器配置
         self.api_base_url = "http://127.0.0.1:5000/api"  # 服务器地址
+
+        # 控制核心：控制状态、速度映射、发送、录制都在其中，窗口只负责显示和输入。
+        # 发送器使用Qt信号，发送结果在GUI线程中交给核心处理
+        self.core = ControlCore(
+            self.api_base_url, TRANSPORT, ROBOT_ID, UDP_PORT, STREAM_PORT,
+            dead_band=CONTROL_DEAD_BAND, heartbeat_interval=HEARTBEAT_INTERVAL,
+            rate_hz=CONTROL_RATE_HZ, adaptive_rate=ADAPTIVE_RATE, max_age=COMMAND_MAX_AGE,
+            record_path=RECORD_PATH, dead_zone=JOYSTICK_DEAD_ZONE, expo=JOYSTICK_EXPO,
+            clamp=JOYSTICK_CLAMP, send_enabled=SEND_TO_SERVER, telemetry_capacity=TELEMETRY_HISTORY,
+            codec=HTTP_CODEC,
+            sender_factory=lambda transport, max_age: CommandSender(transport, self, max_age)
+        )
+        self.command_sender = self.core.sender
+        self.command_sender.sendFinished.connect(self.on_send_finished)
+        self.command_sender.messageReceived.connect(self.on_server_message)
+
+        # 舵机角度快照：拖动滑块时只记录最新值，定时合并为一次批量更新
+        self.servo_timer = QTimer(self)
+        self.servo_timer.setSingleShot(True)
+        self.servo_timer.setInterval(SERVO_BATCH_INTERVAL_MS)
+        self.servo_timer.timeout.connect(self.send_servo_batch)
+
+        # 热点路径耗时统计，诊断面板显示时才采样
+        self.profiler = Profiler()
+
+        # 发送队列计数器显示在状态栏右侧
+        self.queue_stats_lb = QLabel(self)
+        self.statusBar().addPermanentWidget(self.queue_stats_lb)
+        self.view_labels["queue"] = self.queue_stats_lb
+        self.stats_timer = QTimer(self)
+        self.stats_timer.timeout.connect(self.update_queue_stats)
+        self.stats_timer.start(1000)
+        # 摇杆输入事件统计（峰值频率和被合并的事件数）
+        self.input_stats_lb = QLabel(self)
+        self.statusBar().addPermanentWidget(self.input_stats_lb)
+        self.view_labels["input"] = self.input_stats_lb
+        self.stats_timer.timeout.connect(self.update_input_stats)
         
         # 初始化摇杆控件
         self.init_joysticks()
         
+        # 后台输入后端（手柄等），采样与鼠标输入进入同一套处理函数
+        self.input_source = None
+        if INPUT_BACKEND:
+            # 只在配置了输入后端时才导入（evdev 等可选依赖）
+            from input_backends import create_backend
+            from input_source import InputSource
+            self.input_source = InputSource(create_backend(INPUT_BACKEND), self)
+            self.input_source.sampleReceived.connect(self.on_input_sample)
+        
         # 连接滑块和数字输入框的信号
         self.connect_servo_controls()
         
         # 设置初始值
         self.set_initial_values()
         
-        # 初始化摇杆状态
-        self.translate_x = 0
-        self.translate_y = 0
-        self.rotate_x = 0
-        self.rotate_z = 0
+        # 端到端延迟统计，Ctrl+L 导出到 CSV 文件
+        self.latency_lb = QLabel(self)
+        self.statusBar().addPermanentWidget(self.latency_lb)
+        self.view_labels["latency"] = self.latency_lb
+        self.stats_timer.timeout.connect(self.update_latency_stats)
+        self.export_latency_sc = QShortcut(QKeySequence("Ctrl+L"), self)
+        self.export_latency_sc.activated.connect(self.export_latency)
         
         # 创建定时器，定期发送控制信号
         self.send_timer = QTimer(self)
-        self.send_timer.timeout.connect(self.send_control_data)
-        self.send_timer.start(100)  # 每100毫秒发送一次 (10Hz)
-        self.robot_speed_changed = False
+        self.send_timer.setTimerType(Qt.PreciseTimer)
+        self.send_timer.timeout.connect(self.profiler.timed("send_control", self.send_control_data))
+        self.send_timer.start(round(1000 / self.core.rate_controller.rate_hz))  # 默认每100毫秒发送一次 (10Hz)
+        self.rate_lb = QLabel(self)
+        self.statusBar().addPermanentWidget(self.rate_lb)
+        self.view_labels["rate"] = self.rate_lb
+        self.show_control_rate()
+        self.stats_timer.timeout.connect(self.adapt_control_rate)
+
+        # 诊断面板：F12 显示/隐藏，Ctrl+F12 开始/停止把样本写入 CSV 文件
+        self.diagnostics = DiagnosticsOverlay(self.profiler, self, self.network_diagnostics)
+        self.diagnostics_sc = QShortcut(QKeySequence("F12"), self)
+        self.diagnostics_sc.activated.connect(self.diagnostics.toggle)
+        self.diagnostics_stream_sc = QShortcut(QKeySequence("Ctrl+F12"), self)
+        self.diagnostics_stream_sc.activated.connect(self.toggle_diagnostics_stream)
+        self.diagnostics.set_active(SHOW_DIAGNOSTICS)
+
+        # 遥测曲线（原有控件下方，F11 显示/隐藏），只在有遥测来源时创建
+        self.telemetry_timer = None
+        if TELEMETRY_SOURCE == "local" or (TELEMETRY_SOURCE == "server" and self.core.subscribe_telemetry()):
+            self.init_telemetry()
         
     def init_joysticks(self):
         """初始化并添加摇杆控件"""
@@ -71,10 +172,17 @@ class RemoteControlWindow(QMainWindow):
                                         self.ui.rotate_joy.width(), 
                                         self.ui.rotate_joy.height())
         self.rotate_joystick.setWindowTitle("旋转控制")
+        # 高回报率鼠标每秒可产生上千个事件，按帧合并后再交给处理函数
+        for joystick in (self.translate_joystick, self.rotate_joystick):
+            joystick.set_coalesce_interval(INPUT_COALESCE_MS)
         
         # 连接摇杆位置变化信号
-        self.translate_joystick.positionChanged.connect(self.on_translate_joystick_moved)
-        self.rotate_joystick.positionChanged.connect(self.on_rotate_joystick_moved)
+        self.translate_joystick.positionChanged.connect(
+            self.profiler.timed("translate_moved", self.on_translate_joystick_moved))
+        self.rotate_joystick.positionChanged.connect(
+            self.profiler.timed("rotate_moved", self.on_rotate_joystick_moved))
+        self.translate_joystick.set_profiler(self.profiler, "paint_translate")
+        self.rotate_joystick.set_profiler(self.profiler, "paint_rotate")
         # 最大速度改变信号
         self.ui.max_trans_speed_sb.valueChanged.connect(self.on_trans_speed_changed)
         self.ui.max_rota_speed_sb.valueChanged.connect(self.on_rota_speed_changed)
@@ -102,11 +210,11 @@ class RemoteControlWindow(QMainWindow):
     
     def on_trans_speed_changed(self, value):
         """平移速度改变事件处理"""
-        self.MAX_TRANSLATE_SPEED = value
+        self.core.set_max_translate_speed(value)
 
     def on_rota_speed_changed(self, value):
         """旋转速度改变事件处理"""
-        self.MAX_ROTATE_SPEED = value
+        self.core.set_max_rotate_speed(value)
     
     def set_initial_values(self):
         """设置初始值"""
@@ -139,134 +247,201 @@ class RemoteControlWindow(QMainWindow):
         self.ui.max_trans_speed_sb.setRange(0,1.5)
         self.ui.max_trans_speed_sb.setSingleStep(0.1)
         self.ui.max_trans_speed_sb.setDecimals(3)#2位小数
-        self.ui.max_trans_speed_sb.setValue(self.MAX_TRANSLATE_SPEED)
+        self.ui.max_trans_speed_sb.setValue(self.core.max_translate_speed)
         self.ui.max_rota_speed_sb.setSingleStep(0.1)
         self.ui.max_rota_speed_sb.setRange(0,0.769)
         self.ui.max_rota_speed_sb.setDecimals(3)#2位小数
 
-        self.ui.max_rota_speed_sb.setValue(self.MAX_ROTATE_SPEED)
+        self.ui.max_rota_speed_sb.setValue(self.core.max_rotate_speed)
 
     def on_translate_joystick_moved(self, x, y):
         """平移摇杆移动事件处理"""
-        self.translate_x = round(x / 90 * self.MAX_TRANSLATE_SPEED,3)
-        self.translate_y = round(y / 90 * self.MAX_TRANSLATE_SPEED,3)
-        #-max_translate_speed ~ max_translate_speed  -90~90
-        #scrall_factor = /90 * max_translate_speed
-        print(f"平移摇杆：x={self.translate_x:.3f},y={self.translate_y:.3f}")
+        # -90~90 经死区、指数曲线和限幅映射到 -max_translate_speed ~ max_translate_speed
+        translate_x, translate_y = self.core.set_translate_input(x, y)
+        print(f"平移摇杆：x={translate_x:.3f},y={translate_y:.3f}")
         # 更新状态显示
-        self.ui.tranlate_c_lb.setText(f"平移控制: X={self.translate_x:.2f}, Y={self.translate_y:.2f}")
+        self.set_view("translate", f"平移控制: X={translate_x:.2f}, Y={translate_y:.2f}")
     
     def on_rotate_joystick_moved(self, x, y):
         """旋转摇杆移动事件处理"""
-        # 应用速度缩放并限制小数点范围
-        self.rotate_x = round(x / 90 * self.MAX_ROTATE_SPEED, 3)  # 保留3位小数
-        self.rotate_z = round(y / 90 * self.MAX_ROTATE_SPEED, 3)  # 保留3位小数
-        
-        # 限制在合理范围内
-        self.rotate_x = max(min(self.rotate_x, self.MAX_ROTATE_SPEED), -self.MAX_ROTATE_SPEED)
-        self.rotate_z = max(min(self.rotate_z, self.MAX_ROTATE_SPEED), -self.MAX_ROTATE_SPEED)
-        print(f"旋转摇杆：x={self.rotate_x:.3f},y={self.rotate_z:.3f}")
+        # 查表得到速度（已限幅并保留3位小数）
+        rotate_x, rotate_z = self.core.set_rotate_input(x, y)
+        print(f"旋转摇杆：x={rotate_x:.3f},y={rotate_z:.3f}")
         # 更新状态显示，格式化输出
-        self.ui.rotate_c_lb.setText(f"旋转控制:Z={self.rotate_z:.3f} rad/s")
+        self.set_view("rotate", f"旋转控制:Z={rotate_z:.3f} rad/s")
     
+    def init_telemetry(self):
+        """创建遥测曲线；TELEMETRY_SOURCE = "local" 时由本地替身机器人按当前指令生成，否则显示服务器推送的遥测"""
+        from telemetry import TELEMETRY_RATE_HZ
+        from telemetry_plot import TelemetryPlot
+
+        # 界面中的控件是固定位置的，曲线放在它们下方，窗口相应加高
+        self.telemetry_plot = TelemetryPlot(self.core.telemetry, window=TELEMETRY_WINDOW_S, parent=self)
+        self.telemetry_plot.set_profiler(self.profiler, "telemetry_paint")
+        self.telemetry_plot.setGeometry(10, 440, self.width() - 20, TELEMETRY_PLOT_HEIGHT)
+        self.resize(self.width(), self.height() + TELEMETRY_PLOT_HEIGHT)
+        self.telemetry_sc = QShortcut(QKeySequence("F11"), self)
+        self.telemetry_sc.activated.connect(self.toggle_telemetry)
+
+        if TELEMETRY_SOURCE != "local":
+            return
+        self.telemetry_last = time.perf_counter()
+        self.telemetry_timer = QTimer(self)
+        self.telemetry_timer.timeout.connect(self.simulate_telemetry)
+        self.telemetry_timer.start(round(1000 / TELEMETRY_RATE_HZ))
+
+    def toggle_telemetry(self):
+        """显示/隐藏遥测曲线，窗口高度随之调整"""
+        visible = not self.telemetry_plot.isVisible()
+        self.telemetry_plot.setVisible(visible)
+        delta = TELEMETRY_PLOT_HEIGHT if visible else -TELEMETRY_PLOT_HEIGHT
+        self.resize(self.width(), self.height() + delta)
+
+    def simulate_telemetry(self):
+        """本地替身机器人前进一步"""
+        now = time.perf_counter()
+        self.core.simulate_telemetry(now - self.telemetry_last)
+        self.telemetry_last = now
+
+    def set_view(self, key, text):
+        """记录界面文字的更新，下一帧统一刷新"""
+        self.view_pending[key] = text
+        if not self.view_timer.isActive():
+            self.view_timer.start()
+
+    def refresh_view(self):
+        """把本帧内记录的更新应用到控件，文字未变化的控件不重绘"""
+        pending, self.view_pending = self.view_pending, {}
+        for key, text in pending.items():
+            if self.view_shown.get(key) == text:
+                continue
+            self.view_shown[key] = text
+            if key == "status":
+                self.statusBar().showMessage(text)
+            else:
+                self.view_labels[key].setText(text)
+
+    def on_input_sample(self, target, x, y):
+        """输入后端的采样（已回到GUI线程）：同步摇杆显示并交给对应的处理函数"""
+        if target == "translate":
+            self.translate_joystick.show_position(x, y)
+            self.on_translate_joystick_moved(x, y)
+        elif target == "rotate":
+            self.rotate_joystick.show_position(x, y)
+            self.on_rotate_joystick_moved(x, y)
+
     def on_servo_angle_changed(self, servo_id, angle):
         """舵机角度变化事件处理"""
         # 这里可以添加舵机控制逻辑
         print(f"舵机 {servo_id} 角度设置为: {angle}°")
         
         # 更新状态显示 - 使用主窗口的状态栏
-        self.statusBar().showMessage(f"舵机 {servo_id} 角度设置为: {angle}°")
+        self.set_view("status", f"舵机 {servo_id} 角度设置为: {angle}°")
         
-        # 发送舵机更新
-        if SEND_TO_SERVER:
-            self.send_servo_update(servo_id, angle)
+        # 记录到快照，由定时器合并发送
+        self.core.set_servo(servo_id, angle)
+        if self.core.send_enabled and not self.servo_timer.isActive():
+            self.servo_timer.start()
     
     def send_control_data(self):
         """定期发送控制数据到服务器"""
-        # 检查是否有数据变化
-        if SEND_TO_SERVER:
-            if self.translate_x != 0 or self.translate_y != 0 or self.rotate_x != 0 or self.rotate_z != 0:
-                self.robot_speed_changed = True
-                # 准备数据
-                data = {
-                    "translate": {
-                        "x": self.translate_x,
-                        "y": self.translate_y
-                    },
-                    "rotate": {
-                        # 旋转只管z轴，正为左转，负为右转
-                        "z": self.rotate_z
-                    }
-                }
-                
-                try:
-                    # 发送HTTP请求
-                    response = requests.post(
-                        f"{self.api_base_url}/control",
-                        json=data,
-                        timeout=0.5  # 超时时间0.5秒
-                    )
-                    
-                    # 检查响应
-                    if response.status_code == 200:
-                        self.statusBar().showMessage("控制信号发送成功")
-                    else:
-                        self.statusBar().showMessage(f"控制信号发送失败: {response.status_code}")
-                except Exception as e:
-                    self.statusBar().showMessage(f"发送错误: {str(e)}")
+        self.core.tick()
+
+    def send_servo_batch(self):
+        """把全部舵机的最新角度合并为一次批量更新（或轨迹命令）发送"""
+        if SERVO_MAX_VELOCITY is not None:
+            self.core.send_servo_trajectory(max_velocity=SERVO_MAX_VELOCITY)
+        else:
+            self.core.send_servo_batch()
+
+    def update_queue_stats(self):
+        """刷新状态栏中的发送队列计数器"""
+        stats = self.command_sender.stats()
+        self.set_view("queue",
+            f"队列 {stats['depth']} | 替换 {stats['replaced']} | 过期 {stats['expired']} | "
+            f"失败 {stats['failed']} | 发送 {stats['avg_send_ms']:.1f}ms"
+        )
+
+    def update_input_stats(self):
+        """刷新状态栏中的摇杆输入统计"""
+        stats = [self.translate_joystick.input_stats(), self.rotate_joystick.input_stats()]
+        self.set_view("input",
+            f"输入峰值 {max(s['peak_rate'] for s in stats):.0f}次/秒 | "
+            f"合并 {sum(s['coalesced'] for s in stats)}"
+        )
+
+    def adapt_control_rate(self):
+        """每个统计周期根据往返时间调整控制频率"""
+        if self.core.update_rate():
+            self.send_timer.setInterval(round(1000 / self.core.rate_controller.rate_hz))
+        self.show_control_rate()
+
+    def show_control_rate(self):
+        """在状态栏显示当前控制频率及其原因"""
+        self.set_view("rate",
+            f"控制频率 {self.core.rate_controller.rate_hz}Hz ({self.core.rate_controller.reason})"
+        )
+
+    def update_latency_stats(self):
+        """刷新状态栏中的延迟百分位数"""
+        self.set_view("latency", self.core.latency_tracker.format_summary())
+
+    def export_latency(self):
+        """把延迟样本导出到当前目录下的 CSV 文件"""
+        path = time.strftime("latency_%Y%m%d_%H%M%S.csv")
+        count = self.core.latency_tracker.export(path)
+        self.set_view("status", f"已导出 {count} 条延迟样本到 {path}")
+
+    def network_diagnostics(self):
+        """诊断面板中的网络部分：后台发送耗时和队列状态"""
+        stats = self.core.stats()
+        return [
+            f"网络发送 最近 {stats['last_send_ms']:.2f}  平均 {stats['avg_send_ms']:.2f}  "
+            f"最大 {stats['max_send_ms']:.2f}ms",
+            f"发送队列 {stats['depth']}  过期 {stats['expired']}  失败 {stats['failed']}  "
+            f"未变化跳过 {stats['skipped']}",
+        ]
+
+    def toggle_diagnostics_stream(self):
+        """开始/停止把诊断样本写入文件"""
+        path = self.diagnostics.toggle_stream()
+        if path is None:
+            self.set_view("status", "已停止记录诊断数据")
+        else:
+            self.set_view("status", f"诊断数据记录到 {path}")
+
+    def on_send_finished(self, kind, tag, ok, detail, elapsed, timing):
+        """后台发送完成（已回到GUI线程）"""
+        self.core.handle_result(kind, tag, ok, detail, elapsed, timing)
+        if kind == "control":
+            name = "零速控制信号" if tag == "zero" else "控制信号"
+            if ok:
+                self.set_view("status", f"{name}发送成功")
             else:
-                if self.robot_speed_changed:
-                    # 准备数据
-                    data = {
-                        "translate": {
-                            "x": 0,
-                            "y": 0
-                        },
-                        "rotate": {
-                            # 旋转只管z轴，正为左转，负为右转
-                            "z": 0
-                        }
-                    }
-                    
-                    try:
-                        # 发送HTTP请求
-                        response = requests.post(
-                            f"{self.api_base_url}/control",
-                            json=data,
-                            timeout=0.5  # 超时时间0.5秒
-                        )
-                        
-                        # 检查响应
-                        if response.status_code == 200:
-                            self.statusBar().showMessage("零速控制信号发送成功")
-                        else:
-                            self.statusBar().showMessage(f"零速控制信号发送失败: {response.status_code}")
-                    except Exception as e:
-                        self.statusBar().showMessage(f"发送错误: {str(e)}")
-                    self.robot_speed_changed = False
-                
-    def send_servo_update(self, servo_id, angle):
-        """发送舵机更新到服务器"""
-        data = {
-            "servo_id": servo_id,
-            "angle": angle
-        }
-        
-        try:
-            # 发送HTTP请求
-            response = requests.post(
-                f"{self.api_base_url}/servo",
-                json=data,
-                timeout=0.5  # 超时时间0.5秒
-            )
-            
-            # 检查响应
-            if response.status_code == 200:
-                print(f"舵机 {servo_id} 更新发送成功")
+                self.set_view("status", f"{name}发送失败: {detail}")
+        elif kind in ("servo_batch", "servo_trajectory"):
+            name = "舵机批量更新" if kind == "servo_batch" else "舵机轨迹命令"
+            if ok:
+                print(f"{name}发送成功")
             else:
-                print(f"舵机 {servo_id} 更新发送失败: {response.status_code}")
-        except Exception as e:
-            print(f"舵机更新发送错误: {str(e)}")
+                print(f"{name}发送失败: {detail}")
+
+    def on_server_message(self, message):
+        """长连接上收到服务器消息（已回到GUI线程）"""
+        self.core.handle_message(message)
+        if message.get("type") == "ack":
+            rtt_ms = message.get("rtt", 0) * 1000
+            self.set_view("status", f"服务器已确认 #{message['seq']} 往返 {rtt_ms:.1f}ms")
+        elif message.get("type") == "error":
+            self.set_view("status", f"服务器错误: {message.get('error')}")
+
+    def closeEvent(self, event):
+        """关闭窗口时停止后台发送线程和输入后端"""
+        if self.input_source is not None:
+            self.input_source.stop()
+        self.core.close()
+        self.profiler.stop_stream()
+        super().closeEvent(event)
 
 if __name__ == "__main__":
     app = QApplication(sys.argv)
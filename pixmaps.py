@@ -0,0 +1,47 @@
+"""进程内共享的图片缓存
+
+图片优先从编译后的Qt资源包读取（pyside6-rcc resources.qrc -o resources_rc.py），
+没有资源包时从本文件所在目录读取，与当前工作目录无关。每张图片只加载一次，
+按尺寸和设备像素比缩放后的结果也在所有控件之间共享。
+"""
+from pathlib import Path
+
+from PySide6.QtCore import Qt
+from PySide6.QtGui import QPixmap
+
+try:
+    import resources_rc  # noqa: F401  导入即注册 ":/image/..." 资源
+except ImportError:
+    resources_rc = None
+
+BASE_DIR = Path(__file__).resolve().parent
+
+_pixmaps = {}  # 相对路径 -> QPixmap
+_scaled = {}  # (相对路径, 边长, 设备像素比) -> QPixmap
+
+
+def load_pixmap(name):
+    """按相对路径（如 "image/max.png"）加载图片，失败时返回空图片并打印警告"""
+    pixmap = _pixmaps.get(name)
+    if pixmap is None:
+        pixmap = QPixmap(f":/{name}") if resources_rc is not None else QPixmap()
+        if pixmap.isNull():
+            pixmap = QPixmap(str(BASE_DIR / name))
+        if pixmap.isNull():
+            print(f"警告: 图片加载失败: {name}")
+        _pixmaps[name] = pixmap
+    return pixmap
+
+
+def scaled_pixmap(name, size, dpr):
+    """返回缩放到 size x size 逻辑像素、按设备像素比 dpr 渲染的图片"""
+    key = (name, size, dpr)
+    pixmap = _scaled.get(key)
+    if pixmap is None:
+        pixmap = load_pixmap(name)
+        if not pixmap.isNull():
+            pixels = round(size * dpr)
+            pixmap = pixmap.scaled(pixels, pixels, Qt.IgnoreAspectRatio, Qt.SmoothTransformation)
+            pixmap.setDevicePixelRatio(dpr)
+        _scaled[key] = pixmap
+    return pixmap
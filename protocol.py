@@ -0,0 +1,49 @@
+"""UDP控制帧的二进制格式（定长、小端）
+
+帧布局（68字节）:
+    magic(2s) version(B) 保留(x) session(I) seq(I) timestamp(d) robot_id(8s) x y z(3f) 舵机角度(7f)
+session 是发送端每次启动时随机选择的会话号，接收端看到新的会话号时重新开始序号，
+客户端重启后的第一帧即被接受。
+robot_id 为 UTF-8 编码、以 0 填充的机器人编号。未知的舵机角度用 NaN 表示，接收端会忽略。
+"""
+import math
+import struct
+from collections import namedtuple
+
+MAGIC = b"RC"
+VERSION = 3
+SERVO_COUNT = 7
+SEQ_MASK = 0xFFFFFFFF
+
+FRAME = struct.Struct("<2sBxIId8s3f7f")
+FRAME_SIZE = FRAME.size
+
+ControlFrame = namedtuple("ControlFrame", "session seq timestamp robot_id x y z angles")
+
+
+def pack_frame(session, seq, timestamp, robot_id, x, y, z, angles):
+    """打包一帧控制数据"""
+    return FRAME.pack(MAGIC, VERSION, session, seq & SEQ_MASK, timestamp, robot_id.encode(), x, y, z, *angles)
+
+
+def unpack_frame(buf):
+    """解包一帧控制数据，格式不对时抛出 ValueError"""
+    if len(buf) != FRAME_SIZE:
+        raise ValueError(f"帧长度错误: {len(buf)}")
+    magic, version, session, seq, timestamp, robot_id, x, y, z, *angles = FRAME.unpack(buf)
+    if magic != MAGIC or version != VERSION:
+        raise ValueError(f"未知的帧头: {magic!r} v{version}")
+    try:
+        robot_id = robot_id.rstrip(b"\0").decode()
+    except UnicodeDecodeError:
+        raise ValueError(f"无效的机器人编号: {robot_id!r}")
+    return ControlFrame(session, seq, timestamp, robot_id, x, y, z, angles)
+
+
+def seq_newer(seq, last):
+    """在32位回绕意义下判断 seq 是否比 last 新"""
+    return seq != last and ((seq - last) & SEQ_MASK) < 0x80000000
+
+
+def angle_known(angle):
+    return not math.isnan(angle)
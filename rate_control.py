@@ -0,0 +1,66 @@
+"""根据往返时间和错误率自适应调整控制频率"""
+import statistics
+
+MIN_RATE_HZ = 10
+MAX_RATE_HZ = 200
+
+
+def clamp_rate(rate_hz):
+    return max(MIN_RATE_HZ, min(MAX_RATE_HZ, int(rate_hz)))
+
+
+class AdaptiveRateController:
+    """加性增、乘性减（AIMD）的控制频率调节器
+
+    每个评估周期内收集发送结果，周期结束时调用 update():
+      - 错误率超过 max_error_rate: 频率减半
+      - 发送周期不足 RTT 的 headroom 倍: 降到 RTT 允许的上限
+      - 否则在上限以内每次增加 step_hz
+    非自适应模式下频率保持不变。
+    """
+
+    def __init__(self, rate_hz=10, adaptive=False, step_hz=10, headroom=2.0, max_error_rate=0.05):
+        self.rate_hz = clamp_rate(rate_hz)
+        self.adaptive = adaptive
+        self.step_hz = step_hz
+        self.headroom = headroom
+        self.max_error_rate = max_error_rate
+        self.reason = "固定频率"
+        self._rtts = []
+        self._errors = 0
+
+    def record(self, rtt, ok):
+        """记录一次发送结果，rtt 为往返时间（秒）"""
+        if ok:
+            self._rtts.append(rtt)
+        else:
+            self._errors += 1
+
+    def update(self):
+        """结束一个评估周期，返回 (频率, 原因)"""
+        rtts, errors = self._rtts, self._errors
+        self._rtts, self._errors = [], 0
+        if not self.adaptive:
+            return self.rate_hz, self.reason
+        total = len(rtts) + errors
+        if total == 0:
+            self.reason = "无发送数据，保持"
+            return self.rate_hz, self.reason
+
+        error_rate = errors / total
+        if error_rate > self.max_error_rate:
+            self.rate_hz = clamp_rate(self.rate_hz / 2)
+            self.reason = f"错误率 {error_rate:.0%}，降速"
+            return self.rate_hz, self.reason
+
+        rtt = statistics.median(rtts)
+        ceiling = clamp_rate(1.0 / (rtt * self.headroom)) if rtt > 0 else MAX_RATE_HZ
+        if self.rate_hz > ceiling:
+            self.rate_hz = ceiling
+            self.reason = f"RTT {rtt * 1000:.1f}ms 偏高，降速"
+        elif self.rate_hz < ceiling:
+            self.rate_hz = min(ceiling, self.rate_hz + self.step_hz)
+            self.reason = f"RTT {rtt * 1000:.1f}ms 良好，提速"
+        else:
+            self.reason = f"RTT {rtt * 1000:.1f}ms，已达上限"
+        return self.rate_hz, self.reason
@@ -0,0 +1,112 @@
+"""控制命令录制：追加写入内存映射的定长帧二进制文件
+
+文件布局（小端）:
+    文件头: magic(8s) 帧数(Q)
+    帧:     timestamp(d) kind(B) 保留(3x) x y z(3f) 舵机角度(7f) duration max_velocity(2f)   共 60 字节
+每帧是一条实际发出的命令，kind 为 FRAME_CONTROL / FRAME_SERVO_BATCH / FRAME_SERVO_TRAJECTORY，
+该命令没有的字段（以及未知的舵机角度）为 NaN。
+文件按块预分配并映射到内存，录制一帧只是一次 struct.pack_into，
+不产生系统调用，可以在生产环境中常开。关闭时截断到实际长度。
+
+旧版（RCLOG1）文件的帧没有类型，舵机角度可能是从未发送过的初始值，读取时只作为控制命令。
+"""
+import math
+import mmap
+import os
+import struct
+import time
+
+from protocol import SERVO_COUNT
+
+MAGIC = b"RCLOG2\0\0"
+MAGIC_V1 = b"RCLOG1\0\0"
+HEADER = struct.Struct("<8sQ")
+RECORD_FRAME = struct.Struct(f"<dB3x3f{SERVO_COUNT}f2f")
+RECORD_FRAME_V1 = struct.Struct(f"<d3f{SERVO_COUNT}f")
+
+FRAME_CONTROL = 0
+FRAME_SERVO_BATCH = 1
+FRAME_SERVO_TRAJECTORY = 2
+
+NAN = math.nan
+NO_ANGLES = (NAN,) * SERVO_COUNT
+
+
+def _open_new(path):
+    """以独占方式创建录制文件，文件已存在时在文件名后加上时间（仍冲突时再加序号），返回 (路径, 文件)
+
+    不会覆盖之前的录制。
+    """
+    root, ext = os.path.splitext(path)
+    stamped = f"{root}_{time.strftime('%Y%m%d_%H%M%S')}"
+    candidates = [path, stamped + ext] + [f"{stamped}_{n}{ext}" for n in range(1, 100)]
+    for candidate in candidates:
+        try:
+            return candidate, open(candidate, "x+b")
+        except FileExistsError:
+            continue
+    raise FileExistsError(f"无法为 {path} 创建新的录制文件")
+
+
+class ControlRecorder:
+    """追加写入的内存映射录制文件；path 已存在时改用带时间的文件名（见 self.path）"""
+
+    def __init__(self, path, chunk_frames=4096):
+        self.chunk_size = chunk_frames * RECORD_FRAME.size
+        self.path, self.file = _open_new(path)
+        self.count = 0
+        self.capacity = 0
+        self.map = None
+        self._grow()
+        HEADER.pack_into(self.map, 0, MAGIC, 0)
+
+    def _grow(self):
+        """扩大文件并重新映射"""
+        if self.map is not None:
+            self.map.close()
+        self.capacity += self.chunk_size // RECORD_FRAME.size
+        self.file.truncate(HEADER.size + self.capacity * RECORD_FRAME.size)
+        self.map = mmap.mmap(self.file.fileno(), 0)
+
+    def record(self, timestamp, kind, x=NAN, y=NAN, z=NAN, angles=NO_ANGLES, duration=None,
+               max_velocity=None):
+        """追加一帧；angles 中的 None 表示未知"""
+        if self.count >= self.capacity:
+            self._grow()
+        RECORD_FRAME.pack_into(self.map, HEADER.size + self.count * RECORD_FRAME.size,
+                               timestamp, kind, x, y, z, *(NAN if a is None else a for a in angles),
+                               NAN if duration is None else duration,
+                               NAN if max_velocity is None else max_velocity)
+        self.count += 1
+        # 文件头中的帧数随每帧更新，进程崩溃后文件依然可读
+        HEADER.pack_into(self.map, 0, MAGIC, self.count)
+
+    def close(self):
+        if self.map is None:
+            return
+        self.map.flush()
+        self.map.close()
+        self.map = None
+        self.file.truncate(HEADER.size + self.count * RECORD_FRAME.size)
+        self.file.close()
+
+
+def read_recording(path):
+    """读取录制文件，生成 (timestamp, kind, x, y, z, angles, duration, max_velocity)，缺少的字段为 NaN"""
+    with open(path, "rb") as f:
+        if os.fstat(f.fileno()).st_size < HEADER.size:
+            return
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            magic, count = HEADER.unpack_from(data, 0)
+            if magic not in (MAGIC, MAGIC_V1):
+                raise ValueError(f"不是控制命令录制文件: {path}")
+            frame = RECORD_FRAME if magic == MAGIC else RECORD_FRAME_V1
+            count = min(count, (len(data) - HEADER.size) // frame.size)
+            for i in range(count):
+                values = frame.unpack_from(data, HEADER.size + i * frame.size)
+                if magic == MAGIC_V1:
+                    timestamp, x, y, z = values[:4]
+                    yield timestamp, FRAME_CONTROL, x, y, z, list(NO_ANGLES), NAN, NAN
+                else:
+                    timestamp, kind, x, y, z, *angles, duration, max_velocity = values
+                    yield timestamp, kind, x, y, z, angles, duration, max_velocity
@@ -0,0 +1,80 @@
+"""按原始节奏（或加速）把录制的控制命令重新发送到服务器
+
+用法:
+    python replay.py session.rclog                       # 原始节奏，HTTP
+    python replay.py session.rclog --speed 4             # 4 倍速
+    python replay.py session.rclog --speed 0             # 不等待，尽快发送
+    python replay.py session.rclog --transport stream --robot-id r2
+"""
+import argparse
+import math
+import time
+
+from recorder import FRAME_CONTROL, FRAME_SERVO_BATCH, FRAME_SERVO_TRAJECTORY, read_recording
+from robot_table import DEFAULT_ROBOT_ID
+from transport import create_transport
+
+
+def _known(value):
+    return None if math.isnan(value) else value
+
+
+def frame_command(robot_id, kind, x, y, z, angles, duration, max_velocity):
+    """把一帧还原为原来发出的命令 (类型, data)，没有内容的帧（如角度全部未知）返回 None"""
+    if kind == FRAME_CONTROL:
+        return "control", {"robot_id": robot_id, "translate": {"x": x, "y": y}, "rotate": {"z": z}}
+    angles = [_known(a) for a in angles]
+    if all(a is None for a in angles):
+        return None
+    if kind == FRAME_SERVO_BATCH:
+        return "servo_batch", {"robot_id": robot_id, "angles": angles}
+    if kind == FRAME_SERVO_TRAJECTORY:
+        data = {"robot_id": robot_id, "angles": angles}
+        for name, value in (("duration", duration), ("max_velocity", max_velocity)):
+            if _known(value) is not None:
+                data[name] = value
+        return "servo_trajectory", data
+    return None
+
+
+def replay(path, transport, speed=1.0, robot_id=DEFAULT_ROBOT_ID):
+    """回放录制文件（每帧按原来的类型重新发送），返回 (发送数, 失败数, 耗时)"""
+    sent = failed = 0
+    start = time.perf_counter()
+    first = None
+    for timestamp, *frame in read_recording(path):
+        if first is None:
+            first = timestamp
+        command = frame_command(robot_id, *frame)
+        if command is None:
+            continue
+        if speed > 0:
+            delay = (timestamp - first) / speed - (time.perf_counter() - start)
+            if delay > 0:
+                time.sleep(delay)
+        try:
+            ok = transport.send(*command)[0]
+        except Exception:
+            ok = False
+        sent += 1
+        failed += not ok
+    return sent, failed, time.perf_counter() - start
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="回放录制的控制命令")
+    parser.add_argument("path", help="录制文件（main.py 中 RECORD_PATH 生成）")
+    parser.add_argument("--url", default="http://127.0.0.1:5000/api", help="服务器 API 地址")
+    parser.add_argument("--transport", choices=["http", "udp", "stream"], default="http")
+    parser.add_argument("--udp-port", type=int, default=5005)
+    parser.add_argument("--stream-port", type=int, default=5100)
+    parser.add_argument("--speed", type=float, default=1.0, help="回放倍速，0 表示不等待")
+    parser.add_argument("--robot-id", default=DEFAULT_ROBOT_ID)
+    args = parser.parse_args()
+
+    transport = create_transport(args.transport, args.url, args.udp_port, args.stream_port)
+    try:
+        sent, failed, elapsed = replay(args.path, transport, args.speed, args.robot_id)
+    finally:
+        transport.close()
+    print(f"回放 {sent} 条命令，失败 {failed} 条，耗时 {elapsed:.2f}s（{sent / max(elapsed, 1e-9):.0f} 条/秒）")
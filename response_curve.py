@@ -0,0 +1,77 @@
+"""摇杆响应曲线：死区、指数曲线和圆形/方形限幅，通过预计算的查找表求值
+
+摇杆输出的整数坐标范围是 -radius~radius（默认 ±90），查找表覆盖全部
+(2*radius+1)^2 个输入，每个事件只需一次下标计算。单位曲线在创建时计算一次，
+最大速度变化时只需按比例重建查找表。
+"""
+import math
+from array import array
+
+CLAMP_CIRCLE = "circle"  # 按向量长度限幅，斜向最大速度与正向相同
+CLAMP_SQUARE = "square"  # 每个轴单独限幅和计算曲线
+
+
+def shape(value, dead_zone, expo):
+    """把 0~1 的输入幅值映射为 0~1 的输出：死区内为 0，之后按 (1-expo)*v + expo*v^3"""
+    if value <= dead_zone:
+        return 0.0
+    value = min((value - dead_zone) / (1.0 - dead_zone), 1.0)
+    return (1.0 - expo) * value + expo * value ** 3
+
+
+class ResponseCurve:
+    """摇杆坐标 -> 速度的查找表"""
+
+    def __init__(self, max_value, dead_zone=0.05, expo=0.3, clamp=CLAMP_CIRCLE, radius=90, digits=3):
+        if not 0.0 <= dead_zone < 1.0:
+            raise ValueError(f"死区必须在 0~1 之间: {dead_zone}")
+        if not 0.0 <= expo <= 1.0:
+            raise ValueError(f"指数系数必须在 0~1 之间: {expo}")
+        if clamp not in (CLAMP_CIRCLE, CLAMP_SQUARE):
+            raise ValueError(f"未知的限幅方式: {clamp}")
+        self.dead_zone = dead_zone
+        self.expo = expo
+        self.clamp = clamp
+        self.radius = radius
+        self.digits = digits
+        self.size = radius * 2 + 1
+        self.unit_x, self.unit_y = self._build_unit()
+        self.max_value = None
+        self.table_x = self.table_y = None
+        self.set_max(max_value)
+
+    def set_max(self, max_value):
+        """设置最大输出值，值变化时按单位曲线重建查找表"""
+        if max_value == self.max_value:
+            return
+        self.max_value = max_value
+        digits = self.digits
+        self.table_x = array("d", [round(v * max_value, digits) for v in self.unit_x])
+        self.table_y = array("d", [round(v * max_value, digits) for v in self.unit_y])
+
+    def _build_unit(self):
+        """计算最大输出为 1 时的曲线，曲线参数不变时只计算一次"""
+        radius, dead_zone, expo = self.radius, self.dead_zone, self.expo
+        unit_x, unit_y = [], []
+        # 方形限幅时每个轴独立，先算好一维曲线
+        axis = [math.copysign(shape(abs(v) / radius, dead_zone, expo), v)
+                for v in range(-radius, radius + 1)]
+        for x in range(-radius, radius + 1):
+            for y in range(-radius, radius + 1):
+                if self.clamp == CLAMP_SQUARE:
+                    unit_x.append(axis[x + radius])
+                    unit_y.append(axis[y + radius])
+                    continue
+                length = math.hypot(x, y)
+                scale = shape(length / radius, dead_zone, expo) / length if length else 0.0
+                unit_x.append(x * scale)
+                unit_y.append(y * scale)
+        return unit_x, unit_y
+
+    def lookup(self, x, y):
+        """摇杆坐标（超出范围时截断）-> (x 方向输出, y 方向输出)"""
+        radius = self.radius
+        x = min(max(int(x), -radius), radius)
+        y = min(max(int(y), -radius), radius)
+        i = (x + radius) * self.size + y + radius
+        return self.table_x[i], self.table_y[i]
@@ -0,0 +1,153 @@
+"""服务器端的多机器人状态表
+
+每个机器人占一个槽位，槽位在预分配的 double 数组中连续存放:
+    vx, vy, wz, 舵机0~6 角度（未知为 NaN）, 更新时间
+robot_id -> 槽位的查找和读写都是 O(1)。每个槽位有自己的锁，
+不同操作端控制不同机器人时互不争用。
+"""
+import math
+import threading
+import time
+from array import array
+
+from protocol import SERVO_COUNT
+
+DEFAULT_ROBOT_ID = "default"
+# 命令数值的合理范围，超出时视为无效命令（不是机器人的实际限位）
+MAX_SPEED = 10.0  # 速度分量的绝对值上限 (m/s 或 rad/s)
+ANGLE_RANGE = (-360.0, 360.0)  # 舵机角度 (度)
+# robot_id 编码为 UTF-8 后的最大长度（UDP帧和日志记录中为定长字段）
+MAX_ROBOT_ID_LEN = 8
+
+VX, VY, WZ = 0, 1, 2
+SERVO_BASE = 3
+UPDATED = SERVO_BASE + SERVO_COUNT
+STRIDE = UPDATED + 1
+
+
+class RobotTableFull(Exception):
+    """状态表的槽位已用完"""
+
+
+def check_robot_id(robot_id):
+    """检查 robot_id 是否合法，不合法时抛出 ValueError"""
+    if not isinstance(robot_id, str) or not robot_id or len(robot_id.encode()) > MAX_ROBOT_ID_LEN:
+        raise ValueError(f"无效的机器人编号: {robot_id!r}（1~{MAX_ROBOT_ID_LEN} 字节的字符串）")
+    return robot_id
+
+
+def check_number(value, name, low, high):
+    """转换为 float 并检查范围（NaN 和无穷大不在任何范围内），不合法时抛出 ValueError"""
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        raise ValueError(f"无效的{name}: {value!r}") from None
+    if not low <= number <= high:
+        raise ValueError(f"{name}超出范围 {low:g}~{high:g}: {value!r}")
+    return number
+
+
+def check_velocity(vx, vy, wz):
+    """检查速度命令，返回 (vx, vy, wz) 的 float"""
+    return tuple(check_number(v, "速度", -MAX_SPEED, MAX_SPEED) for v in (vx, vy, wz))
+
+
+def check_angle(angle):
+    return check_number(angle, "舵机角度", *ANGLE_RANGE)
+
+
+def check_servo_id(servo_id):
+    if not isinstance(servo_id, int) or not 0 <= servo_id < SERVO_COUNT:
+        raise ValueError(f"无效的舵机编号: {servo_id}")
+    return servo_id
+
+
+def check_angles(angles):
+    """检查全部舵机的角度，None/NaN 表示保持不变（返回 NaN）"""
+    if not isinstance(angles, (list, tuple)) or len(angles) != SERVO_COUNT:
+        raise ValueError(f"需要 {SERVO_COUNT} 个舵机角度")
+    return [math.nan if a is None or (isinstance(a, float) and math.isnan(a)) else check_angle(a)
+            for a in angles]
+
+
+class RobotStateTable:
+    """预分配的机器人状态表"""
+
+    def __init__(self, capacity=256):
+        self.capacity = capacity
+        self.values = array("d", [0.0]) * (capacity * STRIDE)
+        for slot in range(capacity):
+            base = slot * STRIDE
+            self.values[base + SERVO_BASE:base + UPDATED] = array("d", [math.nan] * SERVO_COUNT)
+        self.locks = [threading.Lock() for _ in range(capacity)]
+        self.slots = {}  # robot_id -> 槽位
+        self.robot_ids = []  # 槽位 -> robot_id
+        self.alloc_lock = threading.Lock()
+
+    def slot(self, robot_id):
+        """返回机器人的槽位，首次出现时分配"""
+        slot = self.slots.get(robot_id)
+        if slot is not None:
+            return slot
+        check_robot_id(robot_id)
+        with self.alloc_lock:
+            slot = self.slots.get(robot_id)
+            if slot is None:
+                if len(self.robot_ids) >= self.capacity:
+                    raise RobotTableFull(f"最多支持 {self.capacity} 个机器人")
+                slot = len(self.robot_ids)
+                self.robot_ids.append(robot_id)
+                self.slots[robot_id] = slot
+        return slot
+
+    # 写入方法先转换并检查全部数值，不合法时抛出 ValueError，不会只写入一部分
+
+    def set_velocity(self, robot_id, vx, vy, wz):
+        vx, vy, wz = check_velocity(vx, vy, wz)
+        slot = self.slot(robot_id)
+        base = slot * STRIDE
+        with self.locks[slot]:
+            self.values[base + VX] = vx
+            self.values[base + VY] = vy
+            self.values[base + WZ] = wz
+            self.values[base + UPDATED] = time.time()
+
+    def set_servo(self, robot_id, servo_id, angle):
+        servo_id = check_servo_id(servo_id)
+        angle = check_angle(angle)
+        slot = self.slot(robot_id)
+        base = slot * STRIDE
+        with self.locks[slot]:
+            self.values[base + SERVO_BASE + servo_id] = angle
+            self.values[base + UPDATED] = time.time()
+
+    def set_servos(self, robot_id, angles):
+        """设置全部舵机角度，None/NaN 表示保持不变"""
+        angles = check_angles(angles)
+        slot = self.slot(robot_id)
+        base = slot * STRIDE + SERVO_BASE
+        with self.locks[slot]:
+            for i, angle in enumerate(angles):
+                if not math.isnan(angle):
+                    self.values[base + i] = angle
+            self.values[slot * STRIDE + UPDATED] = time.time()
+
+    def get(self, robot_id):
+        """返回机器人当前的指令状态，未出现过的机器人返回 None"""
+        slot = self.slots.get(robot_id)
+        if slot is None:
+            return None
+        base = slot * STRIDE
+        with self.locks[slot]:
+            row = self.values[base:base + STRIDE]
+        return {
+            "robot_id": robot_id,
+            "translate": {"x": row[VX], "y": row[VY]},
+            "rotate": {"z": row[WZ]},
+            "servos": [None if math.isnan(a) else a for a in row[SERVO_BASE:UPDATED]],
+            "updated": row[UPDATED],
+        }
+
+    def robots(self):
+        """已出现过的全部 robot_id"""
+        return list(self.robot_ids)
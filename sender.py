@@ -0,0 +1,34 @@
+from PySide6.QtCore import QObject, Signal
+
+from transport import SendWorker
+
+
+class CommandSender(QObject):
+    """把命令交给后台线程发送，发送结果通过Qt信号回到GUI线程"""
+    # kind, tag, 是否成功, 说明, 耗时(秒), 服务器回显的时间戳(dict 或 None)
+    sendFinished = Signal(str, str, bool, str, float, object)
+    # 长连接上服务器主动发回的消息（应答、状态）
+    messageReceived = Signal(object)
+
+    def __init__(self, transport, parent=None, max_age=0.3):
+        super().__init__(parent)
+        if hasattr(transport, "on_message"):
+            transport.on_message = self.messageReceived.emit
+        self.worker = SendWorker(transport, self._on_worker_result, max_age)
+        self.worker.start()
+
+    def submit(self, kind, data, tag="", droppable=True):
+        """提交命令，立即返回；同类型的未发送命令会被替换"""
+        self.worker.submit(kind, data, tag, droppable)
+
+    def stats(self):
+        """队列深度、丢弃数量和发送耗时等计数器"""
+        return self.worker.stats()
+
+    def stop(self):
+        """停止后台发送线程"""
+        self.worker.stop()
+
+    def _on_worker_result(self, kind, tag, ok, detail, elapsed, timing):
+        # 在发送线程中调用，跨线程信号会以排队方式投递到GUI线程
+        self.sendFinished.emit(kind, tag, ok, detail, elapsed, timing)
@@ -1,36 +1,293 @@
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request
+import argparse
+import math
+import os
+import socket
+import threading
 import time
 
+from commands import (apply_control, control_states, echo_timing, journal, process_control,
+                      process_servo, process_servo_batch, process_servo_trajectory, robot_id_of,
+                      robots, state_feed)
+from delta import DeltaOutOfSync
+from robot_table import RobotTableFull
+from protocol import FRAME_SIZE, angle_known, seq_newer, unpack_frame
+import stream_server
+from codec import CodecError, UnsupportedCodec, codec_for, response_codec
+
 app = Flask(__name__)
 
+# UDP帧超过该时间（秒，相对于该发送端最快到达的帧）视为过期
+UDP_MAX_FRAME_AGE = 0.2
+# 帧时间戳比上一次接受的帧新出这么多（秒）时，认为客户端重新开始了序号
+# （客户端重启时帧中的会话号会变化，立即重新开始，不需要等待）
+UDP_SESSION_RESET = 1.0
+# 超过该时间（秒）收不到某个机器人的UDP帧时把它的速度置零（客户端静止时也每个周期发送零速帧）
+UDP_COMMAND_TIMEOUT = 0.5
+# 长轮询订阅的默认和最长等待时间（秒）；每个等待中的请求占用一个工作线程
+SUBSCRIBE_TIMEOUT = 25.0
+SUBSCRIBE_MAX_TIMEOUT = 60.0
+# 同时等待的长轮询请求数上限（生产模式为工作线程数的 1/4），超出时返回 503，
+# 保证控制命令总有空闲的工作线程
+SUBSCRIBE_MAX_WAITING = 2
+# 长轮询达到上限时建议客户端重试的间隔（秒）
+SUBSCRIBE_RETRY_AFTER = 1
+
+subscribe_slots = threading.BoundedSemaphore(SUBSCRIBE_MAX_WAITING)
+
+
+def read_command(kind):
+    """按 Content-Type 解码请求体（没有 Content-Type 时按 JSON），请求体不是对象时抛出 CodecError"""
+    data = codec_for(request.content_type).decode(request.get_data(), kind)
+    if not isinstance(data, dict):
+        raise CodecError(f"{kind} 的请求体必须是对象，而不是 {type(data).__name__}")
+    return data
+
+def reply(message, status=200):
+    """按 Accept 编码应答，缺省时与请求的编码相同"""
+    try:
+        request_codec = codec_for(request.content_type)
+    except UnsupportedCodec:
+        request_codec = codec_for(None)
+    codec = response_codec(request.headers.get('Accept'), request_codec)
+    return Response(codec.encode(message), status=status, mimetype=codec.content_type)
+
 
 @app.route('/api/control', methods=['POST'])
 def handle_control():
-    data = request.json
-
-    # 获取控制数据
-    translate = data.get('translate', {})
-    rotate = data.get('rotate', {})
-    
-    # 在这里处理控制数据（示例：打印到控制台）
-    print(f"平移控制: X={translate.get('x', 0)}, Y={translate.get('y', 0)}")
-    print(f"旋转控制: X={rotate.get('x', 0)}, Y={rotate.get('y', 0)}")
-    
-    # 可以在这里将控制数据转发给机器人或其他人
-    
-    return jsonify({"status": "success"})
+    t_recv = time.time()
+    data = read_command('control')
+
+    # 获取控制数据（完整状态、增量或心跳），按机器人编号路由
+    robot_id = robot_id_of(data)
+    try:
+        apply_control(control_states, robot_id, data)
+    except DeltaOutOfSync as e:
+        # 客户端收到 409 后会重新发送完整状态
+        return reply({"status": "resync", "error": str(e)}, 409)
+
+    result = {"status": "success"}
+    timing = echo_timing(data, t_recv)
+    if timing is not None:
+        result["timing"] = timing
+    return reply(result)
 
 @app.route('/api/servo', methods=['POST'])
 def handle_servo():
-    data = request.json
+    data = read_command('servo')
     # 获取舵机数据
     servo_id = data.get('servo_id')
     angle = data.get('angle')
-    
-    # 在这里处理舵机数据（示例：打印到控制台）
-    print(f"舵机 {servo_id} 角度更新: {angle}°")
-    
-    return jsonify({"status": "success"})
+    process_servo(robot_id_of(data), servo_id, angle)
+
+    return reply({"status": "success"})
+
+@app.route('/api/servo/batch', methods=['POST'])
+def handle_servo_batch():
+    data = read_command('servo_batch')
+    # 获取全部舵机的角度快照
+    # 数量或数值不合法时抛出 ValueError（400）
+    process_servo_batch(robot_id_of(data), data.get('angles', []))
+
+    return reply({"status": "success"})
+
+@app.route('/api/servo/trajectory', methods=['POST'])
+def handle_servo_trajectory():
+    data = read_command('servo_trajectory')
+    # 目标角度（None 表示保持），加上动作时长（秒）或速度上限（度/秒），由服务器插值
+    duration = process_servo_trajectory(robot_id_of(data), data.get('angles', []),
+                                        data.get('duration'), data.get('max_velocity'))
+
+    return reply({"status": "success", "duration": duration})
+
+@app.route('/api/state', methods=['GET'])
+def handle_state():
+    # 指定 robot_id 时返回该机器人的指令状态，否则返回所有机器人的共享快照
+    if 'robot_id' in request.args:
+        robot_id = robot_id_of(request.args)
+        state = robots.get(robot_id)
+        if state is None:
+            return reply({"status": "error", "error": f"没有机器人 {robot_id} 的指令"}, 404)
+        return reply(state)
+    version, encoded = state_feed.snapshot()
+    return Response(encoded, mimetype='application/json')
+
+@app.route('/api/state/subscribe', methods=['GET'])
+def handle_state_subscribe():
+    # 长轮询：版本号超过 since 时立即返回快照，否则等待变化或超时（超时返回当前快照）
+    try:
+        since = int(request.args.get('since', -1))
+        timeout = float(request.args.get('timeout', SUBSCRIBE_TIMEOUT))
+    except ValueError:
+        raise ValueError("since 和 timeout 必须是数字") from None
+    if not math.isfinite(timeout):
+        # NaN 会绕过下面的范围限制，使请求永远等待
+        raise ValueError(f"timeout 必须是有限的数字: {timeout}")
+    timeout = min(max(timeout, 0.0), SUBSCRIBE_MAX_TIMEOUT)
+    if state_feed.version > since or timeout == 0:
+        # 不需要等待，不占用等待名额
+        version, encoded = state_feed.snapshot()
+        return Response(encoded, mimetype='application/json')
+    if not subscribe_slots.acquire(blocking=False):
+        response = reply({"status": "error", "error": "等待中的订阅过多，请稍后重试或使用长连接订阅"}, 503)
+        response.headers['Retry-After'] = str(SUBSCRIBE_RETRY_AFTER)
+        return response
+    try:
+        version, encoded = state_feed.wait(since, timeout)
+    finally:
+        subscribe_slots.release()
+    return Response(encoded, mimetype='application/json')
+
+@app.errorhandler(ValueError)
+def handle_invalid_command(e):
+    # 机器人编号或舵机编号不合法
+    return reply({"status": "error", "error": str(e)}, 400)
+
+@app.errorhandler(UnsupportedCodec)
+def handle_unsupported_codec(e):
+    return reply({"status": "error", "error": str(e)}, 415)
+
+@app.errorhandler(RobotTableFull)
+def handle_robot_table_full(e):
+    return reply({"status": "error", "error": str(e)}, 503)
+
+
+class UdpControlListener(threading.Thread):
+    """UDP控制帧监听线程，丢弃乱序、重复和过期的帧"""
+
+    def __init__(self, host='0.0.0.0', port=5005):
+        super().__init__(name="UdpControlListener", daemon=True)
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.sock.bind((host, port))
+        # 每个发送端: [最后接受的seq, 最后接受的时间戳, 最小(到达时间-时间戳), 最后的舵机角度, 会话号]
+        self.peers = {}
+        # robot_id -> 最后收到有效帧的时间；超时停车后移除
+        self.last_frame = {}
+        self.accepted = 0
+        self.dropped = 0
+        self.timeouts = 0
+        self.sock.settimeout(UDP_COMMAND_TIMEOUT / 5)
+
+    def run(self):
+        next_check = time.monotonic()
+        while True:
+            if time.monotonic() >= next_check:
+                self.stop_silent_robots()
+                next_check = time.monotonic() + UDP_COMMAND_TIMEOUT / 5
+            try:
+                buf, addr = self.sock.recvfrom(FRAME_SIZE + 1)
+            except socket.timeout:
+                continue
+            arrival = time.time()
+            try:
+                frame = unpack_frame(buf)
+            except ValueError:
+                self.dropped += 1
+                continue
+            if self.accept(addr, frame, arrival):
+                try:
+                    self.apply(addr, frame)
+                except (ValueError, RobotTableFull):
+                    self.dropped += 1
+                    continue
+                self.accepted += 1
+            else:
+                self.dropped += 1
+
+    def accept(self, addr, frame, arrival):
+        """判断帧是否有效，并更新该发送端的状态"""
+        # 用最小的 (到达时间 - 发送时间) 作为基准，不要求两端时钟同步
+        offset = arrival - frame.timestamp
+        peer = self.peers.get(addr)
+        if peer is not None and frame.session != peer[4] and frame.timestamp < peer[1]:
+            # 迟到的旧会话帧
+            return False
+        if peer is None or frame.session != peer[4]:
+            # 新的发送端，或同一地址上的客户端重启（新会话）：从这一帧重新开始
+            self.peers[addr] = [frame.seq, frame.timestamp, offset, [None] * len(frame.angles), frame.session]
+            return True
+        last_seq, last_timestamp, min_offset, _, _ = peer
+        restarted = frame.timestamp > last_timestamp + UDP_SESSION_RESET
+        if not restarted:
+            if not seq_newer(frame.seq, last_seq):
+                return False
+            if offset - min_offset > UDP_MAX_FRAME_AGE:
+                return False
+        peer[0] = frame.seq
+        peer[1] = frame.timestamp
+        peer[2] = offset if restarted else min(min_offset, offset)
+        return True
+
+    def stop_silent_robots(self):
+        """收不到帧的机器人（丢失了零速帧或客户端掉线）速度置零"""
+        now = time.monotonic()
+        for robot_id, last in list(self.last_frame.items()):
+            if now - last > UDP_COMMAND_TIMEOUT:
+                del self.last_frame[robot_id]
+                state = robots.get(robot_id)
+                if state is not None and (state["translate"]["x"] or state["translate"]["y"]
+                                          or state["rotate"]["z"]):
+                    self.timeouts += 1
+                    process_control(robot_id, {"x": 0, "y": 0}, {"z": 0})
+
+    def apply(self, addr, frame):
+        robot_id = robot_id_of({"robot_id": frame.robot_id})
+        self.last_frame[robot_id] = time.monotonic()
+        # 每帧都携带完整状态，未变化的速度不重复处理（静止时的零速帧）
+        state = robots.get(robot_id)
+        if state is None or (state["translate"]["x"], state["translate"]["y"], state["rotate"]["z"]) \
+                != (frame.x, frame.y, frame.z):
+            process_control(robot_id, {"x": frame.x, "y": frame.y}, {"z": frame.z})
+        last_angles = self.peers[addr][3]
+        for servo_id, angle in enumerate(frame.angles):
+            if angle_known(angle) and angle != last_angles[servo_id]:
+                last_angles[servo_id] = angle
+                process_servo(robot_id, servo_id, angle)
+
+
+def limit_subscribers(count):
+    """设置同时等待的长轮询请求数上限"""
+    global subscribe_slots
+    subscribe_slots = threading.BoundedSemaphore(count)
+
+
+def run_production(host, port, threads):
+    """生产模式：多线程 WSGI 服务器（waitress），没有安装时退回不带调试和重载的多线程服务器"""
+    limit_subscribers(max(1, threads // 4))
+    try:
+        from waitress import serve
+    except ImportError:
+        print("未安装 waitress（pip install waitress），使用 Werkzeug 多线程服务器")
+        app.run(host=host, port=port, debug=False, use_reloader=False, threaded=True)
+    else:
+        serve(app, host=host, port=port, threads=threads)
+
 
 if __name__ == '__main__':
-    app.run(host='0.0.0.0', port=5000, debug=True)
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="机器人遥控服务器")
+    parser.add_argument('--mode', choices=['debug', 'prod'], default='debug',
+                        help="debug: Flask调试服务器（带重载）；prod: 多线程生产服务器")
+    parser.add_argument('--host', default='0.0.0.0')
+    parser.add_argument('--port', type=int, default=5000)
+    parser.add_argument('--threads', type=int, default=8, help="生产模式的工作线程数")
+    parser.add_argument('--udp', action='store_true', help="同时启用UDP二进制控制通道")
+    parser.add_argument('--udp-port', type=int, default=5005)
+    parser.add_argument('--stream', action='store_true', help="同时启用asyncio长连接通道")
+    parser.add_argument('--stream-port', type=int, default=5100)
+    parser.add_argument('--journal', default=None, help="命令日志文件（定长二进制记录，可用 journal.py 查看）")
+    parser.add_argument('--verbosity', type=int, choices=[0, 1, 2], default=1,
+                        help="控制台输出: 0 不输出，1 定期汇总，2 逐条输出")
+    args = parser.parse_args()
+
+    journal.configure(args.journal, args.verbosity)
+
+    # 调试模式的重载器会运行两个进程，只在实际处理请求的子进程中监听
+    if args.mode == 'prod' or os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+        if args.udp:
+            UdpControlListener(host=args.host, port=args.udp_port).start()
+        if args.stream:
+            stream_server.start_in_thread(host=args.host, port=args.stream_port)
+    if args.mode == 'prod':
+        run_production(args.host, args.port, args.threads)
+    else:
+        app.run(host=args.host, port=args.port, debug=True)
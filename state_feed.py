@@ -0,0 +1,48 @@
+"""指令状态的快照与订阅
+
+每次指令状态变化版本号加1。快照在第一次被请求时编码为一行 JSON:
+    {"type": "state", "version": n, "robots": [{robot_id, translate, rotate, servos, updated}, ...]}\n
+同一版本的编码结果被所有观察者共用（HTTP 长轮询和长连接推送），不会为每个客户端重复序列化。
+"""
+import json
+import threading
+
+
+class StateFeed:
+    """状态版本号、共享的编码快照和变化等待"""
+
+    def __init__(self, robots):
+        self.robots = robots
+        self.version = 0
+        self.changed = threading.Condition()
+        self.encode_lock = threading.Lock()
+        self._encoded = (-1, b"")  # (版本, 编码后的快照)
+
+    def notify(self):
+        """指令状态已变化（在处理命令的线程中调用）"""
+        with self.changed:
+            self.version += 1
+            self.changed.notify_all()
+
+    def snapshot(self):
+        """返回 (版本, 编码后的快照)，每个版本只编码一次"""
+        version, encoded = self._encoded
+        if version == self.version:
+            return version, encoded
+        # 编码在通知锁之外进行，不阻塞处理命令的线程；同一时间只有一个线程编码
+        with self.encode_lock:
+            version, encoded = self._encoded
+            current = self.version
+            if version != current:
+                robots = [self.robots.get(robot_id) for robot_id in self.robots.robots()]
+                encoded = json.dumps({"type": "state", "version": current, "robots": robots},
+                                     separators=(",", ":"), ensure_ascii=False).encode() + b"\n"
+                self._encoded = (current, encoded)
+                version = current
+        return version, encoded
+
+    def wait(self, since, timeout):
+        """等待版本号超过 since（或超时），返回当前快照"""
+        with self.changed:
+            self.changed.wait_for(lambda: self.version > since, timeout)
+        return self.snapshot()
@@ -0,0 +1,275 @@
+"""基于 asyncio 的长连接控制服务器
+
+每个操作端保持一条 TCP 长连接，双向传输以换行分隔的 JSON 消息:
+    客户端 -> 服务器: {"type": "control" | "servo" | "servo_batch" | "servo_trajectory",
+                       "seq": n, "data": {...}}
+                      {"type": "subscribe" | "unsubscribe", "seq": n}  订阅所有机器人的指令状态
+                      {"type": "subscribe_telemetry" | "unsubscribe_telemetry", "seq": n,
+                       "data": {"robot_id": ...}}  订阅一个机器人的遥测
+                      {"type": "telemetry", "data": {...}}  机器人上报遥测（检查后转发给订阅者，
+                                                           只在数值不合法时应答 error）
+    服务器 -> 客户端: {"type": "ack", "seq": n, "state": {...}}  state 为该机器人的指令状态
+                      {"type": "resync", "seq": n, "error": "..."}  需要完整状态
+                      {"type": "error", "seq": n, "error": "..."}
+                      {"type": "state", "version": n, "robots": [...]}  推送给订阅者的快照
+                      {"type": "telemetry", "robot_id": ..., ...}  推送给遥测订阅者（见 telemetry.py）
+data 中的 robot_id 指定目标机器人（默认 "default"）。
+控制命令可以是完整状态、增量或心跳（见 delta.py）。
+订阅者最多每 STATE_PUSH_INTERVAL 秒收到一次快照（状态没有变化时不推送），所有订阅者
+共用同一份编码结果；发送缓冲积压的慢速订阅者跳过本次推送，之后直接收到最新的快照。
+没有上报遥测的机器人由替身机器人（telemetry.SimulatedRobot）按指令状态生成遥测，
+消息带有 "source": "simulated"；机器人在一条连接上上报过遥测之后，直到该连接断开都不再
+生成替身遥测（上报中断时不推送）。
+单个进程可以同时保持数百条连接。
+
+用法: python stream_server.py [--host 0.0.0.0] [--port 5100]
+"""
+import argparse
+import asyncio
+import json
+import threading
+import time
+
+from commands import (apply_control, echo_timing, journal, process_servo, process_servo_batch,
+                      process_servo_trajectory, robot_id_of, robots, state_feed)
+from delta import DeltaOutOfSync
+from robot_table import RobotTableFull
+from telemetry import TELEMETRY_RATE_HZ, SimulatedRobot, check_telemetry
+
+# 单条消息的最大长度（字节）
+MAX_LINE = 64 * 1024
+# 向订阅者推送状态快照的最小间隔（秒）
+STATE_PUSH_INTERVAL = 0.02
+# 订阅者的发送缓冲超过该大小（字节）时跳过推送
+SUBSCRIBER_MAX_BUFFER = 256 * 1024
+
+# 订阅类消息，由 handle_subscription 处理
+SUBSCRIPTION_TYPES = ("subscribe", "unsubscribe", "subscribe_telemetry", "unsubscribe_telemetry")
+
+# 订阅了指令状态的连接
+subscribers = set()
+# robot_id -> 订阅了该机器人遥测的连接
+telemetry_subscribers = {}
+# robot_id -> 替身机器人
+simulated_robots = {}
+# 上报过真实遥测、且上报的连接仍然存在的机器人
+telemetry_reporters = set()
+
+
+class StreamSession:
+    """单条连接的会话：每个机器人的增量编码状态（增量序号属于这条连接）"""
+
+    def __init__(self):
+        self.controls = {}  # robot_id -> ControlState
+        self.telemetry_robots = set()  # 在这条连接上上报过遥测的机器人
+
+    def handle(self, message, t_recv=None):
+        """处理一条消息，返回应答消息"""
+        t_recv = time.time() if t_recv is None else t_recv
+        error = message_error(message)
+        if error is not None:
+            return {"type": "error", "seq": message.get("seq") if isinstance(message, dict) else None,
+                    "error": error}
+        kind = message.get("type")
+        seq = message.get("seq")
+        data = message.get("data", {})
+        try:
+            robot_id = robot_id_of(data)
+            if kind == "control":
+                try:
+                    apply_control(self.controls, robot_id, data)
+                except DeltaOutOfSync as e:
+                    return {"type": "resync", "seq": seq, "error": str(e)}
+            elif kind == "servo":
+                process_servo(robot_id, data.get("servo_id"), data.get("angle"))
+            elif kind == "servo_batch":
+                process_servo_batch(robot_id, data.get("angles", []))
+            elif kind == "servo_trajectory":
+                process_servo_trajectory(robot_id, data.get("angles", []),
+                                         data.get("duration"), data.get("max_velocity"))
+            else:
+                return {"type": "error", "seq": seq, "error": f"未知的消息类型: {kind}"}
+        except (ValueError, TypeError, RobotTableFull) as e:
+            # TypeError: 数值字段不是数字等格式错误
+            return {"type": "error", "seq": seq, "error": str(e)}
+        reply = {"type": "ack", "seq": seq, "state": robots.get(robot_id)}
+        timing = echo_timing(data, t_recv) if kind == "control" else None
+        if timing is not None:
+            reply["timing"] = timing
+        return reply
+
+
+def message_error(message):
+    """检查消息和 data 的类型，有问题时返回错误说明"""
+    if not isinstance(message, dict):
+        return "消息必须是JSON对象"
+    if not isinstance(message.get("data", {}), dict):
+        return "data 必须是JSON对象"
+    return None
+
+
+def encode(message):
+    return json.dumps(message, separators=(",", ":")).encode() + b"\n"
+
+
+def handle_subscription(message, writer):
+    """处理订阅/取消订阅消息，订阅指令状态时随应答发送当前快照"""
+    kind = message.get("type")
+    seq = message.get("seq")
+    if kind == "subscribe":
+        subscribers.add(writer)
+        version, encoded = state_feed.snapshot()
+        writer.write(encode({"type": "ack", "seq": seq, "version": version}))
+        writer.write(encoded)
+        return
+    if kind == "unsubscribe":
+        subscribers.discard(writer)
+    else:
+        try:
+            robot_id = robot_id_of(message.get("data", {}))
+        except ValueError as e:
+            writer.write(encode({"type": "error", "seq": seq, "error": str(e)}))
+            return
+        if kind == "subscribe_telemetry":
+            telemetry_subscribers.setdefault(robot_id, set()).add(writer)
+        else:
+            telemetry_subscribers.get(robot_id, set()).discard(writer)
+    writer.write(encode({"type": "ack", "seq": seq}))
+
+
+def broadcast(writers, encoded):
+    """把同一份编码结果写给多个连接，跳过发送缓冲积压的连接"""
+    for writer in list(writers):
+        if writer.is_closing():
+            writers.discard(writer)
+        elif writer.transport.get_write_buffer_size() <= SUBSCRIBER_MAX_BUFFER:
+            writer.write(encoded)
+
+
+def handle_telemetry_report(data, session):
+    """机器人上报的遥测：检查后转发给订阅者，连接断开前不再为该机器人生成替身遥测
+
+    数值不合法时抛出 ValueError（不转发）。
+    """
+    if not isinstance(data, dict):
+        raise ValueError("data 必须是对象")
+    robot_id = robot_id_of(data)
+    message = check_telemetry(data, robot_id)
+    session.telemetry_robots.add(robot_id)
+    telemetry_reporters.add(robot_id)
+    writers = telemetry_subscribers.get(robot_id)
+    if writers:
+        broadcast(writers, encode(message))
+
+
+async def push_state():
+    """状态变化时把同一份快照写给所有订阅者"""
+    pushed = state_feed.version
+    while True:
+        await asyncio.sleep(STATE_PUSH_INTERVAL)
+        if not subscribers or state_feed.version == pushed:
+            continue
+        pushed, encoded = state_feed.snapshot()
+        broadcast(subscribers, encoded)
+
+
+async def push_telemetry():
+    """以固定频率为有订阅者、且没有连接在上报遥测的机器人生成替身遥测"""
+    last = time.perf_counter()
+    while True:
+        await asyncio.sleep(1.0 / TELEMETRY_RATE_HZ)
+        now = time.perf_counter()
+        dt, last = now - last, now
+        for robot_id, writers in list(telemetry_subscribers.items()):
+            if not writers:
+                del telemetry_subscribers[robot_id]
+                continue
+            if robot_id in telemetry_reporters:
+                continue
+            robot = simulated_robots.get(robot_id)
+            if robot is None:
+                robot = simulated_robots[robot_id] = SimulatedRobot(robot_id)
+            state = robots.get(robot_id)
+            if state is None:
+                message = robot.step(dt, 0.0, 0.0, 0.0)
+            else:
+                message = robot.step(dt, state["translate"]["x"], state["translate"]["y"],
+                                     state["rotate"]["z"], state["servos"])
+            broadcast(writers, encode(message))
+
+
+async def handle_stream(reader, writer):
+    """处理一条客户端长连接"""
+    session = StreamSession()
+    try:
+        while True:
+            try:
+                line = await reader.readline()
+            except (ValueError, ConnectionError):
+                # 消息过长或连接被重置
+                break
+            if not line:
+                break
+            t_recv = time.time()
+            try:
+                message = json.loads(line)
+            except ValueError:
+                writer.write(encode({"type": "error", "seq": None, "error": "无效的JSON"}))
+            else:
+                error = message_error(message)
+                kind = message.get("type") if error is None else None
+                if error is not None:
+                    seq = message.get("seq") if isinstance(message, dict) else None
+                    writer.write(encode({"type": "error", "seq": seq, "error": error}))
+                elif kind in SUBSCRIPTION_TYPES:
+                    handle_subscription(message, writer)
+                elif kind == "telemetry":
+                    try:
+                        handle_telemetry_report(message.get("data", {}), session)
+                    except (ValueError, TypeError) as e:
+                        writer.write(encode({"type": "error", "seq": message.get("seq"), "error": str(e)}))
+                else:
+                    writer.write(encode(session.handle(message, t_recv)))
+            await writer.drain()
+    except ConnectionError:
+        pass
+    finally:
+        subscribers.discard(writer)
+        for writers in telemetry_subscribers.values():
+            writers.discard(writer)
+        telemetry_reporters.difference_update(session.telemetry_robots)
+        writer.close()
+
+
+async def serve(host="0.0.0.0", port=5100):
+    server = await asyncio.start_server(handle_stream, host, port, limit=MAX_LINE)
+    # 事件循环只保存任务的弱引用，在这里持有推送任务，服务器停止时取消
+    pushers = [asyncio.create_task(push_state()), asyncio.create_task(push_telemetry())]
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        for task in pushers:
+            task.cancel()
+        await asyncio.gather(*pushers, return_exceptions=True)
+
+
+def start_in_thread(host="0.0.0.0", port=5100):
+    """在后台线程中运行长连接服务器（与 Flask 服务器并行）"""
+    thread = threading.Thread(
+        target=asyncio.run, args=(serve(host, port),), name="StreamServer", daemon=True
+    )
+    thread.start()
+    return thread
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="机器人遥控长连接服务器")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=5100)
+    parser.add_argument("--journal", default=None, help="命令日志文件")
+    parser.add_argument("--verbosity", type=int, choices=[0, 1, 2], default=1,
+                        help="控制台输出: 0 不输出，1 定期汇总，2 逐条输出")
+    args = parser.parse_args()
+    journal.configure(args.journal, args.verbosity)
+    asyncio.run(serve(args.host, args.port))
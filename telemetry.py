@@ -0,0 +1,226 @@
+"""机器人遥测：本地替身机器人、定长环形缓冲区和最小/最大值降采样
+
+遥测消息（长连接上服务器推送，或本地替身生成）:
+    {"type": "telemetry", "robot_id": "r1", "t": 时间戳,
+     "odom": {"x", "y", "theta", "vx", "vy", "wz"}, "battery": 电压, "servos": [7个角度，未知为 null]}
+替身机器人生成的消息带有 "source": "simulated"，界面据此标明显示的不是真实遥测。
+客户端把每个数值放进定长的 RingBuffer，内存和追加开销不随运行时间增长；绘图时使用
+按像素列聚合的最小/最大值，重绘开销只与控件宽度有关，与采样频率和历史长度无关。
+不依赖Qt，服务器和客户端共用。
+"""
+import math
+import time
+from array import array
+from collections import deque
+
+from protocol import SERVO_COUNT
+from robot_table import DEFAULT_ROBOT_ID
+
+TELEMETRY_RATE_HZ = 20  # 遥测的推送/生成频率
+BATTERY_FULL = 12.6  # 电池电压 (V)
+BATTERY_EMPTY = 10.5
+IDLE_DRAIN = 0.0005  # 静止时的电压下降速度 (V/s)
+LOAD_DRAIN = 0.005  # 满速运动时额外的电压下降速度 (V/s)
+VELOCITY_TIME_CONSTANT = 0.3  # 底盘速度跟随指令的时间常数（秒）
+SERVO_TIME_CONSTANT = 0.15  # 舵机角度跟随指令的时间常数（秒）
+
+ODOM_FIELDS = ("x", "y", "theta", "vx", "vy", "wz")
+# 遥测中的所有数值序列名称
+SERIES = tuple(f"odom.{name}" for name in ODOM_FIELDS) + ("battery",) + tuple(
+    f"servo{i}" for i in range(SERVO_COUNT))
+
+
+def _number(value):
+    """有限的数值返回 float，其他（None、字符串、NaN 等）返回 None"""
+    if isinstance(value, (int, float)) and not isinstance(value, bool) and math.isfinite(value):
+        return float(value)
+    return None
+
+
+def _finite(value, name):
+    """转换为有限的 float，不合法时抛出 ValueError"""
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        raise ValueError(f"无效的{name}: {value!r}") from None
+    if not math.isfinite(number):
+        raise ValueError(f"无效的{name}: {value!r}")
+    return number
+
+
+def check_telemetry(data, robot_id):
+    """检查机器人上报的遥测，返回只包含已知字段的遥测消息，数值不合法时抛出 ValueError"""
+    message = {"type": "telemetry", "robot_id": robot_id}
+    message["t"] = time.time() if data.get("t") is None else _finite(data["t"], "时间戳")
+    odom = data.get("odom")
+    if odom is not None:
+        if not isinstance(odom, dict):
+            raise ValueError(f"odom 必须是对象: {odom!r}")
+        message["odom"] = {name: _finite(odom[name], "odom." + name)
+                           for name in ODOM_FIELDS if odom.get(name) is not None}
+    if data.get("battery") is not None:
+        message["battery"] = _finite(data["battery"], "电池电压")
+    servos = data.get("servos")
+    if servos is not None:
+        if not isinstance(servos, list) or len(servos) > SERVO_COUNT:
+            raise ValueError(f"servos 必须是最多 {SERVO_COUNT} 个角度的列表: {servos!r}")
+        message["servos"] = [None if a is None else _finite(a, "舵机角度") for a in servos]
+    return message
+
+
+def flatten(message):
+    """遥测消息 -> [(序列名称, 数值)]，缺少、未知或不是数值的字段省略"""
+    values = []
+    odom = message.get("odom")
+    if isinstance(odom, dict):
+        for name in ODOM_FIELDS:
+            value = _number(odom.get(name))
+            if value is not None:
+                values.append(("odom." + name, value))
+    battery = _number(message.get("battery"))
+    if battery is not None:
+        values.append(("battery", battery))
+    servos = message.get("servos")
+    if isinstance(servos, list):
+        for i, angle in enumerate(servos[:SERVO_COUNT]):
+            angle = _number(angle)
+            if angle is not None:
+                values.append((f"servo{i}", angle))
+    return values
+
+
+class SimulatedRobot:
+    """替身机器人：速度以一阶惯性跟随指令并积分为里程计，电池随负载放电，舵机以一阶惯性跟随指令角度"""
+
+    def __init__(self, robot_id=DEFAULT_ROBOT_ID, max_speed=1.5):
+        self.robot_id = robot_id
+        self.max_speed = max_speed
+        self.x = self.y = self.theta = 0.0
+        self.vx = self.vy = self.wz = 0.0
+        self.battery = BATTERY_FULL
+        self.servos = [math.nan] * SERVO_COUNT
+
+    def step(self, dt, vx, vy, wz, servos=()):
+        """按指令运动 dt 秒，返回遥测消息；servos 中的 None/NaN 表示没有指令"""
+        a = min(1.0, dt / VELOCITY_TIME_CONSTANT)
+        self.vx += (vx - self.vx) * a
+        self.vy += (vy - self.vy) * a
+        self.wz += (wz - self.wz) * a
+        # 机体坐标系的速度转换到里程计坐标系
+        c, s = math.cos(self.theta), math.sin(self.theta)
+        self.x += (self.vx * c - self.vy * s) * dt
+        self.y += (self.vx * s + self.vy * c) * dt
+        self.theta = (self.theta + self.wz * dt + math.pi) % (2 * math.pi) - math.pi
+        load = min(1.0, math.hypot(self.vx, self.vy) / self.max_speed)
+        self.battery = max(BATTERY_EMPTY, self.battery - (IDLE_DRAIN + LOAD_DRAIN * load) * dt)
+        b = min(1.0, dt / SERVO_TIME_CONSTANT)
+        for i, target in enumerate(servos):
+            if target is None or math.isnan(target):
+                continue
+            current = self.servos[i]
+            self.servos[i] = target if math.isnan(current) else current + (target - current) * b
+        return self.sample()
+
+    def sample(self, t=None):
+        return {
+            "type": "telemetry",
+            "robot_id": self.robot_id,
+            "t": time.time() if t is None else t,
+            "odom": {"x": self.x, "y": self.y, "theta": self.theta,
+                     "vx": self.vx, "vy": self.vy, "wz": self.wz},
+            "battery": self.battery,
+            "servos": [None if math.isnan(a) else a for a in self.servos],
+            "source": "simulated",
+        }
+
+
+class RingBuffer:
+    """定长环形缓冲区，保存 (时间, 数值) 样本，写满后覆盖最旧的样本
+
+    set_resolution() 之后每次追加同时更新按时间分段的最小/最大值（O(1)），
+    minmax() 直接返回这些分段，不需要遍历样本。
+    """
+
+    def __init__(self, capacity=2048):
+        self.capacity = capacity
+        self.times = array("d", [0.0]) * capacity
+        self.values = array("d", [0.0]) * capacity
+        self.head = 0  # 下一个写入位置
+        self.count = 0
+        self.bucket_seconds = None
+        self.buckets = None  # deque of [分段号, 最小值, 最大值]
+
+    def __len__(self):
+        return self.count
+
+    def append(self, t, value):
+        self.times[self.head] = t
+        self.values[self.head] = value
+        self.head = (self.head + 1) % self.capacity
+        if self.count < self.capacity:
+            self.count += 1
+        if self.buckets is not None:
+            self._add_to_bucket(t, value)
+
+    def latest(self):
+        """最新的 (时间, 数值)，没有样本时为 None"""
+        if not self.count:
+            return None
+        i = self.head - 1
+        return self.times[i], self.values[i]
+
+    def samples(self):
+        """按时间顺序返回所有样本 [(时间, 数值)]"""
+        start = self.head - self.count
+        return [(self.times[i], self.values[i]) for i in range(start, self.head)]
+
+    def set_resolution(self, bucket_seconds, count):
+        """设置降采样的分段宽度（秒）和保留的分段数，变化时从缓冲区中的样本重建分段"""
+        if self.buckets is not None and self.bucket_seconds == bucket_seconds \
+                and self.buckets.maxlen == count:
+            return
+        self.bucket_seconds = bucket_seconds
+        self.buckets = deque(maxlen=count)
+        for t, value in self.samples():
+            self._add_to_bucket(t, value)
+
+    def _add_to_bucket(self, t, value):
+        index = int(t // self.bucket_seconds)
+        buckets = self.buckets
+        if buckets and buckets[-1][0] == index:
+            bucket = buckets[-1]
+            if value < bucket[1]:
+                bucket[1] = value
+            elif value > bucket[2]:
+                bucket[2] = value
+        elif not buckets or index > buckets[-1][0]:
+            buckets.append([index, value, value])
+        # 时间倒退（时钟调整）的样本不进入分段
+
+    def minmax(self):
+        """降采样后的分段 [[分段号, 最小值, 最大值]]，分段号 * bucket_seconds 为分段的开始时间"""
+        return self.buckets if self.buckets is not None else ()
+
+
+class TelemetryHistory:
+    """每个遥测序列一个 RingBuffer，version 在每条消息后加1（用于判断是否需要重绘）"""
+
+    def __init__(self, capacity=2048):
+        self.capacity = capacity
+        self.series = {name: RingBuffer(capacity) for name in SERIES}
+        self.version = 0
+        self.last = None  # 最近一条遥测消息
+
+    @property
+    def simulated(self):
+        """最近一条遥测是否来自替身机器人"""
+        return self.last is not None and self.last.get("source") == "simulated"
+
+    def add(self, message):
+        t = _number(message.get("t"))
+        if t is None:
+            t = time.time()
+        for name, value in flatten(message):
+            self.series[name].append(t, value)
+        self.last = message
+        self.version += 1
@@ -0,0 +1,104 @@
+"""遥测曲线控件
+
+每个序列占一条横带，各自按可见范围自动缩放纵轴。数据按像素列做最小/最大值降采样
+（见 telemetry.RingBuffer），每列画一条从最小值到最大值的竖线并连成折线，
+采样频率再高、历史再长，一次重绘也只处理控件宽度个点。
+"""
+import time
+
+from PySide6.QtCore import QPointF, Qt, QTimer
+from PySide6.QtGui import QColor, QPainter, QPen, QPolygonF
+from PySide6.QtWidgets import QWidget
+
+# 默认显示的序列: (序列名称, 显示名称, 颜色)
+DEFAULT_SERIES = (
+    ("odom.vx", "vx m/s", "#1f77b4"),
+    ("odom.wz", "wz rad/s", "#ff7f0e"),
+    ("battery", "电池 V", "#2ca02c"),
+    ("servo0", "舵机0 °", "#d62728"),
+)
+LABEL_WIDTH = 90  # 左侧显示名称和最新数值的宽度
+
+
+class TelemetryPlot(QWidget):
+    """滚动显示最近 window 秒的遥测，历史有新数据时每帧最多重绘一次"""
+
+    def __init__(self, history, series=DEFAULT_SERIES, window=10.0, frame_ms=33, parent=None):
+        super().__init__(parent)
+        self.history = history
+        self.series = series
+        self.window = window
+        self.drawn_version = -1
+        self.setMinimumHeight(40 * len(series))
+        self.setAttribute(Qt.WA_OpaquePaintEvent)
+        # 性能诊断（见 set_profiler）
+        self.profiler = None
+        self.profile_name = "telemetry_paint"
+        self.frame_timer = QTimer(self)
+        self.frame_timer.timeout.connect(self._check_update)
+        self.frame_timer.start(frame_ms)
+
+    def set_profiler(self, profiler, name):
+        """启用诊断时把每次 paintEvent 的耗时记录到 profiler 的 name 项"""
+        self.profiler = profiler
+        self.profile_name = name
+
+    def _check_update(self):
+        if self.history.version != self.drawn_version and self.isVisible():
+            self.update()
+
+    def paintEvent(self, event):
+        profiler = self.profiler
+        if profiler is None or not profiler.enabled:
+            self._paint()
+            return
+        start = time.perf_counter()
+        self._paint()
+        profiler.record(self.profile_name, time.perf_counter() - start)
+
+    def _paint(self):
+        self.drawn_version = self.history.version
+        painter = QPainter(self)
+        painter.fillRect(self.rect(), QColor("#202020"))
+        columns = max(1, self.width() - LABEL_WIDTH)
+        bucket_seconds = self.window / columns
+        # 以最新样本的时间为右边缘，不要求两端时钟同步
+        last = self.history.last
+        t_end = last.get("t", 0.0) if last else 0.0
+        lane_height = self.height() / len(self.series)
+        for lane, (name, label, color) in enumerate(self.series):
+            top = lane * lane_height
+            buffer = self.history.series[name]
+            buffer.set_resolution(bucket_seconds, columns + 1)
+            latest = buffer.latest()
+            painter.setPen(QColor("#909090"))
+            text = label if latest is None else f"{label}\n{latest[1]:.3f}"
+            painter.drawText(4, int(top), LABEL_WIDTH - 8, int(lane_height),
+                             Qt.AlignVCenter | Qt.AlignLeft, text)
+            painter.drawLine(LABEL_WIDTH, int(top + lane_height) - 1, self.width(), int(top + lane_height) - 1)
+            buckets = buffer.minmax()
+            if not buckets:
+                continue
+            low = min(b[1] for b in buckets)
+            high = max(b[2] for b in buckets)
+            span = (high - low) or 1.0
+            scale = (lane_height - 6) / span
+            bottom = top + lane_height - 3
+            end_index = t_end / bucket_seconds
+            points = QPolygonF()
+            for index, lo, hi in buckets:
+                x = LABEL_WIDTH + columns - (end_index - index)
+                if x < LABEL_WIDTH:
+                    continue
+                # 同一列先画最小值再画最大值，折线同时表现包络和走势
+                points.append(QPointF(x, bottom - (lo - low) * scale))
+                if hi != lo:
+                    points.append(QPointF(x, bottom - (hi - low) * scale))
+            painter.setPen(QPen(QColor(color), 1))
+            painter.drawPolyline(points)
+        if self.history.simulated:
+            # 替身机器人生成的数据必须和真实遥测区分开
+            painter.setPen(QColor("#ffb000"))
+            painter.drawText(self.rect().adjusted(0, 2, -6, 0), Qt.AlignTop | Qt.AlignRight,
+                             "模拟数据（替身机器人）")
+        painter.end()
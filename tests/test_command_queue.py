@@ -0,0 +1,62 @@
+"""LatestValueQueue 的合并、过期和关闭语义"""
+import threading
+import time
+
+from command_queue import LatestValueQueue
+
+
+def test_newer_command_replaces_pending_one():
+    queue = LatestValueQueue()
+    queue.put("control", {"x": 1})
+    queue.put("control", {"x": 2})
+    kind, data, tag, _ = queue.get()
+    assert (kind, data) == ("control", {"x": 2})
+    assert (queue.enqueued, queue.replaced, queue.depth()) == (2, 1, 0)
+
+
+def test_kinds_are_sent_in_order():
+    queue = LatestValueQueue()
+    queue.put("control", 1)
+    queue.put("servo_batch", 2)
+    queue.put("control", 3)  # 替换后排到最后
+    assert [queue.get()[0] for _ in range(2)] == ["servo_batch", "control"]
+
+
+def test_stale_droppable_command_expires():
+    queue = LatestValueQueue(max_age=0.01)
+    queue.put("control", 1)
+    queue.put("servo_batch", 2, droppable=False)
+    time.sleep(0.02)
+    assert queue.get()[0] == "servo_batch"
+    assert queue.expired == 1
+
+
+def test_non_droppable_command_never_expires():
+    queue = LatestValueQueue(max_age=0.01)
+    queue.put("control", 0, "zero", droppable=False)
+    time.sleep(0.02)
+    kind, data, tag, age = queue.get()
+    assert (kind, tag) == ("control", "zero") and age > 0.01
+
+
+def test_close_drains_non_droppable_commands():
+    queue = LatestValueQueue()
+    queue.put("control", 0, "zero", droppable=False)
+    queue.put("servo_batch", 1, droppable=False)
+    queue.put("other", 2)
+    queue.close()
+    assert queue.get()[:3] == ("control", 0, "zero")
+    assert queue.get()[0] == "servo_batch"
+    assert queue.get() is None
+    assert queue.expired == 1
+
+
+def test_close_wakes_blocked_reader():
+    queue = LatestValueQueue()
+    result = []
+    reader = threading.Thread(target=lambda: result.append(queue.get()))
+    reader.start()
+    time.sleep(0.02)
+    queue.close()
+    reader.join(1.0)
+    assert result == [None]
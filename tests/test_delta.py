@@ -0,0 +1,81 @@
+"""增量/心跳编码和服务器端的状态重建"""
+import pytest
+
+from delta import ControlState, DeltaEncoder, DeltaOutOfSync
+
+
+def command(x=0.0, y=0.0, z=0.0):
+    return {"translate": {"x": x, "y": y}, "rotate": {"z": z}}
+
+
+def test_first_message_is_full_state():
+    message = DeltaEncoder().encode(command(0.5), now=0.0)
+    assert message == {"translate": {"x": 0.5, "y": 0.0}, "rotate": {"z": 0.0}, "seq": 1}
+
+
+def test_changes_inside_dead_band_are_not_sent():
+    encoder = DeltaEncoder(dead_band=0.01, heartbeat_interval=1.0)
+    encoder.encode(command(0.5), now=0.0)
+    assert encoder.encode(command(0.505), now=0.1) is None
+    assert encoder.encode(command(0.6), now=0.2) == {"delta": {"translate": {"x": 0.6}}, "seq": 2}
+
+
+def test_heartbeat_after_interval():
+    encoder = DeltaEncoder(dead_band=0.01, heartbeat_interval=1.0)
+    encoder.encode(command(0.5), now=0.0)
+    assert encoder.encode(command(0.5), now=0.5) is None
+    assert encoder.encode(command(0.5), now=1.0) == {"hb": 1, "seq": 2}
+
+
+def test_stop_is_always_full_state():
+    encoder = DeltaEncoder()
+    encoder.encode(command(0.5, 0.2), now=0.0)
+    assert encoder.encode(command(), now=0.1) == dict(command(), seq=2)
+
+
+def test_reset_sends_full_state_again():
+    encoder = DeltaEncoder()
+    encoder.encode(command(0.5), now=0.0)
+    encoder.reset()
+    assert "translate" in encoder.encode(command(0.5), now=0.1)
+
+
+def test_state_rebuilt_from_encoder_messages():
+    encoder, state = DeltaEncoder(heartbeat_interval=0.0), ControlState()
+    for now, data in enumerate([command(0.5), command(0.5, 0.3), command(0.5, 0.3), command(0.1, 0.3, -0.2)]):
+        message = encoder.encode(data, now=now)
+        state.apply(message)
+        assert state.translate == data["translate"] and state.rotate == data["rotate"]
+
+
+def test_delta_without_base_state_needs_resync():
+    with pytest.raises(DeltaOutOfSync):
+        ControlState().apply({"seq": 1, "delta": {"translate": {"x": 0.5}}})
+
+
+def test_delta_with_gap_needs_resync():
+    state = ControlState()
+    state.apply(dict(command(0.5), seq=1))
+    with pytest.raises(DeltaOutOfSync):
+        state.apply({"seq": 3, "hb": 1})
+
+
+def test_heartbeat_does_not_report_a_change():
+    state = ControlState()
+    state.apply(dict(command(0.5), seq=1))
+    assert state.apply({"seq": 2, "hb": 1}) is False
+
+
+@pytest.mark.parametrize("message", [
+    {"seq": 2, "translate": {"x": "fast"}},
+    {"seq": 2, "translate": {"x": float("nan")}},
+    {"seq": 2, "rotate": 5},
+    {"seq": 2, "delta": {"translate": {"x": None}}},
+    {"seq": 2, "delta": []},
+])
+def test_invalid_values_leave_state_unchanged(message):
+    state = ControlState()
+    state.apply(dict(command(0.5), seq=1))
+    with pytest.raises(ValueError):
+        state.apply(message)
+    assert (state.translate, state.rotate, state.seq) == ({"x": 0.5, "y": 0.0}, {"z": 0.0}, 1)
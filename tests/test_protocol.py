@@ -0,0 +1,83 @@
+"""UDP 帧和 HTTP 编码的往返测试"""
+import math
+
+import pytest
+
+from codec import CODECS, CodecError, accept_header, codec_for, get_codec, response_codec
+from protocol import FRAME_SIZE, SEQ_MASK, SERVO_COUNT, pack_frame, seq_newer, unpack_frame
+
+NAN_ANGLES = [math.nan] * SERVO_COUNT
+
+
+def test_frame_round_trip():
+    angles = [10.0, math.nan, 30.0, 40.0, 50.0, 60.0, 70.0]
+    buf = pack_frame(0xDEADBEEF, 42, 1234.5, "r1", 0.5, -0.25, 0.125, angles)
+    assert len(buf) == FRAME_SIZE
+    frame = unpack_frame(buf)
+    assert (frame.session, frame.seq, frame.timestamp, frame.robot_id) == (0xDEADBEEF, 42, 1234.5, "r1")
+    assert (frame.x, frame.y, frame.z) == (0.5, -0.25, 0.125)
+    assert frame.angles[0] == 10.0 and math.isnan(frame.angles[1])
+
+
+def test_frame_seq_wraps():
+    frame = unpack_frame(pack_frame(1, SEQ_MASK + 3, 0.0, "r1", 0, 0, 0, NAN_ANGLES))
+    assert frame.seq == 2
+    assert seq_newer(2, SEQ_MASK)
+    assert not seq_newer(SEQ_MASK, 2)
+    assert not seq_newer(5, 5)
+
+
+@pytest.mark.parametrize("buf", [b"", b"x" * FRAME_SIZE, pack_frame(1, 1, 0.0, "r1", 0, 0, 0, NAN_ANGLES)[:-1]])
+def test_frame_rejects_garbage(buf):
+    with pytest.raises(ValueError):
+        unpack_frame(buf)
+
+
+MESSAGES = [
+    ("control", {"robot_id": "r1", "seq": 7, "translate": {"x": 0.5, "y": -0.25}, "rotate": {"z": 0.125},
+                 "t_send": 100.0, "t_input": 99.5}),
+    ("control", {"robot_id": "r1", "seq": 8, "delta": {"rotate": {"z": 0.25}}, "t_send": 101.0}),
+    ("control", {"robot_id": "r1", "seq": 9, "hb": 1, "t_send": 102.0}),
+    ("servo", {"robot_id": "r2", "servo_id": 3, "angle": 45.0}),
+    ("servo_batch", {"robot_id": "r2", "angles": [1.0, 2.0, 3.0, 4.0, 5.0, 6.0, 7.0]}),
+    ("servo_trajectory", {"robot_id": "r2", "angles": [1.0, 2.0, 3.0, 4.0, 5.0, 6.0, 7.0],
+                          "duration": 1.5, "max_velocity": None}),
+]
+
+
+@pytest.mark.parametrize("name", sorted(CODECS))
+@pytest.mark.parametrize("kind,message", MESSAGES)
+def test_codec_round_trip(name, kind, message):
+    codec = get_codec(name)
+    assert codec.decode(codec.encode(message, kind), kind) == message
+
+
+def test_struct_keeps_unknown_angles():
+    codec = get_codec("struct")
+    decoded = codec.decode(codec.encode({"robot_id": "r1", "angles": [None, 2.0] + [None] * 5}, "servo_batch"),
+                           "servo_batch")
+    assert math.isnan(decoded["angles"][0]) and decoded["angles"][1] == 2.0
+
+
+def test_struct_rejects_long_robot_id():
+    with pytest.raises(CodecError):
+        get_codec("struct").encode({"robot_id": "r" * 9, "angles": [0.0] * SERVO_COUNT}, "servo_batch")
+
+
+def test_struct_rejects_truncated_body():
+    with pytest.raises(CodecError):
+        get_codec("struct").decode(b"\0" * 5, "servo")
+
+
+def test_json_rejects_invalid_body():
+    with pytest.raises(CodecError):
+        get_codec("json").decode(b"{", "control")
+
+
+def test_codec_selection():
+    assert codec_for(None).name == "json"
+    assert codec_for("application/x-rc-struct; charset=binary").name == "struct"
+    # struct 不能编码应答
+    assert response_codec(None, get_codec("struct")).name == "json"
+    assert response_codec("application/x-rc-struct, application/json", get_codec("json")).name == "json"
+    assert "application/json" in accept_header(get_codec("struct"))
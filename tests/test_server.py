@@ -0,0 +1,100 @@
+"""HTTP API：参数检查（400）、不占用槽位的错误请求和长轮询的上限"""
+import json
+import threading
+
+import pytest
+
+pytest.importorskip("flask")
+
+import server  # noqa: E402
+from commands import control_states, journal, robots  # noqa: E402
+
+journal.configure(None, 0)
+
+
+@pytest.fixture
+def client():
+    return server.app.test_client()
+
+
+def post(client, path, body):
+    return client.post(path, data=body if isinstance(body, str) else json.dumps(body),
+                       content_type="application/json")
+
+
+@pytest.mark.parametrize("path,body", [
+    ("/api/control", "[1,2]"),
+    ("/api/control", "null"),
+    ("/api/control", "{"),
+    ("/api/servo", "[1]"),
+    ("/api/servo/batch", '"angles"'),
+    ("/api/servo/trajectory", "3"),
+    ("/api/control", {"robot_id": "t-bad", "translate": {"x": "fast", "y": 0}, "rotate": {"z": 0}}),
+    ("/api/control", {"robot_id": "t-bad", "translate": {"x": 99, "y": 0}, "rotate": {"z": 0}}),
+    ("/api/control", {"robot_id": "t-bad", "translate": 5}),
+    ("/api/control", {"robot_id": 5}),
+    ("/api/control", {"robot_id": "much-too-long"}),
+    ("/api/servo", {"robot_id": "t-bad", "servo_id": 9, "angle": 10}),
+    ("/api/servo", {"robot_id": "t-bad", "servo_id": "a", "angle": 10}),
+    ("/api/servo", {"robot_id": "t-bad", "servo_id": 1, "angle": "x"}),
+    ("/api/servo/batch", {"robot_id": "t-bad", "angles": [1, 2]}),
+    ("/api/servo/batch", {"robot_id": "t-bad", "angles": [1, 2, 3, 4, 5, 6, "x"]}),
+    ("/api/servo/trajectory", {"robot_id": "t-bad", "angles": [1] * 7, "duration": "x"}),
+])
+def test_invalid_commands_are_rejected_with_400(client, path, body):
+    assert post(client, path, body).status_code == 400
+
+
+def test_rejected_commands_do_not_allocate_slots(client):
+    before = len(robots.robots())
+    for i in range(20):
+        assert post(client, "/api/control", {"robot_id": f"j{i}", "translate": {"x": 99, "y": 0},
+                                             "rotate": {"z": 0}}).status_code == 400
+        assert post(client, "/api/control", {"robot_id": f"h{i}", "seq": 5, "hb": 1}).status_code == 409
+    assert len(robots.robots()) == before
+    assert not any(robot_id.startswith(("j", "h")) for robot_id in control_states)
+
+
+def test_invalid_delta_keeps_last_valid_state(client):
+    full = {"robot_id": "t-delta", "seq": 1, "translate": {"x": 0.5, "y": 0}, "rotate": {"z": 0}}
+    assert post(client, "/api/control", full).status_code == 200
+    bad = {"robot_id": "t-delta", "seq": 2, "delta": {"translate": {"x": 50}}}
+    assert post(client, "/api/control", bad).status_code == 400
+    good = {"robot_id": "t-delta", "seq": 2, "delta": {"translate": {"y": 0.25}}}
+    assert post(client, "/api/control", good).status_code == 200
+    assert robots.get("t-delta")["translate"] == {"x": 0.5, "y": 0.25}
+
+
+def test_valid_control_updates_state(client):
+    body = {"robot_id": "t-ok", "translate": {"x": 0.5, "y": 0}, "rotate": {"z": 0.25}}
+    assert post(client, "/api/control", body).status_code == 200
+    state = json.loads(client.get("/api/state?robot_id=t-ok").data)
+    assert state["translate"]["x"] == 0.5 and state["rotate"]["z"] == 0.25
+
+
+@pytest.mark.parametrize("query", ["timeout=nan", "timeout=inf", "timeout=-inf", "timeout=abc",
+                                   "since=abc", "since=nan"])
+def test_subscribe_rejects_invalid_parameters(client, query):
+    assert client.get(f"/api/state/subscribe?{query}").status_code == 400
+
+
+def test_subscribe_returns_newer_snapshot_immediately(client):
+    response = client.get("/api/state/subscribe?since=-1&timeout=30")
+    assert response.status_code == 200
+    assert json.loads(response.data)["type"] == "state"
+
+
+def test_subscribe_over_limit_returns_503(client, monkeypatch):
+    monkeypatch.setattr(server, "subscribe_slots", threading.BoundedSemaphore(1))
+    assert server.subscribe_slots.acquire(blocking=False)
+    version = json.loads(client.get("/api/state").data)["version"]
+    response = client.get(f"/api/state/subscribe?since={version}&timeout=5")
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == str(server.SUBSCRIBE_RETRY_AFTER)
+
+
+def test_subscribe_releases_slot_after_timeout(client, monkeypatch):
+    monkeypatch.setattr(server, "subscribe_slots", threading.BoundedSemaphore(1))
+    version = json.loads(client.get("/api/state").data)["version"]
+    for _ in range(2):
+        assert client.get(f"/api/state/subscribe?since={version}&timeout=0.01").status_code == 200
@@ -0,0 +1,192 @@
+"""服务器端的舵机轨迹插值
+
+客户端每次动作只发送一条命令（7 个目标角度 + 时长或速度上限），服务器以固定的高频率
+为所有关节生成设定值，动作的平滑程度不再取决于网络抖动和请求数量。
+
+插值使用五次多项式（最小加加速度）曲线 s(τ) = 10τ³ - 15τ⁴ + 6τ⁵，起止速度和加速度均为0，
+所有关节同时开始、同时到达。指定速度上限时按曲线的峰值速度（1.875 倍平均速度）计算时长。
+安装了 numpy 时所有机器人、所有关节在一次向量运算中求值，否则逐个计算。
+"""
+import math
+import threading
+import time
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+from protocol import SERVO_COUNT
+
+TRAJECTORY_RATE_HZ = 200  # 设定值的生成频率
+PEAK_VELOCITY_FACTOR = 1.875  # 五次曲线的峰值速度 / 平均速度
+MAX_DURATION = 60.0
+
+
+def min_jerk(tau):
+    """五次曲线的位置比例，tau 为 0~1 的时间比例"""
+    return tau * tau * tau * (10.0 + tau * (-15.0 + 6.0 * tau))
+
+
+def plan_duration(start, target, duration=None, max_velocity=None):
+    """根据时长或速度上限（度/秒）确定动作时长，参数不合法时抛出 ValueError"""
+    if duration is None and max_velocity is None:
+        raise ValueError("需要指定 duration（秒）或 max_velocity（度/秒）")
+    try:
+        duration = None if duration is None else float(duration)
+        max_velocity = None if max_velocity is None else float(max_velocity)
+    except (TypeError, ValueError):
+        raise ValueError(f"无效的时长或速度: {duration}, {max_velocity}") from None
+    if duration is not None:
+        if not 0 < duration <= MAX_DURATION:
+            raise ValueError(f"duration 必须在 0~{MAX_DURATION} 秒之间: {duration}")
+        return duration
+    if not max_velocity > 0:
+        raise ValueError(f"max_velocity 必须大于0: {max_velocity}")
+    # NaN 表示该关节角度未知且不动
+    distance = max((abs(t - s) for s, t in zip(start, target) if not math.isnan(t - s)), default=0.0)
+    return min(MAX_DURATION, PEAK_VELOCITY_FACTOR * distance / max_velocity)
+
+
+class Trajectory:
+    """一个机器人的一次动作"""
+    __slots__ = ("robot_id", "start", "target", "t0", "duration")
+
+    def __init__(self, robot_id, start, target, t0, duration):
+        self.robot_id = robot_id
+        self.start = start
+        self.target = target
+        self.t0 = t0
+        self.duration = duration
+
+    def sample(self, now):
+        """返回 now 时刻的关节角度"""
+        if self.duration <= 0:
+            return list(self.target)
+        s = min_jerk(min(1.0, max(0.0, (now - self.t0) / self.duration)))
+        return [a + (b - a) * s for a, b in zip(self.start, self.target)]
+
+
+class TrajectoryEngine:
+    """以固定频率为所有进行中的轨迹生成设定值
+
+    robots 为 RobotStateTable，起点取自其中的当前舵机角度；apply(robot_id, angles)
+    接收每个设定值（默认写入状态表）。后台线程在第一条轨迹开始时启动。
+    """
+
+    def __init__(self, robots, apply=None, rate_hz=TRAJECTORY_RATE_HZ):
+        self.robots = robots
+        self.apply = apply or robots.set_servos
+        self.rate_hz = rate_hz
+        self.trajectories = {}  # robot_id -> Trajectory
+        self.lock = threading.Lock()
+        self.wakeup = threading.Condition(self.lock)
+        self.thread = None
+        self.setpoints = 0
+        # numpy 向量化求值用的堆叠数组，轨迹集合变化时重建
+        self._stacked = None
+
+    def start_motion(self, robot_id, target, duration=None, max_velocity=None):
+        """开始一次动作，替换该机器人正在进行的动作，返回动作时长（秒）
+
+        target 中的 None/NaN 表示该关节保持当前角度；当前角度未知的关节直接到达目标。
+        """
+        if len(target) != SERVO_COUNT:
+            raise ValueError(f"需要 {SERVO_COUNT} 个舵机角度")
+        try:
+            target = [math.nan if a is None else float(a) for a in target]
+        except (TypeError, ValueError):
+            raise ValueError(f"无效的舵机角度: {target}") from None
+        now = time.perf_counter()
+        with self.lock:
+            current = self._current(robot_id, now)
+            target = [c if math.isnan(a) else a for a, c in zip(target, current)]
+            start = [t if math.isnan(c) else c for c, t in zip(current, target)]
+            target = [s if math.isnan(t) else t for s, t in zip(start, target)]
+            duration = plan_duration(start, target, duration, max_velocity)
+            self.trajectories[robot_id] = Trajectory(robot_id, start, target, now, duration)
+            self._stacked = None
+            self._ensure_thread()
+            self.wakeup.notify()
+        return duration
+
+    def cancel(self, robot_id):
+        """取消机器人正在进行的动作（收到直接的舵机命令时）"""
+        with self.lock:
+            if self.trajectories.pop(robot_id, None) is not None:
+                self._stacked = None
+
+    def active(self, robot_id):
+        with self.lock:
+            return robot_id in self.trajectories
+
+    def _current(self, robot_id, now):
+        """机器人当前的关节角度：正在动作时取插值位置，否则取状态表（未知为 NaN）"""
+        trajectory = self.trajectories.get(robot_id)
+        if trajectory is not None:
+            return trajectory.sample(now)
+        state = self.robots.get(robot_id)
+        if state is None:
+            self.robots.slot(robot_id)
+            return [math.nan] * SERVO_COUNT
+        return [math.nan if a is None else a for a in state["servos"]]
+
+    def _ensure_thread(self):
+        if self.thread is None:
+            self.thread = threading.Thread(target=self._run, name="TrajectoryEngine", daemon=True)
+            self.thread.start()
+
+    def step(self, now=None):
+        """生成一次所有轨迹的设定值，结束的轨迹在到达目标后移除"""
+        now = time.perf_counter() if now is None else now
+        with self.lock:
+            if not self.trajectories:
+                return 0
+            if np is not None:
+                setpoints, finished = self._step_numpy(now)
+            else:
+                setpoints = [(t.robot_id, t.sample(now)) for t in self.trajectories.values()]
+                finished = [t.robot_id for t in self.trajectories.values() if now - t.t0 >= t.duration]
+            for robot_id in finished:
+                del self.trajectories[robot_id]
+            if finished:
+                self._stacked = None
+            # 在锁内写入，cancel() 返回后不会再有旧轨迹的设定值覆盖直接命令
+            for robot_id, angles in setpoints:
+                self.apply(robot_id, angles)
+        self.setpoints += len(setpoints)
+        return len(setpoints)
+
+    def _step_numpy(self, now):
+        if self._stacked is None:
+            trajectories = list(self.trajectories.values())
+            start = np.array([t.start for t in trajectories])
+            self._stacked = (
+                [t.robot_id for t in trajectories],
+                start,
+                np.array([t.target for t in trajectories]) - start,
+                np.array([t.t0 for t in trajectories]),
+                np.array([max(t.duration, 1e-9) for t in trajectories]),
+            )
+        robot_ids, start, delta, t0, duration = self._stacked
+        tau = np.clip((now - t0) / duration, 0.0, 1.0)
+        angles = start + delta * min_jerk(tau)[:, None]
+        finished = [robot_ids[i] for i in np.flatnonzero(tau >= 1.0)]
+        return list(zip(robot_ids, angles.tolist())), finished
+
+    def _run(self):
+        interval = 1.0 / self.rate_hz
+        next_tick = time.perf_counter()
+        while True:
+            with self.lock:
+                while not self.trajectories:
+                    self.wakeup.wait()
+                    next_tick = time.perf_counter()
+            self.step()
+            next_tick += interval
+            delay = next_tick - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            else:
+                # 处理不过来时不追赶落下的周期
+                next_tick = time.perf_counter()
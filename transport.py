@@ -0,0 +1,327 @@
+"""控制命令的网络传输层（不依赖Qt，可在后台线程中使用）"""
+import json
+import math
+import random
+import socket
+import threading
+import time
+from urllib.parse import urlparse
+
+from codec import DEFAULT_CODEC, accept_header, codec_for, get_codec
+from command_queue import LatestValueQueue
+from protocol import SERVO_COUNT, pack_frame
+from robot_table import DEFAULT_ROBOT_ID
+
+# 增量编码判定无需发送时返回的说明
+UNCHANGED = "未变化"
+
+
+def encode_control(data, delta_encoder=None):
+    """对控制命令做增量编码并加上发送时间，无需发送时返回 None
+
+    data 中的 "robot_id" 会被保留；"t_input"（输入事件时间）也会保留，心跳消息除外。
+    """
+    if delta_encoder is None:
+        message = dict(data)
+    else:
+        message = delta_encoder.encode(data)
+        if message is None:
+            return None
+        if "robot_id" in data:
+            message["robot_id"] = data["robot_id"]
+        if "hb" not in message and "t_input" in data:
+            message["t_input"] = data["t_input"]
+    message["t_send"] = time.time()
+    return message
+
+
+class HttpTransport:
+    """基于 requests.Session 的 HTTP 传输，复用 keep-alive 长连接
+
+    codec 为请求体的编码（见 codec.py），应答按其 Content-Type 解码。
+    """
+    PATHS = {
+        "control": "/control",
+        "servo": "/servo",
+        "servo_batch": "/servo/batch",
+        "servo_trajectory": "/servo/trajectory",
+    }
+
+    def __init__(self, api_base_url, timeout=0.5, pool_size=4, delta_encoder=None, codec=DEFAULT_CODEC):
+        self.api_base_url = api_base_url
+        self.timeout = timeout
+        self.codec = get_codec(codec)
+        self.headers = {"Content-Type": self.codec.content_type, "Accept": accept_header(self.codec)}
+        # 控制命令的死区/增量编码，None 表示每次发送完整状态
+        self.delta_encoder = delta_encoder
+        self.pool_size = pool_size
+        # 首次发送时才导入 requests 并创建会话，不发送时不拖慢启动
+        self.session = None
+
+    def _session(self):
+        if self.session is None:
+            import requests
+            from requests.adapters import HTTPAdapter
+            # 连接池：同一主机复用TCP连接，避免每次请求都重新握手
+            self.session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.pool_size, max_retries=0)
+            self.session.mount("http://", adapter)
+            self.session.mount("https://", adapter)
+        return self.session
+
+    def send(self, kind, data):
+        """发送一条命令，返回 (是否成功, 说明, 时间戳)
+
+        时间戳为服务器回显的 timing 字典（附加收到应答的时间 t_reply），没有时为 None。
+        """
+        encoder = self.delta_encoder if kind == "control" else None
+        if kind == "control":
+            data = encode_control(data, encoder)
+            if data is None:
+                return True, UNCHANGED, None
+        try:
+            response = self._session().post(
+                f"{self.api_base_url}{self.PATHS[kind]}",
+                data=self.codec.encode(data, kind),
+                headers=self.headers,
+                timeout=self.timeout
+            )
+        except Exception:
+            if encoder is not None:
+                encoder.reset()
+            raise
+        t_reply = time.time()
+        if response.status_code == 200:
+            timing = None
+            if kind == "control":
+                reply = codec_for(response.headers.get("Content-Type")).decode(response.content)
+                timing = reply.get("timing")
+            if timing is not None:
+                timing["t_reply"] = t_reply
+            return True, "OK", timing
+        if encoder is not None:
+            # 服务器状态未知（或返回409要求重新同步），下次发送完整状态
+            encoder.reset()
+        return False, f"HTTP {response.status_code}", None
+
+    def close(self):
+        if self.session is not None:
+            self.session.close()
+
+
+class UdpTransport:
+    """UDP 二进制传输：每条命令发送一个包含完整控制状态的定长帧，无连接开销"""
+
+    def __init__(self, host, port, robot_id=DEFAULT_ROBOT_ID):
+        self.address = (host, port)
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.seq = 0
+        # 每次启动随机选择会话号，服务器据此识别重启，立即接受新的序号
+        self.session = random.getrandbits(32)
+        # 帧中始终携带最新的完整状态，丢包后下一帧即可恢复
+        self.robot_id = robot_id
+        self.x = 0.0
+        self.y = 0.0
+        self.z = 0.0
+        self.angles = [math.nan] * SERVO_COUNT
+
+    def send(self, kind, data):
+        """更新本地状态并发送一帧，返回 (是否成功, 说明, None)；UDP 没有应答"""
+        self.robot_id = data.get("robot_id", self.robot_id)
+        if kind == "control":
+            self.x = data["translate"]["x"]
+            self.y = data["translate"]["y"]
+            self.z = data["rotate"]["z"]
+        elif kind == "servo":
+            self.angles[data["servo_id"]] = data["angle"]
+        elif kind == "servo_batch":
+            self.angles = [math.nan if a is None else a for a in data["angles"]]
+        else:
+            # 轨迹等命令无法放进定长帧，需要使用 HTTP 或长连接
+            return False, f"UDP 不支持 {kind}", None
+        self.seq += 1
+        frame = pack_frame(self.session, self.seq, time.time(), self.robot_id, self.x, self.y, self.z,
+                           self.angles)
+        self.sock.sendto(frame, self.address)
+        return True, f"seq={self.seq}", None
+
+    def close(self):
+        self.sock.close()
+
+
+class StreamTransport:
+    """长连接传输：命令通过一条 TCP 连接推送，服务器的应答和状态由读线程接收
+
+    收到的每条服务器消息都会交给 on_message(message) 回调（在读线程中调用），
+    应答消息会附加 "rtt" 字段（秒），其 timing 字典会附加 t_reply。
+    连接断开后，下一次发送时自动重连；订阅类命令（subscribe_*）在每次连接后重新发送。
+    """
+
+    def __init__(self, host, port, timeout=0.5, delta_encoder=None):
+        self.address = (host, port)
+        self.timeout = timeout
+        self.delta_encoder = delta_encoder
+        self.on_message = None
+        self.sock = None
+        self.seq = 0
+        self.pending = {}  # seq -> 发送时间
+        self.lock = threading.Lock()
+        self.subscriptions = {}  # 订阅命令 -> data
+
+    def connect(self):
+        sock = socket.create_connection(self.address, timeout=self.timeout)
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        sock.settimeout(None)
+        self.sock = sock
+        threading.Thread(
+            target=self._read_loop, args=(sock,), name="StreamReader", daemon=True
+        ).start()
+        for kind, data in self.subscriptions.items():
+            self._send_line(kind, data)
+
+    def send(self, kind, data):
+        """推送一条命令，返回 (是否成功, 说明, None)；应答异步到达"""
+        if kind.startswith("subscribe_"):
+            self.subscriptions[kind] = data
+            if self.sock is None:
+                # 连接时会发送所有订阅
+                self.connect()
+                return True, f"seq={self.seq}", None
+        elif self.sock is None:
+            self.connect()
+        if kind == "control":
+            data = encode_control(data, self.delta_encoder)
+            if data is None:
+                return True, UNCHANGED, None
+        self._send_line(kind, data)
+        return True, f"seq={self.seq}", None
+
+    def _send_line(self, kind, data):
+        self.seq += 1
+        line = json.dumps({"type": kind, "seq": self.seq, "data": data},
+                          separators=(",", ":")).encode() + b"\n"
+        with self.lock:
+            self.pending[self.seq] = time.perf_counter()
+        try:
+            self.sock.sendall(line)
+        except OSError:
+            self._disconnect(self.sock)
+            raise
+
+    def _read_loop(self, sock):
+        try:
+            for line in sock.makefile("rb"):
+                t_reply = time.time()
+                message = json.loads(line)
+                if "timing" in message:
+                    message["timing"]["t_reply"] = t_reply
+                with self.lock:
+                    sent = self.pending.pop(message.get("seq"), None)
+                if sent is not None:
+                    message["rtt"] = time.perf_counter() - sent
+                if message.get("type") == "resync" and self.delta_encoder is not None:
+                    self.delta_encoder.reset()
+                if self.on_message is not None:
+                    self.on_message(message)
+        except (OSError, ValueError):
+            pass
+        self._disconnect(sock)
+
+    def _disconnect(self, sock):
+        if self.sock is sock:
+            self.sock = None
+            with self.lock:
+                self.pending.clear()
+            if self.delta_encoder is not None:
+                # 新连接对应新的服务器会话，需要重新发送完整状态
+                self.delta_encoder.reset()
+        try:
+            sock.close()
+        except OSError:
+            pass
+
+    def close(self):
+        if self.sock is not None:
+            self._disconnect(self.sock)
+
+
+def create_transport(kind, api_base_url, udp_port=5005, stream_port=5100, delta_encoder=None,
+                     codec=DEFAULT_CODEC):
+    """根据配置创建传输层: "http"、"udp" 或 "stream"（后两者使用 api_base_url 中的主机）
+
+    delta_encoder 只用于 HTTP 和长连接；UDP 帧总是携带完整状态，以便丢包后自动恢复。
+    codec 只用于 HTTP，长连接固定使用 JSON 行。
+    """
+    if kind == "udp":
+        return UdpTransport(urlparse(api_base_url).hostname, udp_port)
+    if kind == "stream":
+        return StreamTransport(urlparse(api_base_url).hostname, stream_port,
+                               delta_encoder=delta_encoder)
+    return HttpTransport(api_base_url, delta_encoder=delta_encoder, codec=codec)
+
+
+class SendWorker(threading.Thread):
+    """后台发送线程：从队列取命令并通过传输层发送，结果交给回调"""
+
+    def __init__(self, transport, on_result, max_age=0.3):
+        super().__init__(name="SendWorker", daemon=True)
+        self.transport = transport
+        # on_result(kind, tag, ok, detail, elapsed, timing)，在本线程中调用
+        self.on_result = on_result
+        self.commands = LatestValueQueue(max_age)
+        self.sent = 0
+        self.failed = 0
+        self.skipped = 0  # 增量编码判定无需发送的控制命令，不计入发送次数和耗时
+        self.last_send_time = 0.0
+        self.max_send_time = 0.0
+        self.total_send_time = 0.0
+
+    def submit(self, kind, data, tag="", droppable=True):
+        """提交一条命令，立即返回，不会阻塞调用者"""
+        self.commands.put(kind, data, tag, droppable)
+
+    def stop(self, timeout=1.0):
+        """停止线程并关闭传输层"""
+        self.commands.close()
+        self.join(timeout)
+
+    def stats(self):
+        """队列与发送计数器"""
+        return {
+            "depth": self.commands.depth(),
+            "enqueued": self.commands.enqueued,
+            "replaced": self.commands.replaced,
+            "expired": self.commands.expired,
+            "sent": self.sent,
+            "failed": self.failed,
+            "skipped": self.skipped,
+            "last_send_ms": self.last_send_time * 1000,
+            "max_send_ms": self.max_send_time * 1000,
+            "avg_send_ms": self.total_send_time * 1000 / max(1, self.sent + self.failed),
+        }
+
+    def run(self):
+        while True:
+            item = self.commands.get()
+            if item is None:
+                break
+            kind, data, tag, _ = item
+            start = time.perf_counter()
+            try:
+                ok, detail, timing = self.transport.send(kind, data)
+            except Exception as e:
+                ok, detail, timing = False, str(e), None
+            elapsed = time.perf_counter() - start
+            if ok and detail == UNCHANGED:
+                self.skipped += 1
+                self.on_result(kind, tag, ok, detail, elapsed, timing)
+                continue
+            if ok:
+                self.sent += 1
+            else:
+                self.failed += 1
+            self.last_send_time = elapsed
+            self.max_send_time = max(self.max_send_time, elapsed)
+            self.total_send_time += elapsed
+            self.on_result(kind, tag, ok, detail, elapsed, timing)
+        self.transport.close()